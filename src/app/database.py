@@ -1,16 +1,160 @@
+import base64
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 
+from app import typed_results
+from utils.metrics import metrics
+
 # 数据库文件路径 (会自动生成在 src/app/netops.db)
 # 获取当前文件 (database.py) 的目录
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'netops.db')
 
+# 连接池：每个数据库文件保留最多 POOL_SIZE 条空闲长连接，不再每次查询都 connect / close
+POOL_SIZE = 8
+# 写锁被占用时最长等待的毫秒数 (超过后才报 database is locked)
+BUSY_TIMEOUT_MS = 5000
+# 每条新连接执行一次的 PRAGMA
+# - WAL: 读不阻塞写、写不阻塞读，并发巡检写日志时页面查询不再卡住
+# - synchronous=NORMAL: WAL 模式下只在检查点时 fsync，断电最多丢最后几个事务，不会损坏数据库
+# - cache_size: 负数单位为 KiB (每条连接 16 MB 页缓存)；mmap_size: 256 MB 内存映射读
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    # SQLite 默认不检查外键：result_* 表的 ON DELETE CASCADE 依赖它生效 (每个连接都要单独打开)
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class ConnectionPool:
+    """
+    SQLite 连接池
+    - 借出的连接同一时间只被一个线程使用 (check_same_thread=False 允许跨线程归还复用)
+    - 归还时回滚未提交的事务，池满时直接关闭多余的连接
+    - 行工厂统一为 sqlite3.Row (既可 row['id'] 也可 row[0])
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self.created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self.created += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _connection():
+    """从当前 DB_PATH 对应的连接池借一条连接 (with _connection() as conn: ...)"""
+    pool = _pools.get(DB_PATH)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(DB_PATH, ConnectionPool(DB_PATH))
+    return pool.connection()
+
+def close_connections():
+    """关闭全部空闲连接 (进程退出时调用)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+# 写入事件监听器 {事件名: [回调]}，响应缓存等据此失效
+# 事件: 'devices' (设备表写入)、'logs' (巡检记录写入)
+_listeners = {}
+
+def add_listener(event, callback):
+    """注册写入事件回调 (回调无参数，在写入线程中同步调用)"""
+    _listeners.setdefault(event, []).append(callback)
+
+def _notify(event):
+    for callback in _listeners.get(event, []):
+        try:
+            callback()
+        except Exception as e:
+            print(f"❌ [DB] 写入事件回调失败 ({event}): {e}")
+
 def init_db():
-    """初始化数据库：如果表不存在，就创建它"""
-    conn = sqlite3.connect(DB_PATH)
+    """初始化数据库：按版本号依次执行尚未应用的迁移 (新库建表，旧库原地升级)"""
+    with _connection() as conn:
+        previous = conn.execute('PRAGMA user_version').fetchone()[0]
+        version = migrate(conn)
+        # 刚升级出结构化结果表的旧库，把已有巡检记录回填进去
+        if previous < TYPED_RESULTS_VERSION <= version:
+            backfill_typed_results(conn)
+    print(f"✅ [DB] 数据库已就绪: {DB_PATH} (schema v{version})")
+
+def migrate(conn):
+    """
+    执行全部未应用的迁移，当前版本记录在 PRAGMA user_version
+    每个迁移在独立的 BEGIN IMMEDIATE 事务中执行并写入新版本号，
+    多个进程同时启动时只有一个会真正执行，其余等写锁后读到新版本直接跳过
+    :return: 迁移后的版本号
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if target > version:
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
+                version = target
+                print(f"💾 [DB] 已应用迁移 v{target}: {description}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+def _migration_001_baseline(conn):
+    """基础表结构 (引入迁移之前的全部表；旧库里表已存在，语句均可重复执行)"""
     cursor = conn.cursor()
 
     # 创建巡检日志表
@@ -42,152 +186,562 @@ def init_db():
             username TEXT NOT NULL,
             password TEXT,
             device_type TEXT DEFAULT 'huawei_vrp',
+            device_group TEXT DEFAULT 'default',
             status TEXT DEFAULT 'unknown',
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # 旧库的 devices 表没有分组字段
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(devices)')]
+    if 'device_group' not in columns:
+        cursor.execute("ALTER TABLE devices ADD COLUMN device_group TEXT DEFAULT 'default'")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_devices_host ON devices (host)')
 
-    conn.commit()
-    conn.close()
-    print(f"✅ [DB] 数据库已就绪: {DB_PATH}")
+    # 设备表版本号：任何写操作都由触发器加一，各 Worker 进程据此判断本地设备缓存是否过期
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registry_meta (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO registry_meta (name, version) VALUES ('devices', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS devices_version_{event.lower()}
+            AFTER {event} ON devices
+            BEGIN
+                UPDATE registry_meta SET version = version + 1 WHERE name = 'devices';
+            END
+        ''')
 
-def save_log(device_ip, command, result, status="success"):
-    """保存巡检结果到数据库"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+    # 创建后台任务表 (POST /api/jobs 提交的长耗时设备操作)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            job_type TEXT NOT NULL,
+            device_id INTEGER,
+            params_json TEXT,
+            status TEXT DEFAULT 'queued',
+            result_json TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        )
+    ''')
 
-        # 把列表/字典转换成 JSON 字符串存储
-        # 数据库不能直接存列表，必须转成字符串
-        if isinstance(result, (dict, list)):
-            result_str = json.dumps(result, ensure_ascii=False)
-        else:
-            result_str = str(result)
 
+def _migration_002_log_indexes(conn):
+    """巡检日志的查询索引：按设备 / 状态过滤后按时间倒序，以及全表按时间倒序 / 时间范围"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_device_time ON inspection_logs (device_ip, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_status_time ON inspection_logs (status, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_time ON inspection_logs (timestamp)')
+
+def _migration_003_typed_results(conn):
+    """
+    结构化结果表 (接口 / 路由 / ARP / MAC / VLAN)，每行关联父巡检记录 log_id，
+    冗余 device_ip 与 timestamp 以便全网按时间范围查询时只走本表索引
+    只建表与索引；已有巡检记录的回填见 backfill_typed_results (依赖会变化的 typed_results 映射，不放在迁移里)
+    """
+    common = '''
+        id INTEGER PRIMARY KEY,
+        log_id INTEGER NOT NULL REFERENCES inspection_logs (id) ON DELETE CASCADE,
+        device_ip TEXT NOT NULL,
+        timestamp DATETIME,
+    '''
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS result_interfaces ({common}
+            interface TEXT, status TEXT, protocol TEXT, ip_address TEXT, description TEXT,
+            vlan_id INTEGER, speed TEXT, duplex TEXT, mtu INTEGER, in_errors INTEGER, out_errors INTEGER
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS result_routes ({common}
+            vrf TEXT, network TEXT, prefix_length INTEGER, protocol TEXT, next_hop TEXT, interface TEXT,
+            distance INTEGER, metric INTEGER
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS result_arp ({common}
+            ip_address TEXT, mac_address TEXT, interface TEXT, type TEXT, vlan_id INTEGER, age TEXT, vrf TEXT
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS result_mac ({common}
+            mac_address TEXT, vlan_id INTEGER, interface TEXT, type TEXT
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS result_vlans ({common}
+            vlan_id INTEGER, name TEXT, status TEXT, type TEXT, interfaces TEXT
+        )
+    ''')
+
+    indexes = {
+        'result_interfaces': ('status, timestamp', 'device_ip, interface, timestamp'),
+        'result_routes': ('network, prefix_length', 'next_hop', 'device_ip, timestamp'),
+        'result_arp': ('ip_address', 'mac_address', 'device_ip, timestamp'),
+        'result_mac': ('mac_address', 'vlan_id', 'device_ip, timestamp'),
+        'result_vlans': ('vlan_id', 'device_ip, timestamp'),
+    }
+    for table, column_sets in indexes.items():
+        for columns in column_sets + ('log_id',):
+            name = f"idx_{table}_{columns.replace(', ', '_')}"
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+# 迁移列表 (版本号, 说明, 函数)：只追加，不修改已发布的迁移
+MIGRATIONS = (
+    (1, 'baseline tables', _migration_001_baseline),
+    (2, 'inspection_logs indexes', _migration_002_log_indexes),
+    (3, 'typed result tables', _migration_003_typed_results),
+)
+
+# 建立结构化结果表的 schema 版本
+TYPED_RESULTS_VERSION = 3
+
+def _serialize_result(result):
+    """把列表/字典转换成 JSON 字符串 (数据库不能直接存列表)"""
+    if isinstance(result, (dict, list)):
+        return json.dumps(result, ensure_ascii=False)
+    return str(result)
+
+# 已序列化的巡检记录：result_json 为字符串，typed 为结构化结果行 (元组)，都是不可变数据
+_LogRecord = namedtuple('_LogRecord', 'device_ip command result_json status typed')
+
+def _prepare_log(record):
+    """
+    (device_ip, command, result, status) -> _LogRecord
+    在调用方线程完成 JSON 序列化与结构化拆行，之后调用方再修改 result 也不会影响写入的内容
+    """
+    if isinstance(record, _LogRecord):
+        return record
+    device_ip, command, result, status = record
+    typed = typed_results.extract(command, result) if status == 'success' else None
+    return _LogRecord(device_ip, command, _serialize_result(result), status, typed)
+
+def _insert_typed(cursor, log_id, device_ip, timestamp, typed):
+    """写入一条巡检记录对应的结构化结果行，返回行数"""
+    kind, columns, rows = typed
+    table = typed_results.TYPED_TABLES[kind]['table']
+    placeholders = ', '.join('?' * (len(columns) + 3))
+    cursor.executemany(f'''
+        INSERT INTO {table} (log_id, device_ip, timestamp, {', '.join(columns)})
+        VALUES ({placeholders})
+    ''', [(log_id, device_ip, timestamp) + row for row in rows])
+    return len(rows)
+
+def backfill_typed_results(conn=None):
+    """
+    按当前 typed_results 的映射，把还没有结构化结果行的成功巡检记录写入结构化结果表
+    可重复执行：已有结果行的记录直接跳过；映射新增命令 / 字段后再执行一次即可补齐历史记录
+    :param conn: 已有连接 (init_db 中使用)，为空时从连接池取
+    :return: 写入的行数
+    """
+    if conn is None:
+        with _connection() as conn:
+            return backfill_typed_results(conn)
+
+    has_rows = ' OR '.join(f"EXISTS (SELECT 1 FROM {spec['table']} WHERE log_id = l.id)"
+                           for spec in typed_results.TYPED_TABLES.values())
+    backfilled = 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # 逐行迭代游标，不一次性读入内存
+        logs = conn.execute(f'''
+            SELECT id, device_ip, command, result_json, timestamp FROM inspection_logs l
+            WHERE status = 'success' AND result_json LIKE '[%' AND NOT ({has_rows})
+        ''')
+        cursor = conn.cursor()
+        for log_id, device_ip, command, result_json, timestamp in logs:
+            try:
+                typed = typed_results.extract(command, json.loads(result_json))
+            except ValueError:
+                continue
+            if typed:
+                backfilled += _insert_typed(cursor, log_id, device_ip, timestamp, typed)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if backfilled:
+        print(f"💾 [DB] 已回填 {backfilled} 行结构化结果")
+    return backfilled
+
+def _insert_logs(cursor, records):
+    """
+    在当前事务中写入巡检记录；成功且能识别的解析结果同时写入结构化结果表
+    :param records: [(device_ip, command, result, status) 或 _LogRecord, ...]
+    """
+    for device_ip, command, result_json, status, typed in map(_prepare_log, records):
         cursor.execute('''
             INSERT INTO inspection_logs (device_ip, command, result_json, status)
             VALUES (?, ?, ?, ?)
-        ''', (device_ip, command, result_str, status))
+        ''', (device_ip, command, result_json, status))
 
-        conn.commit()
-        conn.close()
+        if typed:
+            log_id = cursor.lastrowid
+            timestamp = cursor.execute('SELECT timestamp FROM inspection_logs WHERE id = ?',
+                                       (log_id,)).fetchone()[0]
+            _insert_typed(cursor, log_id, device_ip, timestamp, typed)
+
+def save_log(device_ip, command, result, status="success"):
+    """
+    保存巡检结果到数据库
+    后台写入线程已启动时只入队 (由 log_writer 批量落盘)，否则同步写入
+    """
+    if log_writer.running:
+        log_writer.submit(device_ip, command, result, status)
+        return
+    try:
+        with _connection() as conn:
+            with metrics.timer('db_write', device_ip, command):
+                _insert_logs(conn.cursor(), [(device_ip, command, result, status)])
+                conn.commit()
+        _notify('logs')
         print(f"💾 [DB] 已保存 {device_ip} 的巡检记录 (Status: {status})")
     except Exception as e:
         print(f"❌ [DB] 保存失败: {e}")
 
-def get_history(limit=20):
-    """获取最近的巡检记录 (给前端历史页面用)"""
+def save_logs(records):
+    """
+    批量保存巡检结果：一次连接、一个事务写入
+    :param records: [(device_ip, command, result, status) 或 _LogRecord, ...]
+    :return: 写入的行数
+    """
+    if not records:
+        return 0
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row # 让结果可以用字段名访问 (row['id'])
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT * FROM inspection_logs
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-
-        rows = cursor.fetchall()
-        conn.close()
+        with _connection() as conn:
+            with metrics.timer('db_write_batch'):
+                _insert_logs(conn.cursor(), records)
+                conn.commit()
+        _notify('logs')
+        print(f"💾 [DB] 已批量保存 {len(records)} 条巡检记录")
+        return len(records)
+    except Exception as e:
+        print(f"❌ [DB] 批量保存失败: {e}")
+        return 0
+
+# 后台批量写入的默认参数
+LOG_BATCH_SIZE = 500         # 攒够这么多条立即落盘
+LOG_FLUSH_INTERVAL = 0.5     # 第一条入队后最多等待的秒数
+LOG_QUEUE_SIZE = 10000       # 队列上限，满了以后 submit 阻塞 (背压)
+LOG_SUBMIT_TIMEOUT = 5.0     # submit 最长阻塞秒数，超时丢弃该条并计数
+
+
+class LogWriter:
+    """
+    巡检日志的后台批量写入线程 (write-behind)
+    - submit() 只把记录入队，立即返回，巡检请求不再等待磁盘
+    - 写入线程攒够 batch_size 条或等满 flush_interval 秒后，用 save_logs 一个事务落盘
+    - JSON 序列化与结构化拆行在 submit 的调用方线程完成，队列里只有不可变数据
+    - 队列满时 submit 最多阻塞 submit_timeout 秒 (None 为一直等)，仍满则丢弃该条并计入 dropped
+    - flush() 等待已入队的记录全部落盘；close() 落盘剩余记录后停止线程 (进程退出时调用)
+    - stats() 返回 queued / flushed / dropped / batches 计数与当前积压 pending
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 max_queue=LOG_QUEUE_SIZE, submit_timeout=LOG_SUBMIT_TIMEOUT):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.counters = {'queued': 0, 'flushed': 0, 'dropped': 0, 'batches': 0}
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+        print(f"💾 [DB] 后台日志写入已启动 (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    def submit(self, device_ip, command, result, status="success"):
+        """
+        入队一条巡检记录 (先序列化：入队后调用方修改 result 不影响落盘内容)
+        :return: 入队成功返回 True，队列持续满载被丢弃返回 False
+        """
+        try:
+            record = _prepare_log((device_ip, command, result, status))
+        except Exception as e:
+            self._count('dropped')
+            print(f"❌ [DB] 巡检记录序列化失败，丢弃 {device_ip} 的巡检记录 ({command}): {e}")
+            return False
+        try:
+            self._queue.put(record, timeout=self.submit_timeout)
+        except queue.Full:
+            self._count('dropped')
+            print(f"❌ [DB] 日志写入队列已满，丢弃 {device_ip} 的巡检记录 ({command})")
+            return False
+        self._count('queued')
+        return True
 
-        # 转成字典列表返回
-        return [dict(row) for row in rows]
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, done = [], None
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP or isinstance(item, threading.Event):
+                    done = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+            if done is self._STOP:
+                return
+            if done is not None:
+                done.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        written = save_logs(batch)
+        if written:
+            self._count('flushed', written)
+            self._count('batches')
+        else:
+            self._count('dropped', len(batch))
+
+    def flush(self, timeout=None):
+        """等待此前入队的记录全部落盘，未启动时直接返回 True"""
+        if not self.running:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=30):
+        """落盘剩余记录并停止写入线程，之后 save_log 恢复同步写入"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(self._STOP)
+        thread.join(timeout)
+        # 与 close 并发入队、排在停止标记之后的记录
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not self._STOP:
+                leftovers.append(item)
+        self._write(leftovers)
+        print(f"💾 [DB] 后台日志写入已停止 (flushed={self.counters['flushed']}, dropped={self.counters['dropped']})")
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, pending=self._queue.qsize(), running=self._thread is not None)
+
+
+# 进程级单例：run.py 启动时 start()，退出时 close()；未启动时 save_log 同步写入
+log_writer = LogWriter()
+
+# 历史记录分页：默认 / 最大单页行数
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 1000
+# 流式读取时每次 fetchmany 的行数
+STREAM_CHUNK_SIZE = 500
+
+def encode_cursor(row):
+    """把一页最后一行的 (timestamp, id) 编码为不透明的分页游标"""
+    raw = json.dumps([row['timestamp'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    :return: (timestamp, id)；游标格式错误时抛出 ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(log_id, int) or not isinstance(timestamp, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return timestamp, log_id
+
+def _logs_query(device_ip=None, status=None, since=None, until=None, cursor=None):
+    """
+    构造按 (timestamp, id) 倒序的巡检记录查询
+    keyset 分页：游标之后的行用 (timestamp, id) < (?, ?) 定位，直接从索引位置继续扫描，
+    第 N 页与第 1 页的代价相同 (OFFSET 需要先数过前面所有行)
+    """
+    where, params = [], []
+    if device_ip:
+        where.append('device_ip = ?')
+        params.append(device_ip)
+    if status:
+        where.append('status = ?')
+        params.append(status)
+    if since:
+        where.append('timestamp >= ?')
+        params.append(since)
+    if until:
+        where.append('timestamp <= ?')
+        params.append(until)
+    if cursor:
+        where.append('(timestamp, id) < (?, ?)')
+        params.extend(decode_cursor(cursor))
+    sql = 'SELECT * FROM inspection_logs'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return sql + ' ORDER BY timestamp DESC, id DESC', params
+
+def get_logs_page(device_ip=None, status=None, since=None, until=None, cursor=None, limit=PAGE_SIZE):
+    """
+    分页查询巡检记录 (按时间倒序)
+    :param cursor: 上一页返回的 next_cursor，None 为第一页
+    :param limit: 单页行数 (最多 MAX_PAGE_SIZE)
+    :return: (记录列表, next_cursor)，没有下一页时 next_cursor 为 None；游标格式错误时抛出 ValueError
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    sql, params = _logs_query(device_ip, status, since, until, cursor)
+    try:
+        with _connection() as conn:
+            # 多取一行判断是否还有下一页
+            rows = conn.execute(sql + ' LIMIT ?', params + [limit + 1]).fetchall()
     except Exception as e:
         print(f"❌ [DB] 查询失败: {e}")
-        return []
+        return [], None
+
+    rows = [dict(row) for row in rows]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def iter_logs(device_ip=None, status=None, since=None, until=None, cursor=None, limit=None):
+    """
+    流式读取巡检记录 (导出用)：逐批 fetchmany，不把整个结果集读入内存
+    参数同 get_logs_page，limit 为 None 时读到结果末尾
+    :return: 字典生成器；游标格式错误时立即抛出 ValueError
+    """
+    sql, params = _logs_query(device_ip, status, since, until, cursor)
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    def _rows():
+        try:
+            with _connection() as conn:
+                result = conn.execute(sql, params)
+                while True:
+                    rows = result.fetchmany(STREAM_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield dict(row)
+        except sqlite3.Error as e:
+            print(f"❌ [DB] 流式查询失败: {e}")
+
+    return _rows()
+
+def get_history(limit=20):
+    """获取最近的巡检记录 (给前端历史页面用)"""
+    return get_logs_page(limit=limit)[0]
 
 def get_logs_by_device(device_ip, limit=20):
     """获取特定设备的巡检记录"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT * FROM inspection_logs
-            WHERE device_ip = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (device_ip, limit))
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [dict(row) for row in rows]
-    except Exception as e:
-        print(f"❌ [DB] 查询失败: {e}")
-        return []
+    return get_logs_page(device_ip=device_ip, limit=limit)[0]
 
 def get_logs_by_status(status, limit=20):
     """获取特定状态的巡检记录"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT * FROM inspection_logs
-            WHERE status = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (status, limit))
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [dict(row) for row in rows]
-    except Exception as e:
-        print(f"❌ [DB] 查询失败: {e}")
-        return []
+    return get_logs_page(status=status, limit=limit)[0]
 
 def get_logs_by_date_range(start_date, end_date, limit=100):
-    """获取指定日期范围内的巡检记录"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT * FROM inspection_logs
-            WHERE timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (start_date, end_date, limit))
-
-        rows = cursor.fetchall()
-        conn.close()
+    """获取指定日期范围内的巡检记录 (更多记录用 get_logs_page 翻页)"""
+    return get_logs_page(since=start_date, until=end_date, limit=limit)[0]
+
+def query_results(kind, since=None, until=None, limit=100, **filters):
+    """
+    查询结构化结果表，例如上周 down 掉的接口:
+        query_results('interfaces', status='down', since='2024-06-01 00:00:00')
+    :param kind: typed_results.TYPED_TABLES 的键 (interfaces / routes / arp / mac / vlans)
+    :param since / until: 巡检时间范围 (含端点)
+    :param filters: 列 = 值 的等值过滤 (device_ip 或该表的列)
+    :return: 按时间倒序的字典列表；kind 或列名未知时抛出 ValueError
+    """
+    spec = typed_results.TYPED_TABLES.get(kind)
+    if spec is None:
+        raise ValueError(f"Unknown result kind: {kind}")
+    allowed = {'device_ip', 'log_id'} | set(spec['columns'])
+    unknown = set(filters) - allowed
+    if unknown:
+        raise ValueError(f"Unknown column for {kind}: {', '.join(sorted(unknown))}")
+
+    where, params = [], []
+    for column, value in filters.items():
+        where.append(f'{column} = ?')
+        params.append(value)
+    if since:
+        where.append('timestamp >= ?')
+        params.append(since)
+    if until:
+        where.append('timestamp <= ?')
+        params.append(until)
+    sql = f"SELECT * FROM {spec['table']}"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+    params.append(limit)
 
+    try:
+        with _connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
         return [dict(row) for row in rows]
     except Exception as e:
-        print(f"❌ [DB] 查询失败: {e}")
+        print(f"❌ [DB] 查询结构化结果失败: {e}")
         return []
 
 def get_statistics():
     """获取巡检统计信息"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with _connection() as conn:
+            cursor = conn.cursor()
 
-        # 总记录数
-        cursor.execute('SELECT COUNT(*) as total FROM inspection_logs')
-        total = cursor.fetchone()['total']
+            # 总记录数
+            cursor.execute('SELECT COUNT(*) as total FROM inspection_logs')
+            total = cursor.fetchone()['total']
 
-        # 按状态统计
-        cursor.execute('''
-            SELECT status, COUNT(*) as count
-            FROM inspection_logs
-            GROUP BY status
-        ''')
-        status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
+            # 按状态统计
+            cursor.execute('''
+                SELECT status, COUNT(*) as count
+                FROM inspection_logs
+                GROUP BY status
+            ''')
+            status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
 
-        # 最近记录时间
-        cursor.execute('SELECT MAX(timestamp) as last_record FROM inspection_logs')
-        last_record = cursor.fetchone()['last_record']
+            # 最近记录时间
+            cursor.execute('SELECT MAX(timestamp) as last_record FROM inspection_logs')
+            last_record = cursor.fetchone()['last_record']
 
-        conn.close()
 
         return {
             'total_logs': total,
@@ -198,20 +752,20 @@ def get_statistics():
         print(f"❌ [DB] 统计查询失败: {e}")
         return {}
 
-def add_device(name, host, port=22, username='', password='', device_type='huawei_vrp'):
+def add_device(name, host, port=22, username='', password='', device_type='huawei_vrp', group='default'):
     """添加设备到数据库"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        with _connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO devices (name, host, port, username, password, device_type)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, host, port, username, password, device_type))
+            cursor.execute('''
+                INSERT INTO devices (name, host, port, username, password, device_type, device_group)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, host, port, username, password, device_type, group))
 
-        device_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            device_id = cursor.lastrowid
+            conn.commit()
+        _notify('devices')
 
         print(f"💾 [DB] 已添加设备: {name} ({host})")
         return device_id
@@ -222,13 +776,11 @@ def add_device(name, host, port=22, username='', password='', device_type='huawe
 def get_all_devices():
     """获取所有设备"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with _connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM devices ORDER BY id')
-        rows = cursor.fetchall()
-        conn.close()
+            cursor.execute('SELECT * FROM devices ORDER BY id')
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
     except Exception as e:
@@ -238,80 +790,183 @@ def get_all_devices():
 def get_device_by_id(device_id):
     """根据ID获取设备"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with _connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM devices WHERE id = ?', (device_id,))
-        row = cursor.fetchone()
-        conn.close()
+            cursor.execute('SELECT * FROM devices WHERE id = ?', (device_id,))
+            row = cursor.fetchone()
 
         return dict(row) if row else None
     except Exception as e:
         print(f"❌ [DB] 查询设备失败: {e}")
         return None
 
-def update_device(device_id, name=None, host=None, port=None, username=None, password=None, device_type=None, status=None):
+def update_device(device_id, name=None, host=None, port=None, username=None, password=None, device_type=None,
+                  status=None, group=None):
     """更新设备信息"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 构建更新语句
-        updates = []
-        params = []
-
-        if name is not None:
-            updates.append('name = ?')
-            params.append(name)
-        if host is not None:
-            updates.append('host = ?')
-            params.append(host)
-        if port is not None:
-            updates.append('port = ?')
-            params.append(port)
-        if username is not None:
-            updates.append('username = ?')
-            params.append(username)
-        if password is not None:
-            updates.append('password = ?')
-            params.append(password)
-        if device_type is not None:
-            updates.append('device_type = ?')
-            params.append(device_type)
-        if status is not None:
-            updates.append('status = ?')
-            params.append(status)
-
-        # 添加更新时间
-        updates.append('updated_at = CURRENT_TIMESTAMP')
-
-        if updates:
-            sql = f"UPDATE devices SET {', '.join(updates)} WHERE id = ?"
-            params.append(device_id)
-
-            cursor.execute(sql, params)
-            conn.commit()
-
-        conn.close()
+        with _connection() as conn:
+            cursor = conn.cursor()
+
+            # 构建更新语句
+            updates = []
+            params = []
+
+            if name is not None:
+                updates.append('name = ?')
+                params.append(name)
+            if host is not None:
+                updates.append('host = ?')
+                params.append(host)
+            if port is not None:
+                updates.append('port = ?')
+                params.append(port)
+            if username is not None:
+                updates.append('username = ?')
+                params.append(username)
+            if password is not None:
+                updates.append('password = ?')
+                params.append(password)
+            if device_type is not None:
+                updates.append('device_type = ?')
+                params.append(device_type)
+            if status is not None:
+                updates.append('status = ?')
+                params.append(status)
+            if group is not None:
+                updates.append('device_group = ?')
+                params.append(group)
+
+            # 添加更新时间
+            updates.append('updated_at = CURRENT_TIMESTAMP')
+
+            if updates:
+                sql = f"UPDATE devices SET {', '.join(updates)} WHERE id = ?"
+                params.append(device_id)
+
+                cursor.execute(sql, params)
+                conn.commit()
+
+        _notify('devices')
         print(f"💾 [DB] 已更新设备: {device_id}")
         return True
     except Exception as e:
         print(f"❌ [DB] 更新设备失败: {e}")
         return False
 
+def update_device_statuses(statuses):
+    """
+    批量更新设备在线状态 (一个事务)，状态未变化的行不写
+    :param statuses: [(device_id, status), ...]
+    :return: 实际更新的行数
+    """
+    if not statuses:
+        return 0
+    try:
+        with _connection() as conn:
+            with conn:
+                cursor = conn.executemany('''
+                    UPDATE devices SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status IS NOT ?
+                ''', [(status, device_id, status) for device_id, status in statuses])
+                changed = cursor.rowcount
+        if changed:
+            _notify('devices')
+        return changed
+    except Exception as e:
+        print(f"❌ [DB] 批量更新设备状态失败: {e}")
+        return 0
+
 def delete_device(device_id):
     """删除设备"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        with _connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM devices WHERE id = ?', (device_id,))
-        conn.commit()
-        conn.close()
+            cursor.execute('DELETE FROM devices WHERE id = ?', (device_id,))
+            conn.commit()
+        _notify('devices')
 
         print(f"🗑️ [DB] 已删除设备: {device_id}")
         return True
     except Exception as e:
         print(f"❌ [DB] 删除设备失败: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def get_devices_version():
+    """读取设备表版本号 (设备表每次写入都会加一)，失败返回 None"""
+    try:
+        with _connection() as conn:
+            row = conn.execute("SELECT version FROM registry_meta WHERE name = 'devices'").fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"❌ [DB] 查询设备版本失败: {e}")
+        return None
+
+def create_job(job_id, job_type, params, device_id=None):
+    """新建一条排队中的后台任务"""
+    try:
+        with _connection() as conn:
+            with conn:
+                conn.execute('''
+                    INSERT INTO jobs (id, job_type, device_id, params_json, status)
+                    VALUES (?, ?, ?, ?, 'queued')
+                ''', (job_id, job_type, device_id, json.dumps(params, ensure_ascii=False)))
+        return True
+    except Exception as e:
+        print(f"❌ [DB] 创建任务失败: {e}")
+        return False
+
+def mark_job_running(job_id):
+    try:
+        with _connection() as conn:
+            with conn:
+                conn.execute('''
+                    UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP WHERE id = ?
+                ''', (job_id,))
+    except Exception as e:
+        print(f"❌ [DB] 更新任务状态失败: {e}")
+
+def finish_job(job_id, status, result=None, error=None):
+    """记录任务结束 (success / error) 与结果"""
+    try:
+        with _connection() as conn:
+            with conn:
+                conn.execute('''
+                    UPDATE jobs SET status = ?, result_json = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id))
+    except Exception as e:
+        print(f"❌ [DB] 保存任务结果失败: {e}")
+
+def get_job(job_id):
+    """查询任务，params / result 解析回对象；不存在返回 None"""
+    try:
+        with _connection() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    except Exception as e:
+        print(f"❌ [DB] 查询任务失败: {e}")
+        return None
+
+    if not row:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job.pop('params_json') or 'null')
+    job['result'] = json.loads(job.pop('result_json') or 'null')
+    return job
+
+def fail_interrupted_jobs():
+    """进程重启后，上次未执行完的任务不会再被执行，标记为失败"""
+    try:
+        with _connection() as conn:
+            with conn:
+                cursor = conn.execute('''
+                    UPDATE jobs SET status = 'error', error = 'Interrupted by server restart',
+                           finished_at = CURRENT_TIMESTAMP
+                    WHERE status IN ('queued', 'running')
+                ''')
+                count = cursor.rowcount
+        return count
+    except Exception as e:
+        print(f"❌ [DB] 清理中断任务失败: {e}")
+        return 0
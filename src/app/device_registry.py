@@ -0,0 +1,165 @@
+import threading
+import time
+
+from app import database
+
+# 设备行字段 -> API 字段
+API_FIELDS = ('id', 'name', 'host', 'port', 'username', 'password', 'device_type', 'group', 'status')
+
+
+def _to_api(row):
+    """数据库行转换为 API 使用的设备字典 (device_group -> group)"""
+    device = {key: row.get(key) for key in API_FIELDS if key != 'group'}
+    device['group'] = row.get('device_group') or 'default'
+    return device
+
+
+class DeviceRegistry:
+    """
+    基于 devices 表的设备注册中心
+    - 进程内维护 id / host / group 索引，查找为 O(1) 字典访问，不再线性扫描列表
+    - 本进程内的写操作立即失效缓存；其它 Worker 进程的写入通过 registry_meta 版本号发现
+      (最多每 check_interval 秒查询一次版本号，版本变化时整表重新加载)
+    - 返回的设备字典是缓存对象，调用方只读，修改请走 add / update / delete / set_status
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_host = {}
+        self._by_group = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self.reloads = 0
+
+    # ---------- 缓存 ----------
+
+    def _reload(self, version):
+        rows = database.get_all_devices()
+        by_id, by_host, by_group = {}, {}, {}
+        for row in rows:
+            device = _to_api(row)
+            by_id[device['id']] = device
+            by_host.setdefault(device['host'], []).append(device)
+            by_group.setdefault(device['group'], []).append(device)
+        self._by_id, self._by_host, self._by_group = by_id, by_host, by_group
+        self._version = version
+        self._loaded = True
+        self.reloads += 1
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._loaded and now - self._checked_at < self.check_interval:
+                return
+            version = database.get_devices_version()
+            if not self._loaded or version is None or version != self._version:
+                self._reload(version)
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """本进程写入后调用：下次访问时重新检查版本号并加载"""
+        with self._lock:
+            self._loaded = False
+
+    # ---------- 查询 ----------
+
+    def get(self, device_id):
+        """根据 ID 获取设备，不存在返回 None"""
+        self._ensure_fresh()
+        return self._by_id.get(device_id)
+
+    def find_by_host(self, host):
+        """根据管理地址获取设备列表 (同一地址可能对应多个端口)"""
+        self._ensure_fresh()
+        return list(self._by_host.get(host, []))
+
+    def by_group(self, group):
+        self._ensure_fresh()
+        return list(self._by_group.get(group, []))
+
+    def all(self):
+        """全部设备，按 ID 排序"""
+        self._ensure_fresh()
+        return sorted(self._by_id.values(), key=lambda d: d['id'])
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._by_id)
+
+    # ---------- 写入 ----------
+
+    def add(self, data):
+        """
+        添加设备
+        :return: 新设备字典，失败返回 None
+        """
+        device_id = database.add_device(
+            data.get('name', ''), data.get('host', ''), port=data.get('port', 22),
+            username=data.get('username', ''), password=data.get('password', ''),
+            device_type=data.get('device_type', 'huawei_vrp'), group=data.get('group', 'default'),
+        )
+        self.invalidate()
+        return self.get(device_id) if device_id is not None else None
+
+    def update(self, device_id, data):
+        """
+        更新设备 (只更新 data 中出现的字段)
+        :return: 更新后的设备字典，失败返回 None
+        """
+        fields = {key: data[key] for key in ('name', 'host', 'port', 'username', 'password', 'device_type',
+                                             'group', 'status') if key in data}
+        ok = database.update_device(device_id, **fields)
+        self.invalidate()
+        return self.get(device_id) if ok else None
+
+    def set_status(self, device_id, status):
+        """更新单台设备的在线状态"""
+        self.set_statuses({device_id: status})
+
+    def set_statuses(self, statuses):
+        """
+        批量更新在线状态 (全网巡检结束时一次写库)
+        状态未变化的设备不写库，避免无谓地让所有 Worker 重新加载
+        :param statuses: {device_id: 'online' / 'offline'}
+        """
+        self._ensure_fresh()
+        changed = [(device_id, status) for device_id, status in statuses.items()
+                   if device_id in self._by_id and self._by_id[device_id].get('status') != status]
+        if changed and database.update_device_statuses(changed):
+            self.invalidate()
+
+    def delete(self, device_id):
+        ok = database.delete_device(device_id)
+        self.invalidate()
+        return ok
+
+    def seed(self, devices):
+        """设备表为空时写入初始设备 (首次启动的演示数据)"""
+        if len(self) > 0:
+            return 0
+        for device in devices:
+            new_id = database.add_device(
+                device['name'], device['host'], port=device.get('port', 22),
+                username=device.get('username', ''), password=device.get('password', ''),
+                device_type=device.get('device_type', 'huawei_vrp'), group=device.get('group', 'default'),
+            )
+            if new_id is not None and device.get('status'):
+                database.update_device(new_id, status=device['status'])
+        self.invalidate()
+        return len(devices)
+
+    def stats(self):
+        return {
+            "devices": len(self._by_id),
+            "version": self._version,
+            "reloads": self.reloads,
+        }
+
+
+# 进程级单例
+device_registry = DeviceRegistry()
@@ -0,0 +1,59 @@
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from colorama import Fore
+
+from app.database import create_job, mark_job_running, finish_job, get_job
+
+
+class JobRunner:
+    """
+    后台任务执行器
+    - submit() 只写一行 jobs 表并把任务放入线程池，立即返回任务 ID，Web 请求不再等待设备
+    - 任务状态 queued -> running -> success / error 与结果都保存在 SQLite，
+      任意 Worker 进程都能通过 get() 查询
+    - 任务类型通过 register(job_type, handler) 注册，handler(params) 返回可 JSON 序列化的结果，
+      抛出异常即任务失败
+    """
+
+    def __init__(self, max_workers=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="JobRunner")
+        self.handlers = {}
+
+    def register(self, job_type, handler):
+        self.handlers[job_type] = handler
+
+    def submit(self, job_type, params, device_id=None):
+        """
+        提交任务
+        :return: 任务 ID；任务类型未注册时抛出 ValueError，写库失败抛出 RuntimeError
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = uuid.uuid4().hex
+        if not create_job(job_id, job_type, params, device_id=device_id):
+            raise RuntimeError("Failed to create job")
+
+        self.executor.submit(self._run, job_id, job_type, params)
+        print(Fore.CYAN + f">>> [任务] 已提交 {job_type} 任务 {job_id}")
+        return job_id
+
+    def _run(self, job_id, job_type, params):
+        mark_job_running(job_id)
+        try:
+            result = self.handlers[job_type](params)
+        except Exception as e:
+            traceback.print_exc()
+            finish_job(job_id, 'error', error=str(e))
+            print(Fore.RED + f"!!! [任务] {job_type} 任务 {job_id} 失败: {e}")
+            return
+        finish_job(job_id, 'success', result=result)
+        print(Fore.GREEN + f"--- [任务] {job_type} 任务 {job_id} 完成 ---")
+
+    def get(self, job_id):
+        return get_job(job_id)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
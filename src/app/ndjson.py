@@ -0,0 +1,64 @@
+import json
+import zlib
+
+from flask import Response, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# 压缩流每累计这么多未压缩字节做一次 Z_SYNC_FLUSH，客户端可以边收边解压
+GZIP_FLUSH_BYTES = 64 * 1024
+
+
+def parse_fields(value):
+    """
+    解析 fields 投影参数
+    :param value: "interface,ip" 或 ["interface", "ip"]，字段名不区分大小写
+    :return: 小写字段名列表，不投影时返回 None
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [str(field).strip().lower() for field in value if str(field).strip()]
+    return fields or None
+
+
+def project_rows(rows, fields):
+    """只保留 fields 中的字段 (解析结果的字段名已统一为小写)"""
+    if not fields or not isinstance(rows, list):
+        return rows
+    return [{field: row[field] for field in fields if field in row} for row in rows]
+
+
+def wants_ndjson(options):
+    """请求体 format=ndjson 或 Accept: application/x-ndjson 时使用 NDJSON 流式响应"""
+    if str(options.get('format', '')).lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip 格式
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= GZIP_FLUSH_BYTES:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def ndjson_response(items):
+    """
+    把对象序列编码为 NDJSON 流式响应 (每个对象一行，边生成边发送)
+    客户端 Accept-Encoding 包含 gzip 时压缩输出
+    :param items: 可迭代对象 (通常是生成器)
+    """
+    chunks = ((json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8') for item in items)
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        chunks = _gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype=NDJSON_MIMETYPE, headers=headers)
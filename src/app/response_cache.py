@@ -0,0 +1,84 @@
+import functools
+import threading
+import time
+
+from flask import Response, make_response, request
+
+
+class ResponseCache:
+    """
+    进程内 TTL 响应缓存 (仪表板、命令目录等被前端频繁轮询的只读接口)
+    - cached(ttl, tags) 装饰 Flask 视图，按 路径 + 查询串 缓存成功响应的响应体
+    - 条目在 ttl 秒后过期；invalidate(tag) 立即清除依赖该数据的条目 (由数据库写入事件触发)
+    - 其它 Worker 进程的写入不会通知本进程，最多 ttl 秒后自然过期
+    - 按路由统计 hits / misses / invalidations，见 stats()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}      # (路由名, full_path) -> (过期时间, 响应体, 状态码, mimetype, tags)
+        self._counters = {}     # 路由名 -> {'hits', 'misses', 'invalidations'}
+        # 每次失效加一；视图计算期间发生过失效时不写入缓存，避免把旧数据存回去
+        self._generation = 0
+
+    def _counter(self, name):
+        return self._counters.setdefault(name, {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def cached(self, ttl, tags=()):
+        """
+        视图装饰器
+        :param ttl: 缓存秒数
+        :param tags: 响应依赖的数据 ('devices' / 'logs')，对应数据写入时失效
+        """
+        tags = frozenset(tags)
+
+        def decorator(view):
+            name = view.__name__
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (name, request.full_path)
+                now = time.monotonic()
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry and entry[0] > now:
+                        self._counter(name)['hits'] += 1
+                        _, body, status, mimetype, _ = entry
+                        return Response(body, status=status, mimetype=mimetype, headers={'X-Cache': 'HIT'})
+                    self._counter(name)['misses'] += 1
+                    generation = self._generation
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    with self._lock:
+                        if generation == self._generation:
+                            self._entries[key] = (time.monotonic() + ttl, response.get_data(), response.status_code,
+                                                  response.mimetype, tags)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, *tags):
+        """清除依赖任一 tag 的条目；不传 tag 时清空全部"""
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                if not tags or entry[4] & set(tags):
+                    del self._entries[key]
+                    self._counter(key[0])['invalidations'] += 1
+
+    def stats(self):
+        """各路由的命中统计与当前条目数"""
+        with self._lock:
+            routes = {}
+            for name, counter in self._counters.items():
+                lookups = counter['hits'] + counter['misses']
+                routes[name] = dict(counter, hit_rate=round(counter['hits'] / lookups, 4) if lookups else 0.0)
+            return {"entries": len(self._entries), "routes": routes}
+
+
+# 进程级单例
+response_cache = ResponseCache()
@@ -0,0 +1,147 @@
+"""
+TextFSM 解析结果 -> 结构化结果表的映射
+
+每张表声明:
+- command: 命令正则 (规范化为小写单空格后 search，允许 VRP 缩写如 dis int br)
+- match: 识别字段组，解析结果的表头 (小写) 包含其中任意一组全部字段才归入该表，
+  命令匹配但模板字段对不上的输出 (如没有状态列的接口计数) 不写入
+- columns: 表列 -> 候选表头 (不同平台模板的同义字段，取第一个存在的)
+表按 TYPED_TABLES 的顺序匹配
+"""
+import re
+
+TYPED_TABLES = {
+    'routes': {
+        'command': r'\bip(?:v6)?\s+rou|^\S+\s+route\b',
+        'table': 'result_routes',
+        'match': (('network', 'prefix_length'), ('destination', 'prefix_length')),
+        'columns': {
+            'vrf': ('vrf', 'vpn_instance'),
+            'network': ('network', 'destination'),
+            'prefix_length': ('prefix_length',),
+            'protocol': ('protocol',),
+            'next_hop': ('next_hop', 'nexthop_ip', 'nexthop', 'neighbour'),
+            'interface': ('interface', 'nexthop_if'),
+            'distance': ('distance', 'preference'),
+            'metric': ('metric', 'cost'),
+        },
+    },
+    'mac': {
+        'command': r'\bmac[-_ ]?a',
+        'table': 'result_mac',
+        'match': (('destination_address',), ('mac_address', 'vlan_id', 'destination_port')),
+        'columns': {
+            'mac_address': ('destination_address', 'mac_address'),
+            'vlan_id': ('vlan_id', 'vlan'),
+            'interface': ('destination_port', 'port', 'interface'),
+            'type': ('type',),
+        },
+    },
+    'arp': {
+        'command': r'\barp\b',
+        'table': 'result_arp',
+        'match': (('ip_address', 'mac_address', 'type'), ('address', 'mac_address', 'type')),
+        'columns': {
+            'ip_address': ('ip_address', 'address'),
+            'mac_address': ('mac_address',),
+            'interface': ('interface',),
+            'type': ('type',),
+            'vlan_id': ('vlan_id',),
+            'age': ('expire', 'age'),
+            'vrf': ('vpn_instance', 'vrf'),
+        },
+    },
+    'vlans': {
+        'command': r'^\S+\s+vl',
+        'table': 'result_vlans',
+        'match': (('vlan_id', 'vlan_name'), ('vlan_id', 'vlan_status'), ('vlan_id', 'vlan_type')),
+        'columns': {
+            'vlan_id': ('vlan_id',),
+            'name': ('vlan_name', 'name', 'vlan_description'),
+            'status': ('vlan_status', 'status'),
+            'type': ('vlan_type',),
+            'interfaces': ('interfaces', 'interface'),
+        },
+    },
+    'interfaces': {
+        'command': r'^\S+\s+(?:ip\s+|ipv4\s+)?int',
+        'table': 'result_interfaces',
+        'match': (('interface', 'phy'), ('interface', 'physical'), ('interface', 'status'),
+                  ('interface', 'link_status'), ('port', 'status')),
+        'columns': {
+            'interface': ('interface', 'port'),
+            'status': ('phy', 'physical', 'link_status', 'status'),
+            'protocol': ('protocol', 'proto', 'protocol_status'),
+            'ip_address': ('ip_address',),
+            'description': ('interface_description', 'description', 'name'),
+            'vlan_id': ('vlan_id',),
+            'speed': ('speed',),
+            'duplex': ('duplex',),
+            'mtu': ('mtu',),
+            'in_errors': ('inerrors', 'input_errors'),
+            'out_errors': ('outerrors', 'output_errors'),
+        },
+    },
+}
+
+# 存为 INTEGER 的列 (模板输出的是字符串)
+INTEGER_COLUMNS = {'prefix_length', 'distance', 'metric', 'vlan_id', 'mtu', 'in_errors', 'out_errors'}
+
+
+_COMMAND_PATTERNS = {kind: re.compile(spec['command']) for kind, spec in TYPED_TABLES.items()}
+
+
+def classify(command, headers):
+    """
+    根据命令与解析结果的表头判断归属的结构化表
+    :param headers: 小写字段名集合
+    :return: TYPED_TABLES 中的键，无匹配返回 None
+    """
+    command = ' '.join(str(command).lower().split())
+    for kind, spec in TYPED_TABLES.items():
+        if _COMMAND_PATTERNS[kind].search(command) and any(headers.issuperset(group) for group in spec['match']):
+            return kind
+    return None
+
+
+def _value(raw, column):
+    if isinstance(raw, list):   # TextFSM List 类型的字段
+        raw = ','.join(str(item) for item in raw if item != '')
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    if raw == '':
+        return None
+    if column in INTEGER_COLUMNS:
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def extract(command, result):
+    """
+    把 TextFSM 解析结果转换为结构化表的行
+    :param command: 执行的命令
+    :param result: 解析结果 (字典列表，字段名小写)；其它类型直接返回 None
+    :return: (kind, 列名元组, [行元组, ...])，无法归类时返回 None
+    """
+    if not isinstance(result, list) or not result or not isinstance(result[0], dict):
+        return None
+    headers = set(result[0])
+    kind = classify(command, headers)
+    if kind is None:
+        return None
+
+    # 每列取第一个实际存在的候选表头，没有的列不写
+    sources = {}
+    for column, candidates in TYPED_TABLES[kind]['columns'].items():
+        for header in candidates:
+            if header in headers:
+                sources[column] = header
+                break
+    columns = tuple(sources)
+    rows = [tuple(_value(row.get(sources[column]), column) for column in columns)
+            for row in result if isinstance(row, dict)]
+    return kind, columns, rows
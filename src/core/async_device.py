@@ -0,0 +1,303 @@
+import asyncio
+import os
+import time
+
+from colorama import Fore
+
+# asyncssh 为可选依赖：只有使用 AsyncNetworkDevice 时才需要安装
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None
+
+# 引入日志模块
+from utils.logger import setup_logger
+from core.template_cache import template_registry
+from core.output_buffer import OutputCleaner
+from core.prompt_matcher import PromptMatcher, extract_hostname, prompt_view
+from core.ssh_client import (PAGING_DISABLE_COMMANDS, PING_TEMPLATE_PATH, RETURN_COMMANDS, build_ping_command,
+                             extract_prompt, has_error, trim_output)
+
+# 所有异步会话共用一个 logger (数千个会话各开一个日志文件句柄会耗尽 fd)
+logger = setup_logger("AsyncDevice")
+
+
+class AsyncNetworkDevice:
+    """
+    asyncio 版网络设备驱动
+    接口与 NetworkDevice 一致 (connect / execute_command / execute_commands /
+    get_output_with_template / configure / ping_test)，但全部是协程。
+    基于 asyncssh，一个事件循环即可同时驱动成千上万个交互式 Shell，不再一会话一线程。
+    """
+
+    def __init__(self, host, username, password, port=22, timeout=10, device_type='huawei_vrp',
+                 disable_paging=True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.device_type = device_type
+        self.disable_paging = disable_paging
+        self.logger = logger
+
+        # 内部变量
+        self.conn = None
+        self.stdin = None
+        self.stdout = None
+        self.base_prompt = None
+        # 最近一次命令结束时的提示符，当前视图由它判断 (与 NetworkDevice 一致)
+        self.current_prompt = None
+        self.paging_disabled = False
+        self.last_prompt_scan_bytes = 0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def connect(self):
+        """建立 SSH 连接并打开交互式 Shell"""
+        if asyncssh is None:
+            raise ImportError("AsyncNetworkDevice 需要 asyncssh: pip install asyncssh")
+
+        print(Fore.YELLOW + f"--- [连接] 正在连接到 {self.host} ... ---")
+        self.logger.info(f"Connecting to {self.host}:{self.port}")
+
+        try:
+            # known_hosts=None 等价于 paramiko 的 AutoAddPolicy；不使用本地密钥和 agent
+            self.conn = await asyncssh.connect(
+                self.host, port=self.port,
+                username=self.username, password=self.password,
+                known_hosts=None, client_keys=None, agent_path=None,
+                connect_timeout=self.timeout
+            )
+            self.stdin, self.stdout, _ = await self.conn.open_session(
+                term_type='vt100', term_size=(200, 24), encoding=None
+            )
+
+            # 自动探测并保存基础提示符
+            initial_output = await self._read_until([b'>', b']', b'#'])
+            self.base_prompt = extract_prompt(initial_output)
+            self.current_prompt = self.base_prompt
+            self.logger.info(f"SSH Connection Established: {self.host}")
+            print(Fore.GREEN + f"--- [成功] 已连接到 {self.host} (提示符: {self.base_prompt}) ---")
+
+            if self.disable_paging:
+                await self._disable_paging()
+
+        except Exception as e:
+            self.logger.error(f"Connection to {self.host} failed: {e}")
+            print(Fore.RED + f"!!! 连接失败: {e}")
+            raise
+
+    async def _disable_paging(self):
+        """会话级关闭分页，设备拒绝时回退到自动翻页"""
+        command = PAGING_DISABLE_COMMANDS.get(self.device_type)
+        if not command:
+            return False
+
+        output = await self.execute_command(command)
+        self.paging_disabled = not has_error(output)
+        if not self.paging_disabled:
+            self.logger.info(f"{self.host} rejected '{command}', fall back to More handling")
+        return self.paging_disabled
+
+    async def _recv(self, timeout):
+        """读取一块数据；超时返回 None，通道关闭返回 b''"""
+        try:
+            return await asyncio.wait_for(self.stdout.read(65535), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _read_until(self, expected_list, timeout=None):
+        """读取数据直到遇到任意一个预期的字符串"""
+        if isinstance(expected_list, (bytes, str)):
+            expected_list = [expected_list]
+        if timeout is None:
+            timeout = self.timeout
+
+        buffer = bytearray()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            data = await self._recv(remaining)
+            if not data:
+                break
+
+            search_from = len(buffer)
+            buffer += data
+            for expected in expected_list:
+                if buffer.find(expected, max(0, search_from - len(expected) + 1)) != -1:
+                    return buffer.decode('utf-8', errors='ignore')
+
+        return buffer.decode('utf-8', errors='ignore')
+
+    async def execute_command(self, command, expect_prompt=None, any_host=False):
+        """
+        执行单条命令并返回清洗后的文本
+        :param any_host: 提示符不限定主机名 (配置命令可能用 sysname 改掉主机名)
+        """
+        matcher = PromptMatcher.for_device(self.device_type, None if any_host else self.base_prompt, expect_prompt)
+
+        print(Fore.CYAN + f">>> [{self.host}] 发送命令: {command}")
+        self.logger.info(f"[{self.host}] Execute: {command}")
+
+        self.stdin.write(command.encode('utf-8') + b'\n')
+
+        cleaner = OutputCleaner()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            chunk = await self._recv(remaining)
+            if not chunk:
+                break
+
+            pages_before = cleaner.pages
+            cleaner.feed(chunk)
+            prompt_seen = matcher.feed(chunk)
+
+            if cleaner.pages > pages_before:
+                self.stdin.write(b' ')
+            elif prompt_seen:
+                break
+
+        cleaner.finish()
+        self.last_prompt_scan_bytes = matcher.bytes_examined
+        self._note_prompt(matcher.trailing_line() if matcher.match else None)
+        return trim_output(cleaner.getvalue(), command)
+
+    async def execute_commands(self, commands, pipeline=False, window=8):
+        """
+        执行多个命令
+        :param pipeline: 与 NetworkDevice 接口保持一致；异步驱动靠多会话并发提高吞吐，单会话内始终逐条执行
+        :return: [{'command', 'output', 'status'}]，status 按每条命令的输出单独判断
+        """
+        results = []
+        for cmd in commands:
+            result = await self.execute_command(cmd)
+            results.append({
+                'command': cmd,
+                'output': result,
+                'status': 'error' if has_error(result) else 'success'
+            })
+        return results
+
+    def _note_prompt(self, prompt):
+        """记录命令结束时的提示符 (同 NetworkDevice._note_prompt)，sysname 改名后同步 base_prompt"""
+        view = prompt_view(prompt, self.device_type)
+        self.current_prompt = prompt if view else None
+        if view == 'user' and extract_hostname(prompt) != extract_hostname(self.base_prompt):
+            self.base_prompt = prompt
+
+    def current_view(self):
+        """
+        由最近一次回显的提示符判断当前视图
+        :return: 'user' / 'system' / 'sub'，未知 (超时) 时返回 None
+        """
+        return prompt_view(self.current_prompt, self.device_type, extract_hostname(self.base_prompt))
+
+    @property
+    def in_system_view(self):
+        return self.current_view() == 'system'
+
+    async def enter_system_view(self):
+        """进入系统视图 (已在系统视图时直接返回；在子视图时先回到用户视图)"""
+        view = self.current_view()
+        if view == 'system':
+            return ''
+        if view != 'user':
+            await self.return_to_user_view()
+        return await self.execute_command("system-view")
+
+    async def exit_system_view(self):
+        """退出系统视图"""
+        return await self.execute_command("quit")
+
+    async def return_to_user_view(self):
+        """
+        从任意视图回到用户视图 (华为 return / 思科 end)
+        :return: 已回到用户视图返回 True
+        """
+        if self.current_view() != 'user':
+            await self.execute_command(RETURN_COMMANDS.get(self.device_type, 'return'), any_host=True)
+        return self.current_view() == 'user'
+
+    async def _parse(self, template_path, raw_output):
+        """TextFSM 解析是 CPU 密集操作，放到线程池执行，避免阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, template_registry.parse, template_path, raw_output)
+
+    async def get_output_with_template(self, command, template_path):
+        """
+        执行命令并使用指定的 TextFSM 模板解析
+        :return: 字典列表 (List[Dict])；模板不存在返回 {"error": ...}；解析失败返回原始文本
+        """
+        raw_output = await self.execute_command(command)
+
+        if not os.path.exists(template_path):
+            self.logger.error(f"Template not found: {template_path}")
+            return {"error": f"Template not found: {template_path}"}
+
+        try:
+            parsed_data = await self._parse(template_path, raw_output)
+            print(Fore.GREEN + f"--- [解析] {self.host} 成功解析 {len(parsed_data)} 条数据 (Template: {os.path.basename(template_path)}) ---")
+            return parsed_data
+        except Exception as e:
+            self.logger.error(f"[{self.host}] TextFSM Parse Error: {e}")
+            print(Fore.RED + f"!!! 解析失败: {e}")
+            return raw_output
+
+    async def configure(self, config_commands, pipeline=False, window=8):
+        """
+        进入系统视图并执行配置命令
+        :param pipeline: 与 NetworkDevice 接口保持一致，异步驱动逐条执行
+        :return: [{'command', 'output', 'status'}]
+        """
+        print(Fore.CYAN + f">>> [{self.host}] 进入系统视图并执行配置...")
+        await self.enter_system_view()
+
+        results = []
+        for cmd in config_commands:
+            # 按平台提示符匹配：return / quit 回到用户视图、sysname 改名后都能识别
+            result = await self.execute_command(cmd, any_host=True)
+            results.append({
+                'command': cmd,
+                'output': result,
+                'status': 'error' if has_error(result) else 'success'
+            })
+
+        print(Fore.GREEN + f">>> [{self.host}] 配置完成，共执行 {len(config_commands)} 条命令")
+        return results
+
+    async def ping_test(self, target_ip, count=5, timeout=5, size=None):
+        """
+        通过设备执行ping测试
+        :return: 解析后的ping结果；出错时返回带 error / raw_output 的字典
+        """
+        ping_cmd = build_ping_command(target_ip, count=count, timeout=timeout, size=size)
+        self.logger.info(f"Ping test from {self.host} to {target_ip}")
+        raw_output = await self.execute_command(ping_cmd)
+
+        if not os.path.exists(PING_TEMPLATE_PATH):
+            self.logger.error(f"Template not found: {PING_TEMPLATE_PATH}")
+            return {"error": f"Template not found: {PING_TEMPLATE_PATH}", "raw_output": raw_output}
+
+        try:
+            return await self._parse(PING_TEMPLATE_PATH, raw_output)
+        except Exception as e:
+            self.logger.error(f"[{self.host}] TextFSM Parse Error: {e}")
+            return {"error": f"Parsing error: {e}", "raw_output": raw_output}
+
+    async def close(self):
+        if self.conn:
+            self.conn.close()
+            await self.conn.wait_closed()
+            self.conn = None
+            print(Fore.YELLOW + f"--- [断开] {self.host} 连接已关闭 ---")
@@ -0,0 +1,313 @@
+import asyncio
+import ipaddress
+import itertools
+import os
+import re
+import socket
+import struct
+import time
+
+from colorama import Fore
+
+# 单次巡检最多展开的地址数 (防止误传 /8 之类的大网段)
+MAX_SWEEP_TARGETS = 4096
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# 同一进程内每次巡检使用不同的 ICMP identifier
+_sweep_ids = itertools.count()
+
+PING_SUMMARY = re.compile(r'(\d+) packets transmitted, (\d+) received, ([\d.]+)% packet loss')
+PING_RTT = re.compile(r'rtt min/avg/max/mdev = ([\d.]+)/([\d.]+)/([\d.]+)/')
+
+
+def expand_targets(targets, limit=MAX_SWEEP_TARGETS):
+    """
+    规范化巡检目标
+    :param targets: 字符串 (IP / 主机名 / CIDR) 或 {"ip": ..., "name": ...}；CIDR 展开为其中的主机地址
+    :return: [(显示名, 地址)]，地址为空表示目标无效；展开后超过 limit 个时抛出 ValueError
+    """
+    expanded = []
+    for target in targets:
+        if isinstance(target, dict):
+            ip = str(target.get('ip', '')).strip()
+            name = target.get('name', ip)
+        else:
+            ip = str(target).strip()
+            name = ip
+
+        if '/' in ip:
+            try:
+                network = ipaddress.ip_network(ip, strict=False)
+            except ValueError:
+                expanded.append((name, ''))
+                continue
+            if network.num_addresses > limit:
+                raise ValueError(f"Network {ip} is too large to sweep (limit {limit} addresses)")
+            # /31、/32 没有网络地址与广播地址之分，hosts() 会返回全部地址
+            expanded.extend((str(host), str(host)) for host in network.hosts())
+        else:
+            expanded.append((name, ip))
+
+        if len(expanded) > limit:
+            raise ValueError(f"Too many targets to sweep (limit {limit})")
+    return expanded
+
+
+def parse_ping_output(output):
+    """解析 Linux ping 的统计行，字段与 /api/ping/direct 一致"""
+    stats = {}
+    match = PING_SUMMARY.search(output)
+    if match:
+        stats.update({
+            "packets_transmitted": int(match.group(1)),
+            "packets_received": int(match.group(2)),
+            "packet_loss": float(match.group(3))
+        })
+    match = PING_RTT.search(output)
+    if match:
+        stats.update({
+            "rtt_min": float(match.group(1)),
+            "rtt_avg": float(match.group(2)),
+            "rtt_max": float(match.group(3))
+        })
+    return stats
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident, seq, payload):
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def open_icmp_socket():
+    """
+    打开 ICMP 套接字：优先使用无需 root 的 ICMP 数据报套接字 (net.ipv4.ping_group_range)，
+    其次是原始套接字 (root / CAP_NET_RAW)
+    :return: (socket, 是否为原始套接字)，都不可用时返回 (None, False)
+    """
+    for sock_type, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        return sock, raw
+    return None, False
+
+
+class IcmpSweeper:
+    """
+    并发 ICMP 巡检引擎 (asyncio)
+    - 所有目标共用一个 ICMP 套接字，按 (源地址, 序号) 把回包分发给对应的探测，
+      500 个目标的耗时约等于单个目标的耗时，而不是逐个 ping 的总和
+    - 没有 ICMP 套接字权限时退回到子进程 ping，最多同时运行 concurrency 个进程
+    - 结果字段与 /api/ping/direct 一致: target_ip, reachable, packets_transmitted,
+      packets_received, packet_loss, rtt_min, rtt_avg, rtt_max
+    """
+
+    def __init__(self, count=3, timeout=5, interval=0.2, concurrency=256, payload_size=56):
+        """
+        :param count: 每个目标发送的探测包数
+        :param timeout: 最后一个探测包发出后等待回包的秒数 (与 ping -W 相同)
+        :param interval: 同一目标两个探测包之间的间隔 (秒)
+        :param concurrency: 同时探测的目标数上限
+        """
+        self.count = count
+        self.timeout = timeout
+        self.interval = interval
+        self.concurrency = concurrency
+        self.payload = bytes(i & 0xFF for i in range(payload_size))
+        self.backend = None
+
+    # ---------- 对外接口 ----------
+
+    def sweep(self, targets):
+        """同步入口 (在 Flask 工作线程中调用，每次使用独立的事件循环)"""
+        return asyncio.run(self.sweep_async(targets))
+
+    async def sweep_async(self, targets):
+        """
+        :param targets: 见 expand_targets
+        :return: 结果列表，顺序与展开后的目标一致，每项额外带 target (显示名)
+        """
+        expanded = expand_targets(targets)
+        start = time.perf_counter()
+
+        sock, raw = open_icmp_socket()
+        if sock is not None:
+            self.backend = 'raw_socket' if raw else 'dgram_socket'
+            try:
+                results = await self._sweep_socket(expanded, sock, raw)
+            finally:
+                sock.close()
+        else:
+            self.backend = 'subprocess'
+            results = await self._sweep_subprocess(expanded)
+
+        reachable = sum(1 for r in results if r['reachable'])
+        print(Fore.CYAN + f">>> [ICMP] {len(results)} 个目标巡检完成 ({self.backend})，"
+                          f"可达 {reachable} 个，耗时 {time.perf_counter() - start:.2f}s")
+        return results
+
+    # ---------- ICMP 套接字 ----------
+
+    async def _sweep_socket(self, expanded, sock, raw):
+        loop = asyncio.get_running_loop()
+        # 数据报套接字由内核改写 identifier 并只投递本套接字的回包；
+        # 原始套接字会收到本机所有 ICMP，需要按 identifier 过滤 (同进程内并发的巡检各用一个)
+        ident = (os.getpid() + next(_sweep_ids)) & 0xFFFF
+        seqs = itertools.count()
+        waiters = {}
+
+        def on_readable():
+            while True:
+                try:
+                    packet, (addr, _) = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    continue
+                received = time.perf_counter()
+                if raw:
+                    # 原始套接字收到的数据包含 IP 头
+                    packet = packet[(packet[0] & 0x0F) * 4:]
+                if len(packet) < 8:
+                    continue
+                icmp_type, _, _, reply_ident, seq = struct.unpack('!BBHHH', packet[:8])
+                if icmp_type != ICMP_ECHO_REPLY or (raw and reply_ident != ident):
+                    continue
+                waiter = waiters.pop((addr, seq), None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(received)
+
+        writable = []   # 等待发送缓冲区可写的探测
+
+        def on_writable():
+            loop.remove_writer(sock.fileno())
+            for future in writable:
+                if not future.done():
+                    future.set_result(None)
+            writable.clear()
+
+        async def sendto(data, addr):
+            # 非阻塞 sendto，发送缓冲区满时等到可写再重试 (loop.sock_sendto 在 Python 3.11 才加入)
+            while True:
+                try:
+                    return sock.sendto(data, addr)
+                except (BlockingIOError, InterruptedError):
+                    if not writable:
+                        loop.add_writer(sock.fileno(), on_writable)
+                    future = loop.create_future()
+                    writable.append(future)
+                    await future
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe(name, ip):
+            async with semaphore:
+                result = await self._probe_socket(loop, sendto, ident, seqs, waiters, ip)
+            result['target'] = name
+            return result
+
+        loop.add_reader(sock.fileno(), on_readable)
+        try:
+            return await asyncio.gather(*(probe(name, ip) for name, ip in expanded))
+        finally:
+            loop.remove_reader(sock.fileno())
+            loop.remove_writer(sock.fileno())
+
+    async def _probe_socket(self, loop, sendto, ident, seqs, waiters, target_ip):
+        if not target_ip:
+            return self._result(target_ip, error='Invalid target IP')
+        try:
+            infos = await loop.getaddrinfo(target_ip, None, family=socket.AF_INET)
+            addr = infos[0][4][0]
+        except (OSError, UnicodeError) as e:
+            return self._result(target_ip, error=str(e))
+
+        probes = []
+        for i in range(self.count):
+            if i:
+                await asyncio.sleep(self.interval)
+            # 序号在整个巡检中唯一 (16 位回绕)，(地址, 序号) 即可定位探测
+            seq = next(seqs) & 0xFFFF
+            waiter = loop.create_future()
+            waiters[(addr, seq)] = waiter
+            sent = time.perf_counter()
+            try:
+                await sendto(_echo_request(ident, seq, self.payload), (addr, 0))
+            except OSError:
+                # 无路由等错误按丢包处理 (与 ping 一致)
+                waiters.pop((addr, seq), None)
+                waiter.cancel()
+            probes.append((seq, sent, waiter))
+
+        pending = [waiter for _, _, waiter in probes if not waiter.cancelled()]
+        if pending:
+            await asyncio.wait(pending, timeout=self.timeout)
+
+        rtts = []
+        for seq, sent, waiter in probes:
+            if waiter.done() and not waiter.cancelled():
+                rtts.append((waiter.result() - sent) * 1000)
+            else:
+                waiters.pop((addr, seq), None)
+                waiter.cancel()
+        return self._result(target_ip, transmitted=self.count, rtts=rtts)
+
+    def _result(self, target_ip, transmitted=0, rtts=(), error=None):
+        received = len(rtts)
+        result = {
+            'target_ip': target_ip,
+            'reachable': received > 0,
+            'packets_transmitted': transmitted,
+            'packets_received': received,
+            'packet_loss': round((transmitted - received) * 100.0 / transmitted, 1) if transmitted else 100.0,
+            'rtt_min': round(min(rtts), 3) if rtts else None,
+            'rtt_avg': round(sum(rtts) / received, 3) if rtts else None,
+            'rtt_max': round(max(rtts), 3) if rtts else None,
+        }
+        if error:
+            result['error'] = error
+        return result
+
+    # ---------- 子进程回退 ----------
+
+    async def _sweep_subprocess(self, expanded):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe(name, ip):
+            async with semaphore:
+                result = await self._probe_subprocess(ip)
+            result['target'] = name
+            return result
+
+        return await asyncio.gather(*(probe(name, ip) for name, ip in expanded))
+
+    async def _probe_subprocess(self, target_ip):
+        if not target_ip:
+            return self._result(target_ip, error='Invalid target IP')
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'ping', '-n', '-c', str(self.count), '-i', str(self.interval), '-W', str(self.timeout), target_ip,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+            stdout, _ = await process.communicate()
+        except OSError as e:
+            return self._result(target_ip, error=str(e))
+
+        stats = parse_ping_output(stdout.decode('utf-8', errors='ignore'))
+        result = self._result(target_ip, transmitted=stats.get('packets_transmitted', self.count))
+        result.update(stats)
+        result['reachable'] = process.returncode == 0
+        return result
@@ -3,9 +3,14 @@ import sys
 import time
 import logging
 import os
-import re
 from colorama import init, Fore, Style
 
+# 兼容两种导入方式: 从 src 目录导入 core 包，或直接把 core 目录加入 sys.path
+try:
+    from core.output_buffer import clean_text
+except ImportError:
+    from output_buffer import clean_text
+
 # 尝试导入 ntc_templates
 # 如果通过 pip 安装了，这里直接能用
 # 如果是 clone 的代码，下面会尝试动态添加路径
@@ -135,7 +140,8 @@ class VisualSSH:
 
         self.write(command_bytes)
 
-        full_output = b''
+        # bytearray 原地追加，避免 bytes += chunk 在大输出时的二次复制
+        full_output = bytearray()
         space_to_send = (b' ' * space_count)
 
         while True:
@@ -167,13 +173,8 @@ class VisualSSH:
         return full_output.decode('utf-8', errors='ignore')
 
     def _clean_data(self, raw_data):
-        """清洗数据：去除颜色代码、More、退格符"""
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        data = ansi_escape.sub('', raw_data)
-        data = data.replace('---- More ----', '')
-        data = data.replace('\x08', '') 
-        data = data.replace('  \x1b[16D                                          \x1b[16D', '')
-        return data
+        """清洗数据：单遍去除颜色代码、More、退格符"""
+        return clean_text(raw_data)
 
     def execute_and_parse(self, command, platform='huawei_vrp'):
         """
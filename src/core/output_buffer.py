@@ -0,0 +1,90 @@
+import codecs
+import re
+
+# 单次扫描同时匹配：ANSI 转义序列 / 华为分页标记 / 退格符
+ANSI_ESCAPE = r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])'
+PAGE_BREAK = '---- More ----'
+CLEAN_PATTERN = re.compile(f'{ANSI_ESCAPE}|{re.escape(PAGE_BREAK)}|\x08')
+ESCAPE_PATTERN = re.compile(ANSI_ESCAPE)
+
+# 转义序列在 chunk 边界被截断时，最多回看这么多字符寻找未完成的 ESC
+MAX_ESCAPE_LEN = 64
+
+
+def clean_text(text):
+    """一次性清洗整段文本 (去除 ANSI 颜色代码、分页标记、退格符)"""
+    return CLEAN_PATTERN.sub('', text)
+
+
+class OutputCleaner:
+    """
+    流式输出累加器 + 清洗器
+    - 每收到一个 chunk 就增量解码、单遍清洗，结果追加到列表，最后一次 join，整体线性复杂度
+      (取代 bytes += chunk 的二次复制，以及结束后多轮整串正则替换)
+    - 被 chunk 边界截断的转义序列 / 分页标记 / UTF-8 多字节字符会暂存到下一个 chunk 再处理
+    - pages 统计已经完整出现的 ---- More ---- 次数，调用方据此决定是否翻页
+    """
+
+    def __init__(self, keep=True):
+        """
+        :param keep: 是否保留全部清洗结果供 getvalue() 使用；流式转发时传 False，只返回增量片段，内存不随输出增长
+        """
+        self.keep = keep
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._pending = ''
+        self._parts = []
+        self.pages = 0
+        self.raw_bytes = 0
+
+    def _safe_cut(self, text):
+        """返回可以安全清洗的前缀长度：末尾可能未完整的 ESC 序列或分页标记留待下次"""
+        cut = len(text)
+
+        esc = text.rfind('\x1b', max(0, cut - MAX_ESCAPE_LEN))
+        if esc != -1:
+            if ESCAPE_PATTERN.match(text, esc) is None:
+                # 转义序列还没收完整
+                cut = esc
+
+        # 末尾可能是半个分页标记，但不能切进已经完整出现的分页标记
+        last_full = text.rfind(PAGE_BREAK, max(0, cut - 2 * len(PAGE_BREAK)), cut)
+        floor = last_full + len(PAGE_BREAK) if last_full != -1 else 0
+        for k in range(min(len(PAGE_BREAK) - 1, cut - floor), 0, -1):
+            if text.endswith(PAGE_BREAK[:k], 0, cut):
+                cut -= k
+                break
+
+        return cut
+
+    def feed(self, chunk):
+        """
+        追加一个原始 chunk (bytes)
+        :return: 本次新增的、已清洗的文本片段
+        """
+        self.raw_bytes += len(chunk)
+        text = self._pending + self._decoder.decode(chunk)
+        cut = self._safe_cut(text)
+        self._pending = text[cut:]
+
+        ready = text[:cut]
+        self.pages += ready.count(PAGE_BREAK)
+        cleaned = CLEAN_PATTERN.sub('', ready)
+        if cleaned and self.keep:
+            self._parts.append(cleaned)
+        return cleaned
+
+    def finish(self):
+        """输出结束：冲刷暂存的尾部数据，返回最后一段清洗后的文本"""
+        text = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        self.pages += text.count(PAGE_BREAK)
+        cleaned = CLEAN_PATTERN.sub('', text)
+        if cleaned and self.keep:
+            self._parts.append(cleaned)
+        return cleaned
+
+    def getvalue(self):
+        """返回目前为止全部清洗后的文本 (不含暂存的尾部)"""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
@@ -0,0 +1,75 @@
+from core.prompt_matcher import compile_prompt_line, extract_hostname
+
+# 提示符最长不会超过这个长度，跨 chunk 查找边界时只需回看这么多已收到的文本
+PROMPT_LOOKBACK = 256
+
+
+class PipelineSplitter:
+    """
+    流水线输出切分器
+    多条命令提前写入同一个 Shell 后，设备返回的是一条连续的文本流:
+        cmd1 回显 / cmd1 输出 / 提示符 cmd2 回显 / cmd2 输出 / 提示符 cmd3 回显 ...
+    按 "行首提示符 + 紧跟下一条命令的回显" 切分回每条命令各自的输出；
+    下一条命令尚未发送 (或已是最后一条) 时，要求提示符位于当前输出末尾。
+    前提：设备在 CLI 读取预输入的命令行时才回显 (VRP / Comware / IOS 均如此)。
+    """
+
+    def __init__(self, commands, device_type, base_prompt=None, echo_prefix=24):
+        self.commands = list(commands)
+        self.echo_prefix = echo_prefix
+        self.hostname = extract_hostname(base_prompt)
+        self.device_type = device_type
+        self.sent = 0
+        self.index = 0
+        self._pieces = []
+        self._tail = ''
+        self._patterns = {}
+        if compile_prompt_line(device_type, self.hostname) is None:
+            raise ValueError(f"Pipelining is not supported for {device_type}")
+
+    @property
+    def done(self):
+        return self.index >= len(self.commands)
+
+    def _boundary(self):
+        """当前命令结束边界的正则 (按 "下一条命令回显前缀" 缓存)"""
+        next_index = self.index + 1
+        follow = None
+        if next_index < self.sent:
+            follow = self.commands[next_index].strip()[:self.echo_prefix] or None
+        if follow not in self._patterns:
+            self._patterns[follow] = compile_prompt_line(self.device_type, self.hostname, follow)
+        return self._patterns[follow]
+
+    def feed(self, text):
+        """
+        追加一段已清洗的文本
+        :return: 本次完成的命令列表 [(下标, 含尾部提示符的原始输出)]
+        """
+        finished = []
+        while text and not self.done:
+            region = self._tail + text
+            match = self._boundary().search(region)
+            if match is None:
+                self._pieces.append(text)
+                self._tail = region[-PROMPT_LOOKBACK:]
+                break
+
+            # 只在找到边界时拼接一次当前命令的全部输出
+            segment = ''.join(self._pieces) + text
+            base = len(segment) - len(region)
+            finished.append((self.index, segment[:base + match.end()]))
+            text = segment[base + match.end():]
+            self.index += 1
+            self._pieces = []
+            self._tail = ''
+        return finished
+
+    def finish(self):
+        """超时/通道关闭时调用：返回当前未完成命令已收到的部分输出"""
+        if self.done:
+            return None
+        partial = ''.join(self._pieces)
+        self._pieces = []
+        self._tail = ''
+        return partial
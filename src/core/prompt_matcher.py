@@ -0,0 +1,161 @@
+import re
+
+# 各平台提示符正则 ({host} 为主机名占位，未知主机名时使用通配)
+# 华为/华三: <AR1>  [AR1]  [AR1-GigabitEthernet0/0/0]  [~CE1]  [*CE1]
+# 思科: R1>  R1#  R1(config-if)#
+PLATFORM_PROMPTS = {
+    'huawei_vrp': (rb'[<\[][~*]?{host}(?:-[^\]\r\n]*)?[>\]]', rb'[^\s<>\[\]]+'),
+    'hp_comware': (rb'[<\[]{host}(?:-[^\]\r\n]*)?[>\]]', rb'[^\s<>\[\]]+'),
+    'cisco_ios': (rb'{host}(?:\([^)\r\n]*\))?[>#]', rb'[\w.\-/:]+'),
+    'cisco_nxos': (rb'{host}(?:\([^)\r\n]*\))?[>#]', rb'[\w.\-/:]+'),
+}
+# 判断命令结束时提示符必须位于输出最末尾，避免把输出中间形如 [V200R003C00] 的行误判为提示符
+PROMPT_END = rb'[ \t]*\Z'
+
+# 从基础提示符中提取主机名: <AR1> -> AR1, R1# -> R1
+HOSTNAME_PATTERN = re.compile(rb'^[<\[]?[~*]?([^\s<>\[\]()#]+?)(?:\(.*\))?[>\]#]\s*$')
+
+_compiled_cache = {}
+
+
+def _prompt_body(device_type, hostname):
+    """拼出平台提示符正则主体 (bytes，不含结尾锚点)，未知平台返回 None"""
+    spec = PLATFORM_PROMPTS.get(device_type)
+    if spec is None:
+        return None
+    template, any_host = spec
+    host = re.escape(hostname) if hostname else any_host
+    return template.replace(b'{host}', host)
+
+
+def compile_prompt(device_type, hostname=None):
+    """
+    编译 (并缓存) 指定平台、主机名的提示符正则，要求提示符位于输出末尾
+    :return: re.Pattern，未知平台返回 None
+    """
+    key = (device_type, hostname)
+    if key not in _compiled_cache:
+        body = _prompt_body(device_type, hostname)
+        _compiled_cache[key] = re.compile(body + PROMPT_END) if body is not None else None
+    return _compiled_cache[key]
+
+
+def compile_prompt_line(device_type, hostname=None, follow=None):
+    """
+    编译文本 (str) 版的行首提示符正则，用于在已清洗的输出流中切分多条命令
+    :param follow: 提示符之后必须紧跟的文本 (下一条命令的回显)；为 None 时要求提示符位于末尾
+    :return: re.Pattern，match.end() 为提示符结束位置；未知平台返回 None
+    """
+    body = _prompt_body(device_type, hostname)
+    if body is None:
+        return None
+    suffix = f'(?={re.escape(follow)})' if follow is not None else PROMPT_END.decode()
+    return re.compile('(?m)^' + body.decode('utf-8', errors='ignore') + suffix)
+
+
+def prompt_view(prompt, device_type, hostname=None):
+    """
+    由提示符判断当前所在视图
+    - 华为/华三: <AR1> 用户视图，[AR1] 系统视图，[AR1-GigabitEthernet0/0/1] / [AR1-vlan10] 子视图
+    - 思科: R1> / R1# 用户 (特权) 模式，R1(config)# 全局配置，R1(config-if)# 子模式
+    :param prompt: 提示符 (bytes)
+    :param hostname: 基础提示符中的主机名 (bytes)，用于区分带连字符的主机名与子视图
+    :return: 'user' / 'system' / 'sub'；不是该平台的提示符时返回 None
+    """
+    pattern = compile_prompt(device_type)
+    if not prompt or pattern is None:
+        return None
+    prompt = prompt.strip()
+    match = pattern.search(prompt)
+    if match is None or match.start() != 0:
+        return None
+
+    if prompt.startswith(b'<'):
+        return 'user'
+    if prompt.startswith(b'['):
+        inner = prompt[1:-1].lstrip(b'~*')
+        if hostname and (inner == hostname or inner.startswith(hostname + b'-')):
+            return 'system' if inner == hostname else 'sub'
+        # 主机名未知或已被 sysname 修改
+        return 'sub' if b'-' in inner else 'system'
+    if b'(config)' in prompt:
+        return 'system'
+    if b'(config' in prompt:
+        return 'sub'
+    return 'user'
+
+
+def extract_hostname(prompt):
+    """从提示符 (bytes) 中提取主机名，失败返回 None"""
+    if not prompt:
+        return None
+    match = HOSTNAME_PATTERN.match(prompt.strip())
+    return match.group(1) if match else None
+
+
+class PromptMatcher:
+    """
+    滚动窗口提示符匹配器
+    - 只保留累积输出末尾 window 字节，提示符被拆到两次 recv 里也能识别
+    - 正则模式: 使用平台预编译正则，要求提示符位于输出末尾
+    - 字面量模式: 与旧版 expect_prompt in chunk 语义一致，但跨 chunk 查找
+    - bytes_examined 统计一共扫描了多少字节，便于确认开销与输出大小无关
+    """
+
+    def __init__(self, pattern=None, literal=None, window=256):
+        if pattern is None and literal is None:
+            raise ValueError("PromptMatcher requires a pattern or a literal")
+        self.pattern = pattern
+        self.literal = literal
+        self.window = max(window, len(literal) if literal else 0)
+        self._tail = bytearray()
+        self.bytes_examined = 0
+        self.match = None
+
+    @classmethod
+    def for_device(cls, device_type, base_prompt=None, expect_prompt=None, window=256):
+        """
+        为设备构造匹配器
+        :param expect_prompt: 调用方显式指定的提示符 (字面量模式)
+        :param base_prompt: 登录后探测到的提示符，用于提取主机名 (正则模式)
+        """
+        if expect_prompt:
+            return cls(literal=expect_prompt, window=window)
+        pattern = compile_prompt(device_type, extract_hostname(base_prompt))
+        if pattern is None:
+            return cls(literal=base_prompt or b']', window=window)
+        return cls(pattern=pattern, window=window)
+
+    def feed(self, chunk):
+        """
+        追加一段新数据并检查提示符
+        :return: 已出现提示符返回 True
+        """
+        if not chunk:
+            return False
+
+        if self.literal is not None:
+            # 只需回看 len(literal)-1 字节即可覆盖跨 chunk 的情况
+            overlap = len(self.literal) - 1
+            region = bytes(self._tail[-overlap:]) + chunk if overlap else chunk
+            self.bytes_examined += len(region)
+            found = region.find(self.literal)
+            self.match = found != -1
+        else:
+            region = bytes(self._tail) + chunk
+            region = region[-self.window:]
+            self.bytes_examined += len(region)
+            self.match = self.pattern.search(region)
+
+        self._tail += chunk
+        if len(self._tail) > self.window:
+            del self._tail[:-self.window]
+        return bool(self.match)
+
+    def trailing_line(self):
+        """已接收数据的最后一个非空行 (匹配到提示符时即提示符本身)"""
+        return bytes(self._tail).rstrip().rsplit(b'\n', 1)[-1].strip()
+
+    def reset(self):
+        self._tail.clear()
+        self.match = None
@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from colorama import Fore
+
+from core.ssh_client import NetworkDevice
+from utils.logger import setup_logger
+
+# NetworkDevice 构造函数接受的设备字段
+CONNECT_KEYS = ['host', 'username', 'password', 'port', 'device_type']
+
+
+class _PooledSession:
+    """池中的一条会话及其时间戳"""
+
+    __slots__ = ('key', 'device', 'created_at', 'last_used')
+
+    def __init__(self, key, device):
+        now = time.monotonic()
+        self.key = key
+        self.device = device
+        self.created_at = now
+        self.last_used = now
+
+
+class SessionPool:
+    """
+    SSH 会话池：按设备复用已登录的交互式 Shell
+    - checkout / checkin 借还会话，session() 为上下文管理器写法
+    - 空闲超过 idle_timeout 的会话被淘汰，存活超过 max_age 的会话被回收重建
+    - 空闲超过 probe_after 的会话在借出前做一次存活探测
+    - 每台设备最多 max_sessions_per_device 条并发会话，超出时排队等待
+    """
+
+    def __init__(self, max_sessions_per_device=2, idle_timeout=300, max_age=1800,
+                 probe_after=30, wait_timeout=30):
+        self.max_sessions_per_device = max_sessions_per_device
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.probe_after = probe_after
+        self.wait_timeout = wait_timeout
+
+        self.logger = setup_logger("SessionPool")
+
+        self._cond = threading.Condition()
+        self._idle = {}          # key -> deque[_PooledSession]
+        self._in_use = {}        # key -> 借出数量
+        self._checked_out = {}   # id(NetworkDevice) -> _PooledSession
+        self._reaper = None
+        self._closed = False
+
+        self.stats_counters = {'created': 0, 'reused': 0, 'evicted': 0, 'probe_failed': 0, 'discarded': 0}
+
+    @staticmethod
+    def _key(device):
+        """会话键：优先使用设备 ID，同时带上连接参数，设备改配置后旧会话自然失效"""
+        return (device.get('id'), device.get('host'), device.get('port', 22), device.get('username'))
+
+    def _is_expired(self, entry, now):
+        return (now - entry.last_used > self.idle_timeout) or (now - entry.created_at > self.max_age)
+
+    def _collect_expired_locked(self):
+        """在持锁状态下摘除所有过期的空闲会话，返回待关闭列表"""
+        now = time.monotonic()
+        expired = []
+        for key, queue in self._idle.items():
+            alive = deque()
+            for entry in queue:
+                if self._is_expired(entry, now):
+                    expired.append(entry)
+                else:
+                    alive.append(entry)
+            self._idle[key] = alive
+        self.stats_counters['evicted'] += len(expired)
+        return expired
+
+    def _close_entries(self, entries):
+        for entry in entries:
+            try:
+                entry.device.close()
+            except Exception as e:
+                self.logger.error(f"Close pooled session failed: {e}")
+
+    def _probe(self, entry):
+        """存活探测：传输层仍活跃，且长时间空闲的会话还要能回显提示符"""
+        if not entry.device.is_alive():
+            return False
+        if time.monotonic() - entry.last_used < self.probe_after:
+            return True
+        return entry.device.probe()
+
+    def checkout(self, device, timeout=None):
+        """
+        借出一条到指定设备的会话 (没有空闲会话且未达上限时新建连接)
+        :param device: 设备配置字典 (需包含 host/username/password 等字段)
+        :param timeout: 达到会话上限时的最长排队时间
+        :return: 已连接的 NetworkDevice
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        key = self._key(device)
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Session pool is closed")
+            expired = self._collect_expired_locked()
+            while True:
+                queue = self._idle.setdefault(key, deque())
+                in_use = self._in_use.get(key, 0)
+                if queue or in_use < self.max_sessions_per_device:
+                    # 占用一个名额，之后在锁外完成探测或建连
+                    entry = queue.pop() if queue else None
+                    self._in_use[key] = in_use + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._close_entries(expired)
+                    raise TimeoutError(f"No free session for {device.get('host')} within {timeout}s")
+                self._cond.wait(remaining)
+
+        self._close_entries(expired)
+
+        try:
+            if entry is not None and not self._probe(entry):
+                with self._cond:
+                    self.stats_counters['probe_failed'] += 1
+                self.logger.info(f"Pooled session to {device.get('host')} is dead, reconnecting")
+                self._close_entries([entry])
+                entry = None
+
+            if entry is None:
+                dev = NetworkDevice(**{k: v for k, v in device.items() if k in CONNECT_KEYS})
+                dev.connect()
+                entry = _PooledSession(key, dev)
+                counter = 'created'
+            else:
+                counter = 'reused'
+                print(Fore.GREEN + f"--- [会话池] 复用到 {device.get('host')} 的已有会话 ---")
+        except Exception:
+            self._release_slot(key)
+            raise
+
+        with self._cond:
+            self.stats_counters[counter] += 1
+            self._checked_out[id(entry.device)] = entry
+        return entry.device
+
+    def _release_slot(self, key):
+        with self._cond:
+            self._in_use[key] = max(self._in_use.get(key, 1) - 1, 0)
+            self._cond.notify_all()
+
+    def checkin(self, dev, discard=False):
+        """
+        归还会话
+        :param discard: 为 True 时直接关闭 (例如执行过程中发生了异常)
+        """
+        with self._cond:
+            entry = self._checked_out.pop(id(dev), None)
+        if entry is None:
+            # 不是从池里借出的会话，直接关闭
+            dev.close()
+            return
+
+        now = time.monotonic()
+        keep = not discard and not self._closed and dev.is_alive() and now - entry.created_at < self.max_age
+        if keep and not self._at_base_view(dev):
+            with self._cond:
+                self.stats_counters['discarded'] += 1
+            keep = False
+        if keep:
+            entry.last_used = now
+            with self._cond:
+                self._idle.setdefault(entry.key, deque()).append(entry)
+        else:
+            self._close_entries([entry])
+        self._release_slot(entry.key)
+
+    @staticmethod
+    def _at_base_view(dev):
+        """
+        归还前确认会话停在用户视图或系统视图；停在子视图 (interface / vlan ...) 或视图未知时
+        先 return 回用户视图，回不去的会话不再复用
+        """
+        current_view = getattr(dev, 'current_view', None)
+        if current_view is None or current_view() in ('user', 'system'):
+            return True
+        try:
+            return dev.return_to_user_view()
+        except Exception:
+            return False
+
+    @contextmanager
+    def session(self, device, timeout=None):
+        """
+        with pool.session(device) as dev: ... 异常退出时丢弃该会话
+        (包括流式响应中客户端断开触发的 GeneratorExit：此时通道里可能还有未读完的输出，不能放回池中)
+        """
+        dev = self.checkout(device, timeout=timeout)
+        try:
+            yield dev
+        except BaseException:
+            self.checkin(dev, discard=True)
+            raise
+        else:
+            self.checkin(dev)
+
+    def discard_device(self, device):
+        """设备配置修改或删除后，关闭该设备的全部空闲会话"""
+        with self._cond:
+            expired = []
+            for key in list(self._idle):
+                if key[0] == device.get('id') or key[1] == device.get('host'):
+                    expired.extend(self._idle.pop(key))
+        self._close_entries(expired)
+
+    def evict_idle(self):
+        """手动淘汰过期的空闲会话"""
+        with self._cond:
+            expired = self._collect_expired_locked()
+        self._close_entries(expired)
+        return len(expired)
+
+    def start_reaper(self, interval=60):
+        """启动后台线程，定期淘汰过期会话"""
+        if self._reaper is not None:
+            return
+
+        def _run():
+            while not self._closed:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=_run, name="SessionPoolReaper", daemon=True)
+        self._reaper.start()
+
+    def stats(self):
+        """会话池统计信息"""
+        with self._cond:
+            idle = sum(len(q) for q in self._idle.values())
+            in_use = sum(self._in_use.values())
+        return dict(self.stats_counters, idle=idle, in_use=in_use)
+
+    def close_all(self):
+        """关闭池中全部空闲会话，并拒绝新的借出"""
+        with self._cond:
+            self._closed = True
+            entries = [entry for queue in self._idle.values() for entry in queue]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._close_entries(entries)
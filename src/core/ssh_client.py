@@ -2,28 +2,131 @@ import paramiko
 import time
 import os
 import sys
+import queue
 import re
-import textfsm  # 引入 TextFSM 库
+import select
+import socket
+import threading
 from colorama import init, Fore
 
 # 引入日志模块
 from utils.logger import setup_logger
+from utils.metrics import metrics
+# 引入 TextFSM 模板缓存
+from core.template_cache import template_registry
+from core.template_resolver import DEFAULT_TEMPLATE_DIR, get_template_resolver
+# 引入流式输出清洗器
+from core.output_buffer import OutputCleaner, clean_text
+# 引入提示符匹配器
+from core.prompt_matcher import PromptMatcher, extract_hostname, prompt_view
+from core.pipeline import PipelineSplitter
 
 init(autoreset=True)
 
+# 输出最后一行是提示符 (例如 [AR1000v] 或 <AR1>)
+TRAILING_PROMPT = re.compile(r'[<\[].+?[>\]]\s*')
+
+# 各平台关闭分页的命令 (会话级，断开后自动失效)
+PAGING_DISABLE_COMMANDS = {
+    'huawei_vrp': 'screen-length 0 temporary',
+    'hp_comware': 'screen-length disable',
+    'cisco_ios': 'terminal length 0',
+    'cisco_nxos': 'terminal length 0',
+}
+
+# 各平台从任意配置视图回到用户视图的命令
+RETURN_COMMANDS = {
+    'huawei_vrp': 'return',
+    'hp_comware': 'return',
+    'cisco_ios': 'end',
+    'cisco_nxos': 'end',
+}
+
+# 设备拒绝/执行失败时输出中的特征字符串
+ERROR_MARKERS = ('Error:', 'error:', 'Invalid input', 'Unrecognized command')
+# 报错信息总在行首 (可能带 % 前缀)，避免把 display interface 中的 "Total Error:  0" 计数误判为报错
+ERROR_PATTERN = re.compile(r'^[ \t]*%?[ \t]*(?:' + '|'.join(re.escape(m) for m in ERROR_MARKERS) + ')', re.M)
+
+
+# 华为VRP ping 输出解析模板
+PING_TEMPLATE_PATH = "/root/github/python-automation-learning/src/ntc-templates/ntc_templates/templates/huawei_vrp_ping.textfsm"
+
+
+def has_error(output):
+    """判断命令输出中是否包含设备报错信息"""
+    return ERROR_PATTERN.search(output) is not None
+
+
+def build_ping_command(target_ip, count=5, timeout=5, size=None):
+    """
+    构建华为VRP标准ping命令
+    华为VRP的ping语法: ping [ -a source-ip | -c count | -h ttl | -i interface-name | -s packet-size | -t timeout ] *host
+    只有与默认值 (5个包、5秒) 不同的参数才会出现在命令中
+    """
+    params = []
+    if count != 5:
+        params.append(f"-c {count}")
+    if timeout != 5:
+        params.append(f"-t {timeout}")  # 华为使用-t而非-w
+    if size:
+        params.append(f"-s {size}")
+    return f"ping {' '.join(params)} {target_ip}" if params else f"ping {target_ip}"
+
+
+def extract_prompt(output):
+    """从输出中提取提示符"""
+    # 查找最后一个换行符后的文本，这通常是提示符
+    lines = output.split('\n')
+    last_line = lines[-1] if lines else ''
+
+    # 尝试匹配常见的提示符模式
+    prompt_patterns = [
+        r'[<\[].*?[>\]]\s*$',  # 匹配 <AR1> 或 [AR1]
+        r'.*?#\s*$',  # 匹配 # 提示符
+        r'.*?>\s*$',  # 匹配 > 提示符
+        r'.*?]\s*$',  # 匹配 ] 提示符
+    ]
+
+    for pattern in prompt_patterns:
+        match = re.search(pattern, last_line)
+        if match:
+            return match.group(0).encode('utf-8')
+
+    # 如果没找到匹配的，返回最后一行
+    return last_line.encode('utf-8') if last_line else b'>'
+
+
+def trim_output(data, command):
+    """去除命令回显 (头部) 与尾部提示符，只处理首尾，不对整段输出做正则替换"""
+    # 1. 去除命令回显 (回显只会出现在输出开头附近)
+    cmd_stripped = command.strip()
+    echo_at = data.find(cmd_stripped, 0, len(cmd_stripped) + 512) if cmd_stripped else -1
+    if echo_at != -1:
+        data = data[echo_at + len(cmd_stripped):]
+
+    # 2. 去除尾部提示符 (例如 [AR1000v] 或 <AR1>)
+    data = data.strip()
+    head, sep, last_line = data.rpartition('\n')
+    if sep and TRAILING_PROMPT.fullmatch(last_line):
+        data = head
+
+    return data.strip()
+
 class NetworkDevice:
     """
     网络设备自动化驱动类 v3.0
     核心升级：支持手动指定 TextFSM 模板路径，彻底解决 NTC 索引失效问题。
     """
 
-    def __init__(self, host, username, password, port=22, timeout=10, device_type='huawei_vrp'):
+    def __init__(self, host, username, password, port=22, timeout=10, device_type='huawei_vrp',
+                 disable_paging=True):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.timeout = timeout
         self.device_type = device_type
+        self.disable_paging = disable_paging
 
         # 初始化日志
         self.logger = setup_logger(f"Device-{host}")
@@ -32,6 +135,14 @@ class NetworkDevice:
         self.client = None
         self.chan = None
         self.base_prompt = None
+        # 最近一次命令结束时设备回显的提示符，当前视图由它判断 (命令可能 return / quit / 进入子视图)
+        self.current_prompt = None
+        # 会话是否已关闭分页 (关闭失败时仍由 execute_command 处理 ---- More ----)
+        self.paging_disabled = False
+        # 最近一条命令提示符匹配时扫描的字节数
+        self.last_prompt_scan_bytes = 0
+        # open_channel() 创建的附加通道与主会话共用 SSH 连接，不拥有 client
+        self.owns_client = True
 
     def __enter__(self):
         self.connect()
@@ -48,47 +159,80 @@ class NetworkDevice:
         try:
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.client.connect(
-                hostname=self.host, port=self.port,
-                username=self.username, password=self.password,
-                timeout=self.timeout, look_for_keys=False, allow_agent=False
-            )
+            # TCP 建连与 SSH 握手/认证分开计时
+            with metrics.timer('tcp_connect', self.host):
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            try:
+                with metrics.timer('ssh_auth', self.host):
+                    self.client.connect(
+                        hostname=self.host, port=self.port,
+                        username=self.username, password=self.password,
+                        timeout=self.timeout, look_for_keys=False, allow_agent=False, sock=sock
+                    )
+            except Exception:
+                sock.close()
+                raise
+
+            self._open_shell()
+            self.logger.info("SSH Connection Established")
+            print(Fore.GREEN + f"--- [成功] 已连接到 {self.host} (提示符: {self.base_prompt}) ---")
 
+        except Exception as e:
+            self.logger.error(f"Connection failed: {e}")
+            print(Fore.RED + f"!!! 连接失败: {e}")
+            raise e
+
+    def _open_shell(self):
+        """在已认证的连接上打开交互式 Shell，探测提示符并关闭分页"""
+        with metrics.timer('prompt_detect', self.host):
             self.chan = self.client.invoke_shell()
             self.chan.settimeout(self.timeout)
 
             # 自动探测并保存基础提示符
             initial_output = self._read_until([b'>', b']', b'#'])
             self.base_prompt = self._extract_prompt(initial_output)
-            self.logger.info("SSH Connection Established")
-            print(Fore.GREEN + f"--- [成功] 已连接到 {self.host} (提示符: {self.base_prompt}) ---")
+            self.current_prompt = self.base_prompt
 
-        except Exception as e:
-            self.logger.error(f"Connection failed: {e}")
-            print(Fore.RED + f"!!! 连接失败: {e}")
-            raise e
+        if self.disable_paging:
+            with metrics.timer('disable_paging', self.host):
+                self._disable_paging()
+
+    def open_channel(self):
+        """
+        在同一条 SSH 连接上再开一个交互式 Shell 通道 (不重新登录)
+        每个通道在设备上占用一个 VTY 用户，华为设备默认最多 5 个
+        :return: 与本会话共用 client 的 NetworkDevice，close() 只关闭它自己的通道
+        """
+        sibling = NetworkDevice(self.host, self.username, self.password, port=self.port, timeout=self.timeout,
+                                device_type=self.device_type, disable_paging=self.disable_paging)
+        sibling.client = self.client
+        sibling.owns_client = False
+        sibling._open_shell()
+        self.logger.info(f"Extra shell channel opened (prompt: {sibling.base_prompt})")
+        return sibling
+
+    def _disable_paging(self):
+        """
+        在会话级关闭分页，长输出一次性返回，省去每屏一次 ---- More ---- 往返
+        :return: 设备接受命令返回 True；不支持或被拒绝时返回 False (回退到自动翻页)
+        """
+        command = PAGING_DISABLE_COMMANDS.get(self.device_type)
+        if not command:
+            self.logger.info(f"No paging-disable command for {self.device_type}, keep More handling")
+            return False
+
+        output = self.execute_command(command)
+        self.paging_disabled = not has_error(output)
+        if self.paging_disabled:
+            self.logger.info(f"Paging disabled: {command}")
+        else:
+            self.logger.info(f"Device rejected '{command}', fall back to More handling: {output}")
+            print(Fore.YELLOW + f"--- [分页] 设备不支持 {command}，使用自动翻页 ---")
+        return self.paging_disabled
 
     def _extract_prompt(self, output):
         """从输出中提取提示符"""
-        # 查找最后一个换行符后的文本，这通常是提示符
-        lines = output.split('\n')
-        last_line = lines[-1] if lines else ''
-
-        # 尝试匹配常见的提示符模式
-        prompt_patterns = [
-            r'[<\[].*?[>\]]\s*$',  # 匹配 <AR1> 或 [AR1]
-            r'.*?#\s*$',  # 匹配 # 提示符
-            r'.*?>\s*$',  # 匹配 > 提示符
-            r'.*?]\s*$',  # 匹配 ] 提示符
-        ]
-
-        for pattern in prompt_patterns:
-            match = re.search(pattern, last_line)
-            if match:
-                return match.group(0).encode('utf-8')
-
-        # 如果没找到匹配的，返回最后一行
-        return last_line.encode('utf-8') if last_line else b'>'
+        return extract_prompt(output)
 
     def _read_until(self, expected_list, timeout=None):
         """
@@ -102,90 +246,321 @@ class NetworkDevice:
         if timeout is None:
             timeout = self.timeout
 
-        buffer = b''
-        start = time.time()
-        while time.time() - start < timeout:
-            if self.chan.recv_ready():
-                data = self.chan.recv(65535)
-                buffer += data
-
-                # 检查是否包含任意一个期望的字符串
-                for expected in expected_list:
-                    if expected in buffer:
-                        return buffer.decode('utf-8', errors='ignore')
-            time.sleep(0.1)
+        buffer = bytearray()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._wait_readable(remaining):
+                break
+
+            data = self.chan.recv(65535)
+            if not data:
+                # 通道已关闭 (EOF)
+                break
+            # 只在新数据附近查找期望字符串，避免每次从头扫描整个缓冲区
+            search_from = len(buffer)
+            buffer += data
+
+            # 检查是否包含任意一个期望的字符串
+            for expected in expected_list:
+                if buffer.find(expected, max(0, search_from - len(expected) + 1)) != -1:
+                    return buffer.decode('utf-8', errors='ignore')
 
         return buffer.decode('utf-8', errors='ignore')
 
-    def _clean_data(self, raw_data, command):
-        """数据清洗管道"""
-        # 1. 去除 ANSI 颜色代码
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        data = ansi_escape.sub('', raw_data)
+    def _wait_readable(self, timeout):
+        """
+        事件驱动等待：阻塞在通道的 fileno 上，数据一到立即唤醒
+        (取代旧版 recv_ready + sleep(0.1) 的轮询，消除每轮最多 100ms 的空等)
+        :param timeout: 最长等待秒数
+        :return: 通道可读返回 True，超时返回 False
+        """
+        if self.chan.recv_ready():
+            return True
+        if self.chan.closed or self.chan.eof_received:
+            # 已关闭的通道让 recv 立即返回 b''，由调用方结束循环
+            return True
 
-        # 2. 去除分页标记和退格符
-        data = data.replace('---- More ----', '').replace('\x08', '')
-        data = re.sub(r'  \x1b\[16D\s+\x1b\[16D', '', data)
+        try:
+            readable, _, _ = select.select([self.chan], [], [], timeout)
+            return bool(readable)
+        except (ValueError, OSError, TypeError):
+            # 通道不支持 fileno 时退化为短间隔轮询
+            time.sleep(min(timeout, 0.01))
+            return self.chan.recv_ready()
 
-        # 3. 去除命令回显 (头部)
-        cmd_stripped = command.strip()
-        if cmd_stripped in data:
-             _, _, data = data.partition(cmd_stripped)
-             data = data.lstrip()
+    def _clean_data(self, raw_data, command):
+        """数据清洗管道"""
+        # 1. 单遍去除 ANSI 颜色代码、分页标记和退格符
+        data = clean_text(raw_data)
 
-        # 4. 去除尾部提示符 (例如 [AR1000v] 或 <AR1>)
-        data = re.sub(r'\n[<\[].+?[>\]]\s*$', '', data)
+        # 2. 去除命令回显和尾部提示符
+        return self._trim_output(data, command)
 
-        return data.strip()
+    def _trim_output(self, data, command):
+        """去除命令回显 (头部) 与尾部提示符"""
+        return trim_output(data, command)
 
-    def execute_command(self, command, expect_prompt=None):
-        """执行单条命令并返回清洗后的文本"""
-        if not expect_prompt:
-            expect_prompt = self.base_prompt or b']'
+    def _receive(self, command, expect_prompt, cleaner, any_host=False):
+        """
+        发送命令并逐块接收，直到出现提示符或超时
+        :param any_host: 提示符按平台通配主机名匹配 (配置命令可能用 sysname 改掉主机名)
+        :return: 生成器，产出每次新增的、已清洗的文本片段
+        """
+        # 滚动窗口匹配提示符，提示符被拆到两个 chunk 里时也能立即识别
+        matcher = PromptMatcher.for_device(self.device_type, None if any_host else self.base_prompt, expect_prompt)
 
         print(Fore.CYAN + f">>> 发送命令: {command}")
         self.logger.info(f"Execute: {command}")
 
         self.chan.send(command.encode('utf-8') + b'\n')
+        started = time.perf_counter()
+        first_page_at = None
+
+        # 边收边清洗，输出累加为线性复杂度
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._wait_readable(remaining):
+                break
+
+            chunk = self.chan.recv(65535)
+            if not chunk:
+                break
+
+            pages_before = cleaner.pages
+            piece = cleaner.feed(chunk)
+            prompt_seen = matcher.feed(chunk)
+            if piece:
+                yield piece
+
+            if cleaner.pages > pages_before:
+                # 分页未关闭 (或设备拒绝了关闭分页命令) 时自动翻页
+                # 翻页后直接回到 select 等待，无需再额外 sleep
+                self.chan.send(b' ')
+                if first_page_at is None:
+                    first_page_at = time.perf_counter()
+            elif prompt_seen:
+                break
+
+        piece = cleaner.finish()
+        self.last_prompt_scan_bytes = matcher.bytes_examined
+        self._note_prompt(matcher.trailing_line() if matcher.match else None)
+        # command 为发送到出现提示符的总耗时，paging 为其中第一次出现 More 之后的翻页耗时
+        finished = time.perf_counter()
+        metrics.observe('command', finished - started, self.host, command)
+        if first_page_at is not None:
+            metrics.observe('paging', finished - first_page_at, self.host, command)
+        if piece:
+            yield piece
+
+    def execute_command(self, command, expect_prompt=None, any_host=False):
+        """
+        执行单条命令并返回清洗后的文本
+        :param expect_prompt: 结束标志 (bytes)；不传时按平台提示符正则匹配 (用户视图/系统视图/子视图均可识别)
+        :param any_host: 提示符不限定主机名 (见 _receive)
+        """
+        cleaner = OutputCleaner()
+        for _ in self._receive(command, expect_prompt, cleaner, any_host=any_host):
+            pass
+        return self._trim_output(cleaner.getvalue(), command)
 
-        full_output = b''
-        start_time = time.time()
-        while time.time() - start_time < self.timeout:
-            if self.chan.recv_ready():
-                chunk = self.chan.recv(65535)
-                full_output += chunk
+    def stream_command(self, command, expect_prompt=None):
+        """
+        流式执行命令：输出边到达边按行产出，不在内存中保留完整输出
+        清洗规则与 execute_command 一致：去除命令回显、首尾空行与尾部提示符
+        :return: 生成器，每次产出一批完整的行 (List[str]，不含换行符)
+        """
+        cleaner = OutputCleaner(keep=False)
+        cmd_stripped = command.strip()
+        echo_limit = len(cmd_stripped) + 512
+        state = {'echo_done': not cmd_stripped, 'started': False, 'blank': 0}
+
+        def strip_echo(text, final):
+            """回显只会出现在输出开头附近 (与 trim_output 的查找范围一致)；还不能确定时返回 None"""
+            echo_at = text.find(cmd_stripped, 0, echo_limit)
+            if echo_at != -1:
+                text = text[echo_at + len(cmd_stripped):]
+            elif len(text) < echo_limit and not final:
+                return None
+            state['echo_done'] = True
+            return text
+
+        def take_lines(lines):
+            batch = []
+            for line in lines:
+                line = line.rstrip('\r')
+                if not line.strip():
+                    # 空行先记下，后面还有内容时再补发 (去掉首尾空行)
+                    state['blank'] += state['started']
+                    continue
+                batch.extend([''] * state['blank'])
+                batch.append(line)
+                state['blank'] = 0
+                state['started'] = True
+            return batch
+
+        pending = ''
+        for piece in self._receive(command, expect_prompt, cleaner):
+            pending += piece
+            if not state['echo_done']:
+                text = strip_echo(pending, final=False)
+                if text is None:
+                    continue
+                pending = text
+            *lines, pending = pending.split('\n')
+            batch = take_lines(lines)
+            if batch:
+                yield batch
+
+        if not state['echo_done']:
+            *lines, pending = strip_echo(pending, final=True).split('\n')
+        else:
+            lines = []
+        # 最后一行通常是提示符
+        if not TRAILING_PROMPT.fullmatch(pending.strip()):
+            lines.append(pending)
+        batch = take_lines(lines)
+        if batch:
+            yield batch
+
+    def execute_commands(self, commands, pipeline=False, window=8):
+        """
+        执行多个命令
+        :param pipeline: 流水线模式，一次写入 window 条命令，不再逐条等待提示符 (仅在已关闭分页时生效)
+        :return: [{'command', 'output', 'status'}]，status 按每条命令的输出单独判断
+        """
+        if pipeline and len(commands) > 1 and self._can_pipeline():
+            return self._execute_pipelined(commands, window)
+        return self._execute_sequential(commands)
 
-                if b'---- More ----' in chunk:
-                    self.chan.send(b' ')
-                    time.sleep(0.1)
-                elif expect_prompt in chunk:
-                    break
-            else:
-                time.sleep(0.1)
+    def _execute_sequential(self, commands, any_host=False):
+        """逐条执行，每条等到提示符再发下一条"""
+        results = []
+        for cmd in commands:
+            result = self.execute_command(cmd, any_host=any_host)
+            results.append({
+                'command': cmd,
+                'output': result,
+                'status': 'error' if has_error(result) else 'success'
+            })
+        return results
 
-        decoded = full_output.decode('utf-8', errors='ignore')
-        return self._clean_data(decoded, command)
+    def _can_pipeline(self):
+        """预输入的命令会被 ---- More ---- 吞掉，只有分页已关闭时才能流水线发送"""
+        if not self.paging_disabled:
+            self.logger.info("Paging is enabled, pipelining falls back to sequential mode")
+            return False
+        return True
+
+    def _execute_pipelined(self, commands, window=8, any_host=False):
+        """
+        流水线执行：提前写入 window 条命令，按 提示符 + 下一条命令回显 切分返回的文本流
+        每完成一条命令补发一条，超时时间按单条命令计算 (每完成一条重新计时)
+        :param any_host: 切分边界不限定主机名 (配置命令可能用 sysname 改掉主机名)
+        """
+        try:
+            splitter = PipelineSplitter(commands, self.device_type, None if any_host else self.base_prompt)
+        except ValueError as e:
+            self.logger.info(f"{e}, fall back to sequential mode")
+            return self._execute_sequential(commands, any_host=any_host)
+
+        window = max(1, window)
+        print(Fore.CYAN + f">>> 流水线发送 {len(commands)} 条命令 (窗口 {window})")
+        self.logger.info(f"Pipeline execute: {len(commands)} commands, window {window}")
+
+        def send_ahead():
+            while splitter.sent < len(commands) and splitter.sent < splitter.index + window:
+                self.chan.send(commands[splitter.sent].encode('utf-8') + b'\n')
+                splitter.sent += 1
+
+        outputs = [None] * len(commands)
+        cleaner = OutputCleaner()
+        tail = b''
+        send_ahead()
+        deadline = time.monotonic() + self.timeout
+        while not splitter.done:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._wait_readable(remaining):
+                break
+
+            chunk = self.chan.recv(65535)
+            if not chunk:
+                break
+            tail = (tail + chunk)[-256:]
+
+            pages_before = cleaner.pages
+            finished = splitter.feed(cleaner.feed(chunk))
+            if cleaner.pages > pages_before:
+                self.chan.send(b' ')
+            for index, output in finished:
+                outputs[index] = trim_output(output, commands[index])
+            if finished:
+                deadline = time.monotonic() + self.timeout
+                send_ahead()
+
+        # 超时或通道关闭：剩余命令标记为 timeout，未完成的那条保留已收到的部分输出
+        partial = splitter.finish()
+        self._note_prompt(tail.rstrip().rsplit(b'\n', 1)[-1].strip() if splitter.done else None)
+        if partial is not None:
+            outputs[splitter.index] = trim_output(partial + cleaner.finish(), commands[splitter.index])
+            self.logger.error(f"Pipeline timeout at: {commands[splitter.index]}")
 
-    def execute_commands(self, commands):
-        """执行多个命令"""
         results = []
-        for cmd in commands:
-            result = self.execute_command(cmd)
+        for index, (cmd, output) in enumerate(zip(commands, outputs)):
+            if output is None or index >= splitter.index:
+                status = 'timeout'
+            else:
+                status = 'error' if has_error(output) else 'success'
             results.append({
                 'command': cmd,
-                'output': result
+                'output': output or '',
+                'status': status
             })
         return results
 
+    def _note_prompt(self, prompt):
+        """
+        记录命令结束时的提示符；没等到提示符 (超时) 时记为 None，视图未知
+        回到用户视图时主机名变了 (配置中执行过 sysname)，后续命令按新主机名匹配提示符
+        """
+        view = prompt_view(prompt, self.device_type)
+        self.current_prompt = prompt if view else None
+        if view == 'user' and extract_hostname(prompt) != extract_hostname(self.base_prompt):
+            self.base_prompt = prompt
+
+    def current_view(self):
+        """
+        由最近一次回显的提示符判断当前视图
+        :return: 'user' / 'system' / 'sub'，未知 (超时、输出未读完) 时返回 None
+        """
+        return prompt_view(self.current_prompt, self.device_type, extract_hostname(self.base_prompt))
+
+    @property
+    def in_system_view(self):
+        return self.current_view() == 'system'
+
     def enter_system_view(self):
-        """进入系统视图"""
-        result = self.execute_command("system-view", expect_prompt=b']')
-        return result
+        """进入系统视图 (会话已处于系统视图时直接返回，复用会话时省去一次往返；在子视图时先回到用户视图)"""
+        view = self.current_view()
+        if view == 'system':
+            return ''
+        if view != 'user':
+            self.return_to_user_view()
+        return self.execute_command("system-view")
 
     def exit_system_view(self):
         """退出系统视图"""
-        result = self.execute_command("quit", expect_prompt=b'>')
-        return result
+        return self.execute_command("quit")
+
+    def return_to_user_view(self):
+        """
+        从任意视图回到用户视图 (华为 return / 思科 end)
+        :return: 已回到用户视图返回 True
+        """
+        if self.current_view() != 'user':
+            self.execute_command(RETURN_COMMANDS.get(self.device_type, 'return'), any_host=True)
+        return self.current_view() == 'user'
 
     def get_output_with_template(self, command, template_path):
         """
@@ -203,17 +578,9 @@ class NetworkDevice:
             return {"error": f"Template not found: {template_path}"}
 
         try:
-            # 3. TextFSM 解析
-            with open(template_path, 'r', encoding='utf-8') as f:
-                re_table = textfsm.TextFSM(f)
-                result = re_table.ParseText(raw_output)
-                headers = re_table.header
-
-                # 4. 强制转小写 (方便前端调用)
-                headers_lower = [h.lower() for h in headers]
-
-                # 5. 组合成字典
-                parsed_data = [dict(zip(headers_lower, row)) for row in result]
+            # 3. TextFSM 解析 (模板只编译一次，字段名转小写后组合成字典)
+            with metrics.timer('parse', self.host, command):
+                parsed_data = template_registry.parse(template_path, raw_output)
 
             print(Fore.GREEN + f"--- [解析] 成功解析 {len(parsed_data)} 条数据 (Template: {os.path.basename(template_path)}) ---")
             return parsed_data
@@ -237,45 +604,28 @@ class NetworkDevice:
         return self.get_output_with_template(command, template_path)
 
     def _auto_select_template(self, command):
-        """根据命令自动选择模板"""
-        template_dir = "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates"
-
-        # 命令关键词到模板的映射
-        command_templates = {
-            'display ip interface brief': 'huawei_vrp_display_ip_interface_brief.textfsm',
-            'display version': 'huawei_vrp_display_version.textfsm',
-            'display current-configuration': 'huawei_vrp_display_current-configuration.textfsm',
-            'display interface': 'huawei_vrp_display_interface.textfsm',
-            'display vlan': 'huawei_vrp_display_vlan.textfsm',
-            'show ip interface brief': 'cisco_ios_show_ip_interface_brief.textfsm',
-            'show version': 'cisco_ios_show_version.textfsm',
-        }
-
-        # 尝试匹配命令
-        for cmd_pattern, template_name in command_templates.items():
-            if cmd_pattern in command.lower():
-                return os.path.join(template_dir, template_name)
-
-        # 默认返回IP接口模板
-        return "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_ip_interface_brief.textfsm"
-
-    def configure(self, config_commands):
+        """根据命令自动选择模板 (与 run.py 共用同一个解析器)，没有对应模板时默认使用IP接口模板"""
+        template_path = get_template_resolver().resolve(command, self.device_type)
+        if template_path is None:
+            template_path = os.path.join(DEFAULT_TEMPLATE_DIR, 'huawei_vrp_display_ip_interface_brief.textfsm')
+        return template_path
+
+    def configure(self, config_commands, pipeline=False, window=8):
         """
         执行配置命令
         :param config_commands: 配置命令列表
+        :param pipeline: 流水线模式 (见 execute_commands)，大批量下发配置时省去逐条往返
         """
         print(Fore.CYAN + f">>> 进入系统视图并执行配置...")
 
         # 进入系统视图
         self.enter_system_view()
 
-        results = []
-        for cmd in config_commands:
-            result = self.execute_command(cmd, expect_prompt=b']')
-            results.append({
-                'command': cmd,
-                'output': result
-            })
+        # 按平台提示符匹配 (不限定主机名)：return / quit 回到 <AR1>、sysname 改名后提示符都能识别
+        if pipeline and len(config_commands) > 1 and self._can_pipeline():
+            results = self._execute_pipelined(config_commands, window, any_host=True)
+        else:
+            results = self._execute_sequential(config_commands, any_host=True)
 
         print(Fore.GREEN + f">>> 配置完成，共执行 {len(config_commands)} 条命令")
         return results
@@ -299,42 +649,7 @@ class NetworkDevice:
         print(Fore.CYAN + f">>> 从设备 {self.host} 执行ping测试: {target_ip}")
         self.logger.info(f"Ping test from {self.host} to {target_ip}")
 
-        # 构建ping命令 - 适配华为VRP系统语法
-        # 华为VRP的ping语法: ping [ -a source-ip | -c count | -h ttl | -i interface-name | -s packet-size | -t timeout ] *host
-        ping_cmd = f"ping {target_ip}"
-
-        # 添加包数量参数 (-c)
-        if count and count != 5:  # 默认是5，如果用户指定其他值则添加
-            ping_cmd = f"ping -c {count} {target_ip}"
-
-        # 如果同时有timeout参数，添加超时时间 (-t)
-        if timeout and timeout != 5:  # 默认是5秒
-            if count and count != 5:
-                ping_cmd = f"ping -c {count} -t {timeout} {target_ip}"
-            else:
-                ping_cmd = f"ping -t {timeout} {target_ip}"
-
-        # 只有count参数的默认情况
-        if not timeout or timeout == 5:
-            if count and count != 5:
-                ping_cmd = f"ping -c {count} {target_ip}"
-
-        # 最简单的形式 - 使用默认值
-        if count == 5 and (not timeout or timeout == 5):
-            ping_cmd = f"ping {target_ip}"
-
-        # 重新构建：华为VRP标准ping命令格式
-        ping_cmd = f"ping"
-        params = []
-
-        if count != 5:  # 如果不是默认值5
-            params.append(f"-c {count}")
-        if timeout != 5:  # 如果不是默认值5
-            params.append(f"-t {timeout}")  # 华为使用-t而非-w
-        if size:
-            params.append(f"-s {size}")
-
-        ping_cmd = f"ping {' '.join(params)} {target_ip}" if params else f"ping {target_ip}"
+        ping_cmd = build_ping_command(target_ip, count=count, timeout=timeout, size=size)
 
         print(Fore.CYAN + f">>> 发送命令: {ping_cmd}")
 
@@ -345,7 +660,7 @@ class NetworkDevice:
         print(Fore.YELLOW + f">>> 实际输出内容: {repr(raw_output)}")
 
         # 使用新创建的ping模板解析结果
-        template_path = "/root/github/python-automation-learning/src/ntc-templates/ntc_templates/templates/huawei_vrp_ping.textfsm"
+        template_path = PING_TEMPLATE_PATH
 
         if not os.path.exists(template_path):
             self.logger.error(f"Template not found: {template_path}")
@@ -353,17 +668,8 @@ class NetworkDevice:
             return {"error": f"Template not found: {template_path}", "raw_output": raw_output}
 
         try:
-            # TextFSM 解析
-            with open(template_path, 'r', encoding='utf-8') as f:
-                re_table = textfsm.TextFSM(f)
-                result = re_table.ParseText(raw_output)
-                headers = re_table.header
-
-                # 强制转小写 (方便前端调用)
-                headers_lower = [h.lower() for h in headers]
-
-                # 组合成字典
-                parsed_data = [dict(zip(headers_lower, row)) for row in result]
+            # TextFSM 解析 (使用进程级模板缓存)
+            parsed_data = template_registry.parse(template_path, raw_output)
 
             print(Fore.GREEN + f"--- [解析] 成功解析 {len(parsed_data)} 条数据 (Template: {os.path.basename(template_path)}) ---")
             return parsed_data
@@ -374,7 +680,119 @@ class NetworkDevice:
             # 如果解析失败，返回原始输出
             return {"error": f"Parsing error: {e}", "raw_output": raw_output}
 
+    def ping_many(self, targets, count=5, timeout=5, size=None, channels=1):
+        """
+        在同一条 SSH 连接上批量执行ping (整批只登录一次)
+        :param targets: 目标IP列表
+        :param channels: 同时使用的 Shell 通道数，大于 1 时在本连接上额外打开 channels-1 个通道并行 ping
+        :return: 生成器，按完成顺序产出 (目标下标, ping_test 的结果)；单个目标失败时结果为 {"error": ...}
+        """
+        targets = list(targets)
+        workers = [self]
+        for _ in range(min(channels, len(targets)) - 1):
+            try:
+                workers.append(self.open_channel())
+            except Exception as e:
+                # VTY 用户数已满等情况下，用已经打开的通道继续
+                self.logger.error(f"Open extra channel failed: {e}")
+                print(Fore.YELLOW + f"--- [通道] 附加通道打开失败，使用 {len(workers)} 个通道: {e} ---")
+                break
+
+        if len(workers) == 1:
+            for index, target in enumerate(targets):
+                yield index, self._ping_one(target, count, timeout, size)
+            return
+
+        pending = queue.Queue()
+        for item in enumerate(targets):
+            pending.put(item)
+        finished = queue.Queue()
+        stop = threading.Event()
+
+        def work(dev):
+            while not stop.is_set():
+                try:
+                    index, target = pending.get_nowait()
+                except queue.Empty:
+                    return
+                finished.put((index, dev._ping_one(target, count, timeout, size)))
+
+        threads = [threading.Thread(target=work, args=(dev,), daemon=True, name=f"Ping-{self.host}-{i}")
+                   for i, dev in enumerate(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in targets:
+                yield finished.get()
+        finally:
+            # 调用方提前结束 (例如客户端断开) 时不再领取新目标，等正在执行的 ping 结束再关闭附加通道
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for dev in workers[1:]:
+                dev.close()
+
+    def _ping_one(self, target_ip, count, timeout, size):
+        try:
+            return self.ping_test(target_ip, count=count, timeout=timeout, size=size)
+        except Exception as e:
+            self.logger.error(f"Ping {target_ip} failed: {e}")
+            return {"error": str(e)}
+
+    def is_alive(self):
+        """传输层是否仍然可用 (不产生任何网络交互)"""
+        if not self.client or not self.chan or self.chan.closed:
+            return False
+        transport = self.client.get_transport()
+        return bool(transport and transport.is_active())
+
+    def _drain(self):
+        """丢弃通道中已到达但未读取的数据"""
+        while self.chan.recv_ready():
+            self.chan.recv(65535)
+
+    def probe(self, timeout=3):
+        """
+        存活探测：发送一个空行，确认设备在 timeout 秒内回显完整的提示符
+        提示符之后不应再有数据；探测结束时通道被读空，不会把残留回显带给下一条命令
+        :return: 设备回显了当前视图的提示符返回 True
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self._drain()
+            self.chan.send(b'\n')
+            matcher = PromptMatcher.for_device(self.device_type, self.base_prompt)
+            deadline = time.monotonic() + timeout
+            while not matcher.match:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wait_readable(remaining):
+                    break
+                chunk = self.chan.recv(65535)
+                if not chunk:
+                    break
+                matcher.feed(chunk)
+            if not matcher.match:
+                self.logger.error("Probe failed: prompt did not come back")
+                return False
+
+            # 提示符之后又到达的数据说明会话里还有别的输出，不能复用
+            if self._wait_readable(0.05):
+                self._drain()
+                self.logger.error("Probe failed: unexpected output after prompt")
+                return False
+            prompt = matcher.trailing_line()
+            self._note_prompt(prompt)
+            return self.current_prompt == prompt
+        except Exception as e:
+            self.logger.error(f"Probe failed: {e}")
+            return False
+
     def close(self):
+        if not self.owns_client:
+            if self.chan:
+                self.chan.close()
+            return
         if self.client:
             self.client.close()
             print(Fore.YELLOW + f"--- [断开] 连接已关闭 ---")
\ No newline at end of file
@@ -0,0 +1,146 @@
+import copy
+import os
+import threading
+
+import textfsm
+
+
+class _CompiledTemplate:
+    """一个已编译的 TextFSM 状态机，以及编译时模板文件的 mtime"""
+
+    __slots__ = ('fsm', 'mtime')
+
+    def __init__(self, fsm, mtime):
+        self.fsm = fsm
+        self.mtime = mtime
+
+
+class StreamParser:
+    """
+    增量 TextFSM 解析：输出边到达边按行喂给状态机 (ParseText(eof=False))，不需要保留完整原始文本
+    """
+
+    def __init__(self, fsm):
+        self.fsm = fsm
+
+    def feed(self, lines):
+        """喂入若干完整的行"""
+        if lines:
+            self.fsm.ParseText('\n'.join(lines), eof=False)
+
+    def finish(self):
+        """
+        输出结束，触发 EOF 规则
+        :return: 字典列表，字段名统一转为小写
+        """
+        result = self.fsm.ParseText('', eof=True)
+        headers_lower = [h.lower() for h in self.fsm.header]
+        return [dict(zip(headers_lower, row)) for row in result]
+
+
+class TemplateRegistry:
+    """
+    进程级 TextFSM 模板注册表
+    - 每个模板文件只编译一次 (正则编译、状态校验)，按 (路径, mtime) 缓存
+    - 模板文件被修改 (mtime 变化) 时自动重新编译
+    - 每次解析使用独立的轻量克隆：共享只读的状态/规则，只复制 Value 对象，可多线程并发解析
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _compile(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return textfsm.TextFSM(f)
+
+    def get(self, template_path):
+        """
+        获取模板的一个可独立使用的状态机克隆
+        :param template_path: 模板文件路径
+        :return: textfsm.TextFSM 实例
+        """
+        path = os.path.abspath(template_path)
+        # 模板不存在时这里抛出 FileNotFoundError，与直接 open() 的行为一致
+        mtime = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is not None and entry.mtime == mtime:
+                self.hits += 1
+                master = entry.fsm
+            else:
+                master = None
+                if entry is not None:
+                    self.reloads += 1
+                self.misses += 1
+
+        if master is None:
+            # 在锁外编译，避免慢模板阻塞其他模板的命中
+            master = self._compile(path)
+            with self._lock:
+                self._cache[path] = _CompiledTemplate(master, mtime)
+
+        return self._clone(master)
+
+    @staticmethod
+    def _clone(master):
+        """
+        浅复制状态机：编译好的状态/规则只读共享，只复制 Value 及其 Option
+        (Option 的内部状态全部由 Reset() 重新初始化，所以浅复制即可，无需 deepcopy)
+        """
+        clone = copy.copy(master)
+        values = []
+        for value in master.values:
+            new_value = copy.copy(value)
+            new_value.fsm = clone
+            new_value.options = []
+            for option in value.options:
+                new_option = copy.copy(option)
+                new_option.value = new_value
+                new_value.options.append(new_option)
+            values.append(new_value)
+        clone.values = values
+        clone.Reset()
+        return clone
+
+    def parse(self, template_path, text):
+        """
+        使用模板解析文本
+        :return: 字典列表，字段名统一转为小写 (方便前端调用)
+        """
+        fsm = self.get(template_path)
+        result = fsm.ParseText(text)
+        headers_lower = [h.lower() for h in fsm.header]
+        return [dict(zip(headers_lower, row)) for row in result]
+
+    def stream_parser(self, template_path):
+        """获取增量解析器 (用于流式输出)"""
+        return StreamParser(self.get(template_path))
+
+    def invalidate(self, template_path=None):
+        """手动失效某个模板 (不传路径时清空全部缓存)"""
+        with self._lock:
+            if template_path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(os.path.abspath(template_path), None)
+
+    def stats(self):
+        """命中/未命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'templates': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# 进程级单例，NetworkDevice 与 Flask 路由共用
+template_registry = TemplateRegistry()
@@ -0,0 +1,200 @@
+import csv
+import os
+import re
+import threading
+
+from utils.list_commands import find_ntc_index
+
+# 未找到 ntc-templates index 文件时使用的模板目录与回退命令表
+DEFAULT_TEMPLATE_DIR = "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates"
+FALLBACK_COMMANDS = {
+    'huawei_vrp': {
+        "display ip interface brief": "huawei_vrp_display_ip_interface_brief.textfsm",
+        "display version": "huawei_vrp_display_version.textfsm",
+        "display device": "huawei_vrp_display_device.textfsm",
+        "display interface": "huawei_vrp_display_interface.textfsm",
+        "display interface brief": "huawei_vrp_display_interface_brief.textfsm",
+        "display interface description": "huawei_vrp_display_interface_description.textfsm",
+        "display vlan": "huawei_vrp_display_vlan.textfsm",
+        "display vlan brief": "huawei_vrp_display_vlan_brief.textfsm",
+        "display arp": "huawei_vrp_display_arp_all.textfsm",
+        "display arp brief": "huawei_vrp_display_arp_brief.textfsm",
+        "display mac-address": "huawei_vrp_display_mac-address.textfsm",
+        "display lldp neighbor": "huawei_vrp_display_lldp_neighbor.textfsm",
+        "display stp brief": "huawei_vrp_display_stp_brief.textfsm",
+        "display users": "huawei_vrp_display_users.textfsm",
+        "display clock": "huawei_vrp_display_clock.textfsm",
+        "display memory": "huawei_vrp_display_memory.textfsm",
+        "display cpu-usage": "huawei_vrp_display_cpu-usage.textfsm",
+        "display ip routing-table": "huawei_vrp_display_ip_routing-table.textfsm",
+        "display current-configuration": "huawei_vrp_display_current-configuration.textfsm",
+    },
+    'cisco_ios': {
+        "show ip interface brief": "cisco_ios_show_ip_interface_brief.textfsm",
+        "show version": "cisco_ios_show_version.textfsm",
+    },
+}
+
+# index 中的缩写语法: di[[splay]] 表示 di 之后的 s/sp/spl/... 均可省略
+COMPLETION = re.compile(r'\[\[(.+?)\]\]')
+# 回退命令表生成缩写时每个词至少保留的字符数
+MIN_ABBREVIATION = 2
+# 展开缩写后仍含这些字符的 index 命令是正则片段 (如 (read|write)、ip(v6)?)，不作为命令名展示
+REGEX_SYNTAX = re.compile(r'[()|?*+\\{}\[\].^$]')
+
+
+def _completion(word):
+    """splay -> (?:s(?:p(?:l(?:a(?:y)?)?)?)?)? (与 textfsm clitable 的 [[...]] 展开规则一致)"""
+    pattern = ''
+    for char in reversed(word):
+        pattern = f"(?:{re.escape(char)}{pattern})?"
+    return pattern
+
+
+def compile_index_command(command):
+    """
+    把 index 中的命令列转换为正则
+    开头锚定 (match)，结尾要求空白或结束：d[[ir]] 不能匹配 display ... 的前缀
+    """
+    return COMPLETION.sub(lambda m: _completion(m.group(1)), command.strip()) + r'(?=\s|$)'
+
+
+def index_command_words(command):
+    """index 命令列的完整写法：di[[splay]] ver[[sion]] -> display version"""
+    return COMPLETION.sub(r'\1', command).strip('^$ ')
+
+
+def _specificity(words):
+    """排序键：词数多、字符多的命令排在前面，组合正则的第一个匹配即最长匹配"""
+    return -len(words.split()), -len(words)
+
+
+def compile_plain_command(command):
+    """
+    把完整命令 (display ip interface brief) 转换为支持 VRP 缩写的正则
+    每个词保留前 MIN_ABBREVIATION 个字符，其余可省略；命令后只能是空白或结束
+    """
+    words = []
+    for word in command.split():
+        head, tail = word[:MIN_ABBREVIATION], word[MIN_ABBREVIATION:]
+        words.append(re.escape(head) + _completion(tail))
+    return r'\s+'.join(words) + r'(?=\s|$)'
+
+
+class TemplateResolver:
+    """
+    命令 -> TextFSM 模板解析器
+    - 启动时把每个平台的全部命令正则编译成一个组合正则 (?P<t0>...)|(?P<t1>...)，
+      一次 match 即可按优先级找到第一条匹配的模板，不再每次排序 + 子串扫描
+    - 条目按命令词数、长度降序排列 (最长匹配优先)，display interface brief 先于 display interface
+    - 支持 VRP 缩写 (dis ip int br)
+    - 结果按规范化后的命令缓存，重复命令只需一次字典查找
+    """
+
+    def __init__(self, entries, template_dir, source=None, memo_size=4096):
+        """
+        :param entries: [(platform, 命令正则, 显示名, 模板文件名)]，顺序即优先级；
+                        显示名为 None 的条目参与匹配，但不出现在 commands() 中
+        """
+        self.template_dir = template_dir
+        self.source = source
+        self.memo_size = memo_size
+        self._entries = {}
+        self._patterns = {}
+        self._memo = {}
+
+        for platform, pattern, display, template in entries:
+            self._entries.setdefault(platform, []).append((display, template))
+            self._patterns.setdefault(platform, []).append(pattern)
+
+        for platform, patterns in self._patterns.items():
+            combined = '|'.join(f"(?P<t{i}>{p})" for i, p in enumerate(patterns))
+            self._patterns[platform] = re.compile(f"(?:{combined})", re.IGNORECASE)
+
+    @staticmethod
+    def _index_entries(index_path):
+        """读取 ntc-templates 的 index 文件 (格式: Template, Hostname, Platform, Command)"""
+        entries = []
+        with open(index_path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+        for row in csv.reader(lines, skipinitialspace=True):
+            if len(row) < 4 or row[0].strip() == 'Template':
+                continue
+            # 一条命令对应多个模板时以冒号分隔，这里取第一个
+            template = row[0].strip().split(':')[0]
+            command = row[3].strip()
+            words = index_command_words(command)
+            display = None if REGEX_SYNTAX.search(words) else words
+            entries.append((_specificity(words), row[2].strip(), compile_index_command(command), display, template))
+        return entries
+
+    @staticmethod
+    def _mapping_entries(mapping):
+        return [(_specificity(command), platform, compile_plain_command(command), command, template)
+                for platform, commands in mapping.items() for command, template in commands.items()]
+
+    @classmethod
+    def _build(cls, ranked, template_dir, source):
+        # 稳定排序：同样长度的命令保持传入顺序 (仓库命令表在 index 之前)
+        ranked.sort(key=lambda entry: entry[0])
+        return cls([entry[1:] for entry in ranked], template_dir, source=source)
+
+    @classmethod
+    def from_index(cls, index_path, mapping=None):
+        """
+        从 ntc-templates 的 index 文件构建
+        :param mapping: 仓库自己的 {平台: {完整命令: 模板文件名}}，与 index 合并，同样长度的命令优先于 index
+        """
+        ranked = cls._mapping_entries(mapping or {}) + cls._index_entries(index_path)
+        return cls._build(ranked, os.path.dirname(index_path), index_path)
+
+    @classmethod
+    def from_mapping(cls, mapping=None, template_dir=DEFAULT_TEMPLATE_DIR):
+        """从 {平台: {完整命令: 模板文件名}} 构建，词数多的命令优先 (display interface brief 先于 display interface)"""
+        return cls._build(cls._mapping_entries(mapping or FALLBACK_COMMANDS), template_dir, 'fallback')
+
+    def resolve(self, command, platform='huawei_vrp'):
+        """
+        查找命令对应的模板
+        :return: 模板绝对路径，没有对应模板返回 None
+        """
+        key = (platform, ' '.join(command.split()).lower())
+        if key in self._memo:
+            return self._memo[key]
+
+        pattern = self._patterns.get(platform)
+        match = pattern.match(key[1]) if pattern is not None else None
+        path = None
+        if match:
+            _, template = self._entries[platform][int(match.lastgroup[1:])]
+            path = os.path.join(self.template_dir, template)
+
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[key] = path
+        return path
+
+    def commands(self, platform='huawei_vrp'):
+        """平台支持解析的命令列表 (显示名，去重；正则形式的 index 命令不列出)"""
+        seen = set()
+        return [display for display, _ in self._entries.get(platform, [])
+                if display is not None and not (display in seen or seen.add(display))]
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_template_resolver():
+    """
+    进程级单例 (只构建一次)：找到 ntc-templates index 时与仓库命令表合并 (仓库命令表优先)，
+    找不到时只使用仓库命令表
+    """
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                index_path = find_ntc_index()
+                _resolver = TemplateResolver.from_index(index_path, FALLBACK_COMMANDS) if index_path else TemplateResolver.from_mapping()
+    return _resolver
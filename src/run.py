@@ -1,21 +1,37 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 import sys
 import os
 import json
+import time
+import atexit
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
 from datetime import datetime
 
 # 引入数据库模块
-from app.database import init_db, save_log, get_history, get_logs_by_device
+from app.database import (init_db, save_log, save_logs, get_history, fail_interrupted_jobs, get_logs_page, iter_logs,
+                          add_listener, close_connections, log_writer, query_results)
 
 # 确保能导入 core 模块
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from core.ssh_client import NetworkDevice
+from app.device_registry import device_registry
+from app.job_runner import JobRunner
+from app.ndjson import ndjson_response, parse_fields, project_rows, wants_ndjson
+from app.response_cache import response_cache
+from core.icmp_sweep import IcmpSweeper
+from core.session_pool import SessionPool
+from core.ssh_client import has_error
+from core.template_cache import template_registry
+from core.template_resolver import get_template_resolver
+from utils.metrics import metrics
 
 app = Flask(__name__, template_folder='app/templates', static_folder='app/static')
 
-# 设备配置存储（生产环境中应该存储在数据库中）
-devices = [
+# SSH 会话池：同一设备的多次 API 调用复用已登录的 Shell，省去每次握手/认证/提示符探测
+session_pool = SessionPool(max_sessions_per_device=2, idle_timeout=300, max_age=1800)
+
+# 设备存储在数据库 devices 表中 (见 app/device_registry.py)，表为空时写入以下演示设备
+DEFAULT_DEVICES = [
     {
         'id': 1,
         'name': '核心交换机',
@@ -24,6 +40,7 @@ devices = [
         'username': 'admin',
         'password': 'Admin@123',
         'device_type': 'huawei_vrp',
+        'group': 'core',
         'status': 'online'
     }
 ]
@@ -31,39 +48,44 @@ devices = [
 # 模板路径
 TEMPLATE_PATH = "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_ip_interface_brief.textfsm"
 
+# 全网巡检线程池 (所有请求共用，限制同时连接的设备数) 与单台设备超时 (秒)
+SCAN_WORKERS = 16
+SCAN_DEVICE_TIMEOUT = 60
+scan_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="FleetScan")
+# TextFSM 解析线程池：设备 I/O 线程把输出交给它后立即发送下一条命令
+PARSE_WORKERS = 4
+parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="Parse")
+
+# 响应缓存 TTL (秒)：仪表板轮询接口短 TTL，命令目录在进程生命周期内不变
+DASHBOARD_CACHE_TTL = 5
+CATALOG_CACHE_TTL = 300
+
+# 设备表 / 巡检记录写入时清除依赖它们的缓存响应
+add_listener('devices', lambda: response_cache.invalidate('devices'))
+add_listener('logs', lambda: response_cache.invalidate('logs'))
+
 def get_device_by_id(device_id):
-    """根据ID获取设备配置"""
-    for device in devices:
-        if device['id'] == device_id:
-            return device
-    return None
+    """根据ID获取设备配置 (进程内索引缓存，O(1))"""
+    return device_registry.get(device_id)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/api/devices')
+@response_cache.cached(DASHBOARD_CACHE_TTL, tags=('devices',))
 def get_devices():
     """获取设备列表"""
-    return jsonify({"status": "success", "data": devices})
+    return jsonify({"status": "success", "data": device_registry.all()})
 
 @app.route('/api/devices', methods=['POST'])
 def add_device():
     """添加新设备"""
     data = request.get_json()
 
-    new_device = {
-        'id': len(devices) + 1,
-        'name': data.get('name', ''),
-        'host': data.get('host', ''),
-        'port': data.get('port', 22),
-        'username': data.get('username', ''),
-        'password': data.get('password', ''),
-        'device_type': data.get('device_type', 'huawei_vrp'),
-        'status': 'unknown'
-    }
-
-    devices.append(new_device)
+    new_device = device_registry.add(data)
+    if new_device is None:
+        return jsonify({"status": "error", "message": "Failed to add device"}), 500
     return jsonify({"status": "success", "data": new_device})
 
 @app.route('/api/devices/<int:device_id>', methods=['PUT'])
@@ -74,17 +96,21 @@ def update_device(device_id):
         return jsonify({"status": "error", "message": "Device not found"}), 404
 
     data = request.get_json()
-    for key in ['name', 'host', 'port', 'username', 'password', 'device_type']:
-        if key in data:
-            device[key] = data[key]
+    # 连接参数可能变化，先关闭该设备的旧会话
+    session_pool.discard_device(device)
+    device = device_registry.update(device_id, data)
+    if device is None:
+        return jsonify({"status": "error", "message": "Failed to update device"}), 500
 
     return jsonify({"status": "success", "data": device})
 
 @app.route('/api/devices/<int:device_id>', methods=['DELETE'])
 def delete_device(device_id):
     """删除设备"""
-    global devices
-    devices = [d for d in devices if d['id'] != device_id]
+    device = get_device_by_id(device_id)
+    if device:
+        session_pool.discard_device(device)
+        device_registry.delete(device_id)
     return jsonify({"status": "success", "message": "Device deleted"})
 
 @app.route('/api/devices/<int:device_id>/connect', methods=['POST'])
@@ -95,13 +121,13 @@ def test_connection(device_id):
         return jsonify({"status": "error", "message": "Device not found"}), 404
 
     try:
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             # 尝试执行简单命令测试连接
             result = dev.execute_command("display version", expect_prompt=b']')
-            device['status'] = 'online'
+            device_registry.set_status(device_id, 'online')
             return jsonify({"status": "success", "message": "Connection successful", "data": result})
     except Exception as e:
-        device['status'] = 'offline'
+        device_registry.set_status(device_id, 'offline')
         return jsonify({"status": "error", "message": str(e)})
 
 @app.route('/api/scan/interfaces')
@@ -116,9 +142,9 @@ def scan_interfaces():
     command = "display ip interface brief"  # 定义命令变量方便存库
 
     try:
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             # 进系统视图
-            dev.execute_command("system-view", expect_prompt=b']')
+            dev.enter_system_view()
 
             # 执行巡检
             data = dev.get_output_with_template(command, TEMPLATE_PATH)
@@ -153,9 +179,9 @@ def scan_device_interfaces(device_id):
     command = "display ip interface brief"
 
     try:
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             # 进系统视图
-            dev.execute_command("system-view", expect_prompt=b']')
+            dev.enter_system_view()
 
             # 执行巡检
             data = dev.get_output_with_template(command, TEMPLATE_PATH)
@@ -176,33 +202,130 @@ def scan_device_interfaces(device_id):
         save_log(device['host'], command, str(e), status="exception")
         return jsonify({"status": "error", "message": str(e)})
 
+def _scan_one_device(device, command, started):
+    """
+    在线程池中巡检单台设备
+    :param started: 共享字典，记录每台设备真正开始执行的时间 (用于单设备超时判断)
+    :return: (结果字典, 日志记录)，结果字典中的 online 供汇总后批量更新设备状态
+    """
+    started[device['id']] = time.monotonic()
+    result = {"device_id": device['id'], "name": device.get('name'), "host": device['host']}
+
+    try:
+        with session_pool.session(device) as dev:
+            dev.enter_system_view()
+            data = dev.get_output_with_template(command, TEMPLATE_PATH)
+
+        result["online"] = True
+        if isinstance(data, dict) and "error" in data:
+            result.update(status="error", message=data["error"])
+            log_row = (device['host'], command, data, "error")
+        else:
+            result.update(status="success", data=data)
+            log_row = (device['host'], command, data, "success")
+    except Exception as e:
+        result["online"] = False
+        result.update(status="error", message=str(e))
+        log_row = (device['host'], command, str(e), "exception")
+
+    result["elapsed"] = round(time.monotonic() - started[device['id']], 3)
+    return result, log_row
+
+def _fleet_scan(targets, command, device_timeout):
+    """
+    并发巡检多台设备，设备完成一台就产出一条结果，最后产出汇总
+    全部日志与设备在线状态在结束时一次性批量写库
+    """
+    started = {}
+    futures = {scan_executor.submit(_scan_one_device, device, command, started): device for device in targets}
+    pending = set(futures)
+    log_rows = []
+    statuses = {}
+    counts = {"success": 0, "error": 0, "timeout": 0}
+    begin = time.monotonic()
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result, log_row = future.result()
+                statuses[result["device_id"]] = 'online' if result.pop("online") else 'offline'
+                counts[result["status"]] += 1
+                log_rows.append(log_row)
+                yield result
+
+            # 已开始执行但超过单设备超时的，直接报告超时 (排队中的设备不计时)
+            now = time.monotonic()
+            for future in list(pending):
+                device = futures[future]
+                device_started = started.get(device['id'])
+                if device_started is not None and now - device_started > device_timeout:
+                    pending.discard(future)
+                    counts["timeout"] += 1
+                    message = f"Scan timed out after {device_timeout}s"
+                    log_rows.append((device['host'], command, message, "timeout"))
+                    yield {"device_id": device['id'], "name": device.get('name'), "host": device['host'],
+                           "status": "timeout", "message": message}
+
+        yield {"summary": dict(counts, total=len(targets), elapsed=round(time.monotonic() - begin, 3))}
+    finally:
+        # 客户端中途断开也保证已完成的结果落库
+        save_logs(log_rows)
+        device_registry.set_statuses(statuses)
+
+def _fleet_scan_response(targets):
+    """全网巡检响应：默认以 NDJSON 流式返回，stream=false 时汇总后一次性返回 JSON"""
+    command = "display ip interface brief"
+    device_timeout = request.args.get('timeout', default=SCAN_DEVICE_TIMEOUT, type=float)
+    stream = request.args.get('stream', default='true').lower() != 'false'
+
+    if stream:
+        def generate():
+            for item in _fleet_scan(targets, command, device_timeout):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    items = list(_fleet_scan(targets, command, device_timeout))
+    return jsonify({"status": "success", "data": {"results": items[:-1], "summary": items[-1]["summary"]}})
+
+@app.route('/api/scan/all')
+def scan_all_devices():
+    """对全部设备并发执行接口巡检"""
+    return _fleet_scan_response(device_registry.all())
+
+@app.route('/api/scan/group/<group>')
+def scan_device_group(group):
+    """对指定分组的设备并发执行接口巡检"""
+    targets = device_registry.by_group(group)
+    if not targets:
+        return jsonify({"status": "error", "message": f"No devices in group: {group}"}), 404
+    return _fleet_scan_response(targets)
+
 @app.route('/api/ping-all', methods=['POST'])
 def ping_all_devices():
-    """对所有设备执行ping测试"""
+    """对所有设备并发执行ping测试"""
+    devices = device_registry.all()
+    try:
+        sweep = IcmpSweeper(count=1, timeout=3).sweep([device['host'] for device in devices])
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "data": []})
+
     results = []
-    for device in devices:
-        try:
-            # 这里应该实现ping功能，暂时模拟
-            import subprocess
-            result = subprocess.run(['ping', '-c', '1', '-W', '3', device['host']],
-                                    stdout=subprocess.DEVNULL,
-                                    stderr=subprocess.DEVNULL)
-            is_reachable = result.returncode == 0
-            device['status'] = 'online' if is_reachable else 'offline'
-            results.append({
-                'device_id': device['id'],
-                'host': device['host'],
-                'reachable': is_reachable
-            })
-        except Exception as e:
-            device['status'] = 'offline'
-            results.append({
-                'device_id': device['id'],
-                'host': device['host'],
-                'reachable': False,
-                'error': str(e)
-            })
+    statuses = {}
+    for device, probe in zip(devices, sweep):
+        statuses[device['id']] = 'online' if probe['reachable'] else 'offline'
+        result = {
+            'device_id': device['id'],
+            'host': device['host'],
+            'reachable': probe['reachable'],
+            'rtt_avg': probe['rtt_avg']
+        }
+        if 'error' in probe:
+            result['error'] = probe['error']
+        results.append(result)
 
+    device_registry.set_statuses(statuses)
     return jsonify({"status": "success", "data": results})
 
 @app.route('/api/ping/direct/<int:device_id>', methods=['POST'])
@@ -282,7 +405,7 @@ def ping_via_ssh(device_id):
         timeout = data.get('timeout', 5)
         size = data.get('size', None)
 
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             # 执行ping测试
             ping_result = dev.ping_test(target_ip, count=count, timeout=timeout, size=size)
 
@@ -318,93 +441,108 @@ def ping_via_ssh(device_id):
             "data": {"target_ip": target_ip, "reachable": False}
         })
 
+# ssh 批量 ping 同时使用的最大通道数 (华为设备默认最多 5 个 VTY 用户，留一个给其它会话)
+MAX_PING_CHANNELS = 4
+
+def _ssh_ping_result(target_name, target_ip, ping_result):
+    """设备上 ping 的解析结果 -> 批量 ping 结果项"""
+    if isinstance(ping_result, dict) and "error" in ping_result:
+        return {
+            'target': target_name,
+            'target_ip': target_ip,
+            'reachable': False,
+            'error': ping_result.get('error', 'SSH ping failed')
+        }
+    is_reachable = len(ping_result) > 0 and float(ping_result[0].get('packet_loss', 100)) < 100  # Assume less than 100% loss means reachable
+    return {
+        'target': target_name,
+        'target_ip': target_ip,
+        'reachable': is_reachable,
+        'rtt_min': ping_result[0].get('rtt_min') if ping_result else None,
+        'rtt_avg': ping_result[0].get('rtt_avg') if ping_result else None,
+        'rtt_max': ping_result[0].get('rtt_max') if ping_result else None
+    }
+
+def _iter_ping_targets(targets, ping_method='direct', device_id=None, channels=1):
+    """
+    批量 ping 目标，按完成顺序产出 (目标下标, 结果项)
+    - direct: IcmpSweeper 并发探测全部目标，支持 CIDR (如 192.168.1.0/24)
+    - ssh: 借出一条会话，所有目标都在这一条 SSH 连接上执行；channels > 1 时在同一连接上多开通道并行 ping
+    """
+    if ping_method == 'direct':
+        yield from enumerate(IcmpSweeper(count=3, timeout=5).sweep(targets))
+        return
+    if ping_method != 'ssh' or not device_id:
+        return
+
+    parsed = []
+    for target in targets:
+        target_ip = target if isinstance(target, str) else target.get('ip', '')
+        target_name = target.get('name', target_ip) if isinstance(target, dict) else target_ip
+        parsed.append((target_name, target_ip))
+
+    device = get_device_by_id(device_id)
+    valid = []
+    for index, (target_name, target_ip) in enumerate(parsed):
+        if not target_ip:
+            yield index, {'target': target_name, 'target_ip': target_ip, 'reachable': False, 'error': 'Invalid target IP'}
+        elif not device:
+            yield index, {'target': target_name, 'target_ip': target_ip, 'reachable': False, 'error': 'Device not found'}
+        else:
+            valid.append(index)
+    if not valid:
+        return
+
+    done = set()
+    try:
+        with session_pool.session(device) as dev:
+            channels = max(1, min(int(channels), MAX_PING_CHANNELS))
+            for i, ping_result in dev.ping_many([parsed[index][1] for index in valid],
+                                                count=3, timeout=5, channels=channels):
+                index = valid[i]
+                done.add(index)
+                yield index, _ssh_ping_result(*parsed[index], ping_result)
+    except Exception as e:
+        # 建立会话失败等情况：尚未完成的目标都记为失败
+        for index in valid:
+            if index not in done:
+                target_name, target_ip = parsed[index]
+                yield index, {'target': target_name, 'target_ip': target_ip, 'reachable': False, 'error': str(e)}
+
+def _ping_targets(targets, ping_method='direct', device_id=None, channels=1):
+    """批量 ping 目标，结果按请求中的目标顺序返回 (批量 ping 接口与后台任务共用)"""
+    results = dict(_iter_ping_targets(targets, ping_method, device_id, channels))
+    return [results[index] for index in sorted(results)]
+
 @app.route('/api/ping/batch', methods=['POST'])
 def ping_batch():
-    """批量ping测试"""
+    """
+    批量ping测试
+    请求体: {"targets": [...], "method": "direct" | "ssh", "device_id": 1, "channels": 1, "stream": false}
+    stream=true 时以 NDJSON 逐行返回结果 (按完成顺序，每项带 index)，不必等整批结束
+    """
     try:
         data = request.get_json() or {}
         targets = data.get('targets', [])
         ping_method = data.get('method', 'direct')  # 'direct' or 'ssh'
         device_id = data.get('device_id', None)  # Required for SSH method
+        channels = data.get('channels', 1)  # SSH method: parallel shell channels on one connection
 
         if ping_method == 'ssh' and not device_id:
             return jsonify({"status": "error", "message": "Device ID is required for SSH ping method"}), 400
 
-        results = []
-
-        for target in targets:
-            target_ip = target if isinstance(target, str) else target.get('ip', '')
-            target_name = target.get('name', target_ip) if isinstance(target, dict) else target_ip
-
-            if not target_ip:
-                results.append({
-                    'target': target_name,
-                    'target_ip': target_ip,
-                    'reachable': False,
-                    'error': 'Invalid target IP'
-                })
-                continue
-
-            if ping_method == 'direct':
-                # Direct ping from server
-                import subprocess
+        if data.get('stream'):
+            def generate():
                 try:
-                    result = subprocess.run(['ping', '-c', '3', '-W', '5', target_ip],
-                                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-                    is_reachable = result.returncode == 0
-                    results.append({
-                        'target': target_name,
-                        'target_ip': target_ip,
-                        'reachable': is_reachable
-                    })
+                    for index, result in _iter_ping_targets(targets, ping_method, device_id, channels):
+                        yield json.dumps(dict(result, index=index), ensure_ascii=False) + '\n'
                 except Exception as e:
-                    results.append({
-                        'target': target_name,
-                        'target_ip': target_ip,
-                        'reachable': False,
-                        'error': str(e)
-                    })
-            elif ping_method == 'ssh' and device_id:
-                # SSH ping through device
-                device = get_device_by_id(device_id)
-                if not device:
-                    results.append({
-                        'target': target_name,
-                        'target_ip': target_ip,
-                        'reachable': False,
-                        'error': 'Device not found'
-                    })
-                    continue
+                    yield json.dumps({"error": str(e)}, ensure_ascii=False) + '\n'
 
-                try:
-                    with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
-                        ping_result = dev.ping_test(target_ip, count=3, timeout=5)
-
-                        if isinstance(ping_result, dict) and "error" in ping_result:
-                            results.append({
-                                'target': target_name,
-                                'target_ip': target_ip,
-                                'reachable': False,
-                                'error': ping_result.get('error', 'SSH ping failed')
-                            })
-                        else:
-                            is_reachable = len(ping_result) > 0 and float(ping_result[0].get('packet_loss', 100)) < 100  # Assume less than 100% loss means reachable
-                            results.append({
-                                'target': target_name,
-                                'target_ip': target_ip,
-                                'reachable': is_reachable,
-                                'rtt_min': ping_result[0].get('rtt_min') if ping_result else None,
-                                'rtt_avg': ping_result[0].get('rtt_avg') if ping_result else None,
-                                'rtt_max': ping_result[0].get('rtt_max') if ping_result else None
-                            })
-                except Exception as e:
-                    results.append({
-                        'target': target_name,
-                        'target_ip': target_ip,
-                        'reachable': False,
-                        'error': str(e)
-                    })
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        results = _ping_targets(targets, ping_method, device_id, channels)
 
         return jsonify({
             "status": "success",
@@ -420,32 +558,15 @@ def ping_batch():
 
 
 # 模板映射，将命令映射到对应的TextFSM模板（针对EVE-NG环境优化）
-COMMAND_TEMPLATE_MAPPING = {
-    "display ip interface brief": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_ip_interface_brief.textfsm",
-    "display version": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_version.textfsm",
-    "display device": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_device.textfsm",
-    "display interface": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_interface.textfsm",
-    "display interface brief": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_interface_brief.textfsm",
-    "display interface description": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_interface_description.textfsm",
-    "display vlan": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_vlan.textfsm",
-    "display vlan brief": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_vlan_brief.textfsm",
-    "display arp": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_arp_all.textfsm",
-    "display arp brief": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_arp_brief.textfsm",
-    "display mac-address": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_mac-address.textfsm",
-    "display lldp neighbor": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_lldp_neighbor.textfsm",
-    "display stp brief": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_stp_brief.textfsm",
-    "display users": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_users.textfsm",
-    "display clock": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_clock.textfsm",
-    "display memory": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_memory.textfsm",
-    "display cpu-usage": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_cpu-usage.textfsm",
-    "display ip routing-table": "/root/github/python-automation-learning/venv/lib/python3.10/site-packages/ntc_templates/templates/huawei_vrp_display_ip_routing-table.textfsm"
-}
+# 命令 -> 模板解析器 (启动时由 ntc-templates index 编译一次，支持 dis ip int br 等缩写)
+template_resolver = get_template_resolver()
 
 
 @app.route('/api/commands', methods=['GET'])
+@response_cache.cached(CATALOG_CACHE_TTL)
 def get_available_commands():
     """获取系统支持的命令列表"""
-    commands = list(COMMAND_TEMPLATE_MAPPING.keys())
+    commands = template_resolver.commands()
     return jsonify({
         "status": "success",
         "data": {
@@ -457,7 +578,11 @@ def get_available_commands():
 
 @app.route('/api/execute-command/<int:device_id>', methods=['POST'])
 def execute_device_command(device_id):
-    """在设备上执行指定命令并返回解析结果"""
+    """
+    在设备上执行指定命令并返回解析结果
+    请求体: {"command": "...", "fields": ["interface", "ip"], "include_raw": true, "format": "json" | "ndjson"}
+    format=ndjson 时先输出一行 {"meta": {...}}，再每行输出一条解析结果 (客户端支持时 gzip 压缩)
+    """
     device = get_device_by_id(device_id)
     if not device:
         return jsonify({"status": "error", "message": "Device not found"}), 404
@@ -465,32 +590,23 @@ def execute_device_command(device_id):
     try:
         data = request.get_json() or {}
         command = data.get('command', '').strip()
+        fields = parse_fields(data.get('fields'))
+        include_raw = bool(data.get('include_raw', True))
 
         if not command:
             return jsonify({"status": "error", "message": "Command is required"}), 400
 
-        # 检查是否有对应的模板（精确匹配优先，然后是包含匹配）
-        template_path = None
-
-        # 首先尝试精确匹配
-        if command.lower() in COMMAND_TEMPLATE_MAPPING:
-            template_path = COMMAND_TEMPLATE_MAPPING[command.lower()]
-        else:
-            # 如果没有精确匹配，尝试包含匹配（按长度倒序排列，优先匹配更长的命令）
-            sorted_patterns = sorted(COMMAND_TEMPLATE_MAPPING.keys(), key=len, reverse=True)
-            for cmd_pattern in sorted_patterns:
-                if cmd_pattern in command.lower():
-                    template_path = COMMAND_TEMPLATE_MAPPING[cmd_pattern]
-                    break
+        # 查找对应的模板 (预编译正则，支持缩写)
+        template_path = template_resolver.resolve(command, device.get('device_type', 'huawei_vrp'))
 
         if not template_path:
             return jsonify({
                 "status": "error",
                 "message": f"No template found for command: {command}",
-                "supported_commands": list(COMMAND_TEMPLATE_MAPPING.keys())
+                "supported_commands": template_resolver.commands()
             }), 400
 
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             try:
                 # 进入系统视图
                 dev.enter_system_view()
@@ -499,7 +615,7 @@ def execute_device_command(device_id):
                 raw_output = dev.execute_command(command)
 
                 # 检查原始输出中是否包含错误信息
-                if "Error:" in raw_output or "error:" in raw_output or "Invalid input" in raw_output or "Unrecognized command" in raw_output:
+                if has_error(raw_output):
                     # 命令执行失败，记录错误日志
                     save_log(device['host'], command, raw_output, status="error")
                     return jsonify({
@@ -516,29 +632,29 @@ def execute_device_command(device_id):
                     }), 500
 
                 try:
-                    import textfsm
-                    with open(template_path, 'r', encoding='utf-8') as f:
-                        re_table = textfsm.TextFSM(f)
-                        result = re_table.ParseText(raw_output)
-                        headers = re_table.header
-
-                        # 强制转小写 (方便前端调用)
-                        headers_lower = [h.lower() for h in headers]
-
-                        # 组合成字典
-                        parsed_data = [dict(zip(headers_lower, row)) for row in result]
+                    # 使用进程级模板缓存解析 (字段名已转小写)
+                    with metrics.timer('parse', device['host'], command):
+                        parsed_data = template_registry.parse(template_path, raw_output)
 
                     # 记录成功日志
                     save_log(device['host'], command, parsed_data, status="success")
 
+                    result = {
+                        "command": command,
+                        "status": "success",
+                        "parsed_result": project_rows(parsed_data, fields),
+                        "raw_output": raw_output,
+                        "template_used": os.path.basename(template_path)
+                    }
+                    if wants_ndjson(data):
+                        return ndjson_response(_ndjson_command(_shape_result(result, None, include_raw)))
+
+                    del result["status"]
+                    if not include_raw:
+                        del result["raw_output"]
                     return jsonify({
                         "status": "success",
-                        "data": {
-                            "command": command,
-                            "parsed_result": parsed_data,
-                            "raw_output": raw_output,
-                            "template_used": os.path.basename(template_path)
-                        }
+                        "data": result
                     })
 
                 except Exception as e:
@@ -569,9 +685,144 @@ def execute_device_command(device_id):
         })
 
 
+def _sse(event, data):
+    """编码一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/execute-command/<int:device_id>/stream')
+def stream_device_command(device_id):
+    """
+    以 Server-Sent Events 流式返回命令输出 (EventSource 只支持 GET，命令通过 ?command= 传入)
+    事件: output {"lines": [...]} (每收到一批输出发送一次)
+          result {"status", "parsed_result", "template_used", "line_count"} (输出结束后发送解析结果)
+          error  {"message"}
+    """
+    device = get_device_by_id(device_id)
+    if not device:
+        return jsonify({"status": "error", "message": "Device not found"}), 404
+
+    command = request.args.get('command', '').strip()
+    if not command:
+        return jsonify({"status": "error", "message": "Command is required"}), 400
+
+    template_path = template_resolver.resolve(command, device.get('device_type', 'huawei_vrp'))
+    if template_path and not os.path.exists(template_path):
+        template_path = None
+
+    def generate():
+        # 边收边解析：原始输出只以 "一批行" 为单位经过内存，不再整段缓存
+        parser = template_registry.stream_parser(template_path) if template_path else None
+        error_lines = []
+        line_count = 0
+        try:
+            with session_pool.session(device) as dev:
+                dev.enter_system_view()
+                for lines in dev.stream_command(command):
+                    line_count += len(lines)
+                    error_lines.extend(line for line in lines if has_error(line))
+                    if parser and not error_lines:
+                        parser.feed(lines)
+                    yield _sse('output', {"lines": lines})
+
+            if error_lines:
+                save_log(device['host'], command, '\n'.join(error_lines), status="error")
+                yield _sse('result', {"status": "error", "message": '\n'.join(error_lines),
+                                      "line_count": line_count})
+                return
+
+            parsed_data = parser.finish() if parser else None
+            save_log(device['host'], command, parsed_data if parser else f"{line_count} lines (raw)",
+                     status="success")
+            yield _sse('result', {
+                "status": "success",
+                "parsed_result": parsed_data,
+                "template_used": os.path.basename(template_path) if template_path else None,
+                "line_count": line_count
+            })
+        except Exception as e:
+            save_log(device['host'], command, str(e), status="exception")
+            yield _sse('error', {"message": str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _shape_result(result, fields, include_raw):
+    """按 fields 投影解析结果，include_raw=false 时去掉原始输出 (没有模板的命令仍保留，否则没有任何结果)"""
+    result = dict(result, parsed_result=project_rows(result.get("parsed_result"), fields))
+    if not include_raw and result["parsed_result"] is not None:
+        result.pop("raw_output", None)
+    return result
+
+def _ndjson_command(result):
+    """一条命令结果的 NDJSON 行：先输出 {"meta": 除解析结果外的字段}，再每行输出一条解析结果"""
+    rows = result.get("parsed_result")
+    meta = {key: value for key, value in result.items() if key != "parsed_result"}
+    meta["rows"] = len(rows) if isinstance(rows, list) else None
+    yield {"meta": meta}
+    if isinstance(rows, list):
+        yield from rows
+
+def _run_command_list(dev, device, commands):
+    """在同一个会话中依次执行命令，有模板的按模板解析 (批量命令接口与后台任务共用)"""
+    return list(_iter_command_list(dev, device, commands))
+
+def _iter_command_list(dev, device, commands):
+    """逐条执行命令，每执行完一条产出一条结果"""
+    for command in commands:
+        command = command.strip()
+        if not command:
+            continue
+
+        # 查找对应的模板 (预编译正则，支持缩写)
+        template_path = template_resolver.resolve(command, device.get('device_type', 'huawei_vrp'))
+
+        command_result = {
+            "command": command,
+            "status": "success",
+            "parsed_result": [],
+            "raw_output": "",
+            "error": None
+        }
+
+        try:
+            # 执行命令
+            raw_output = dev.execute_command(command)
+            command_result["raw_output"] = raw_output
+
+            # 检查原始输出中是否包含错误信息
+            if has_error(raw_output):
+                command_result["status"] = "error"
+                command_result["error"] = f"Command execution failed: {raw_output}"
+                yield command_result
+                continue
+
+            # 如果有对应模板，则尝试解析
+            if template_path and os.path.exists(template_path):
+                # 使用进程级模板缓存解析 (字段名已转小写)
+                with metrics.timer('parse', device['host'], command):
+                    parsed_data = template_registry.parse(template_path, raw_output)
+                command_result["parsed_result"] = parsed_data
+                command_result["template_used"] = os.path.basename(template_path)
+            else:
+                # 没有对应模板，只返回原始输出
+                command_result["parsed_result"] = None
+                command_result["message"] = "No template available for this command, returning raw output"
+
+            yield command_result
+
+        except Exception as e:
+            command_result["status"] = "error"
+            command_result["error"] = str(e)
+            yield command_result
+
+
 @app.route('/api/batch-commands/<int:device_id>', methods=['POST'])
 def execute_batch_commands(device_id):
-    """批量执行命令"""
+    """
+    批量执行命令
+    请求体: {"commands": [...], "fields": [...], "include_raw": true, "format": "json" | "ndjson"}
+    format=ndjson 时每执行完一条命令就输出它的 {"meta": {...}} 行与解析结果行，不等整批结束
+    """
     device = get_device_by_id(device_id)
     if not device:
         return jsonify({"status": "error", "message": "Device not found"}), 404
@@ -579,82 +830,28 @@ def execute_batch_commands(device_id):
     try:
         data = request.get_json() or {}
         commands = data.get('commands', [])
+        fields = parse_fields(data.get('fields'))
+        include_raw = bool(data.get('include_raw', True))
 
         if not commands:
             return jsonify({"status": "error", "message": "Commands list is required"}), 400
 
-        results = []
+        if wants_ndjson(data):
+            def generate():
+                try:
+                    with session_pool.session(device) as dev:
+                        dev.enter_system_view()
+                        for result in _iter_command_list(dev, device, commands):
+                            yield from _ndjson_command(_shape_result(result, fields, include_raw))
+                except Exception as e:
+                    yield {"meta": {"status": "error", "message": str(e)}}
+            return ndjson_response(generate())
 
-        with NetworkDevice(**{k: v for k, v in device.items() if k in ['host', 'username', 'password', 'port', 'device_type']}) as dev:
+        with session_pool.session(device) as dev:
             # 进入系统视图
             dev.enter_system_view()
-
-            for command in commands:
-                command = command.strip()
-                if not command:
-                    continue
-
-                # 检查是否有对应的模板（精确匹配优先，然后是包含匹配）
-                template_path = None
-
-                # 首先尝试精确匹配
-                if command.lower() in COMMAND_TEMPLATE_MAPPING:
-                    template_path = COMMAND_TEMPLATE_MAPPING[command.lower()]
-                else:
-                    # 如果没有精确匹配，尝试包含匹配（按长度倒序排列，优先匹配更长的命令）
-                    sorted_patterns = sorted(COMMAND_TEMPLATE_MAPPING.keys(), key=len, reverse=True)
-                    for cmd_pattern in sorted_patterns:
-                        if cmd_pattern in command.lower():
-                            template_path = COMMAND_TEMPLATE_MAPPING[cmd_pattern]
-                            break
-
-                command_result = {
-                    "command": command,
-                    "status": "success",
-                    "parsed_result": [],
-                    "raw_output": "",
-                    "error": None
-                }
-
-                try:
-                    # 执行命令
-                    raw_output = dev.execute_command(command)
-                    command_result["raw_output"] = raw_output
-
-                    # 检查原始输出中是否包含错误信息
-                    if "Error:" in raw_output or "error:" in raw_output or "Invalid input" in raw_output or "Unrecognized command" in raw_output:
-                        command_result["status"] = "error"
-                        command_result["error"] = f"Command execution failed: {raw_output}"
-                        results.append(command_result)
-                        continue
-
-                    # 如果有对应模板，则尝试解析
-                    if template_path and os.path.exists(template_path):
-                        import textfsm
-                        with open(template_path, 'r', encoding='utf-8') as f:
-                            re_table = textfsm.TextFSM(f)
-                            result = re_table.ParseText(raw_output)
-                            headers = re_table.header
-
-                            # 强制转小写 (方便前端调用)
-                            headers_lower = [h.lower() for h in headers]
-
-                            # 组合成字典
-                            parsed_data = [dict(zip(headers_lower, row)) for row in result]
-
-                        command_result["parsed_result"] = parsed_data
-                        command_result["template_used"] = os.path.basename(template_path)
-                    else:
-                        # 没有对应模板，只返回原始输出
-                        command_result["parsed_result"] = None
-                        command_result["message"] = "No template available for this command, returning raw output"
-
-                    results.append(command_result)
-
-                except Exception as e:
-                    command_result["status"] = "error"
-                    command_result["error"] = str(e)
-                    results.append(command_result)
+            results = [_shape_result(result, fields, include_raw)
+                       for result in _iter_command_list(dev, device, commands)]
 
         return jsonify({
             "status": "success",
@@ -670,11 +867,293 @@ def execute_batch_commands(device_id):
             "message": str(e)
         })
 
+def _select_devices(data):
+    """
+    按请求中的选择器挑选设备
+    {"device_ids": [1, 2]} 指定设备，{"group": "core"} 指定分组，都不传表示全部设备
+    :return: (设备列表, 不存在的设备 ID 列表)
+    """
+    if data.get('device_ids'):
+        devices, missing = [], []
+        for device_id in data['device_ids']:
+            device = get_device_by_id(device_id)
+            if device:
+                devices.append(device)
+            else:
+                missing.append(device_id)
+        return devices, missing
+    if data.get('group'):
+        return device_registry.by_group(data['group']), []
+    return device_registry.all(), []
+
+def _parse_cell(host, command, output, template_path, include_raw):
+    """解析矩阵中的一格 (在解析线程池中执行)"""
+    started = time.perf_counter()
+    cell = {"status": "success", "rows": None}
+
+    if has_error(output):
+        cell.update(status="error", output=output)
+    elif template_path and os.path.exists(template_path):
+        try:
+            with metrics.timer('parse', host, command):
+                cell["rows"] = template_registry.parse(template_path, output)
+            cell["template"] = os.path.basename(template_path)
+        except Exception as e:
+            cell.update(status="error", error=f"Parsing error: {e}")
+
+    # 没有模板的命令只能返回原始输出
+    if include_raw or (cell["rows"] is None and "output" not in cell):
+        cell["output"] = output
+    cell["parse_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return cell
+
+def _matrix_device(device, commands, include_raw):
+    """
+    在一个会话中依次执行全部命令 (I/O 线程)
+    每条命令的输出立即交给解析线程池，不等解析完成就发送下一条；会话归还后再收集解析结果
+    :return: (设备结果, 日志记录列表)
+    """
+    started = time.monotonic()
+    device_type = device.get('device_type', 'huawei_vrp')
+    entry = {"name": device.get('name'), "host": device['host'], "status": "success"}
+    pending = []
+
+    try:
+        with session_pool.session(device) as dev:
+            dev.enter_system_view()
+            for command in commands:
+                command_started = time.perf_counter()
+                output = dev.execute_command(command)
+                exec_ms = round((time.perf_counter() - command_started) * 1000, 3)
+                template_path = template_resolver.resolve(command, device_type)
+                future = parse_executor.submit(_parse_cell, device['host'], command, output, template_path, include_raw)
+                pending.append((command, exec_ms, future))
+        entry["online"] = True
+    except Exception as e:
+        entry.update(status="error", message=str(e), online=False)
+
+    cells = {}
+    log_rows = []
+    for command, exec_ms, future in pending:
+        cell = future.result()
+        cell["exec_ms"] = exec_ms
+        cells[command] = cell
+        if cell["status"] != "success":
+            entry["status"] = "error"
+        log_rows.append((device['host'], command, cell["rows"] if cell["rows"] is not None else cell.get("output"),
+                         cell["status"]))
+    if entry.get("message"):
+        log_rows.append((device['host'], 'matrix', entry["message"], "exception"))
+
+    entry["cells"] = cells
+    entry["elapsed"] = round(time.monotonic() - started, 3)
+    return entry, log_rows
+
+def _command_matrix(targets, commands, include_raw):
+    """
+    设备 × 命令矩阵：设备之间并发 (共用巡检线程池)，同一设备内的命令在一个会话中顺序执行
+    设备完成一台产出一条 (设备 ID, 结果)，最后产出汇总；日志与在线状态在结束时批量写库
+    """
+    begin = time.monotonic()
+    futures = {scan_executor.submit(_matrix_device, device, commands, include_raw): device for device in targets}
+    log_rows = []
+    statuses = {}
+    counts = {"success": 0, "error": 0}
+
+    try:
+        for future in as_completed(futures):
+            device = futures[future]
+            entry, rows = future.result()
+            statuses[device['id']] = 'online' if entry.pop("online") else 'offline'
+            counts[entry["status"]] += 1
+            log_rows.extend(rows)
+            yield device['id'], entry
+
+        yield None, dict(counts, devices=len(targets), commands=len(commands),
+                         elapsed=round(time.monotonic() - begin, 3))
+    finally:
+        save_logs(log_rows)
+        device_registry.set_statuses(statuses)
+
+@app.route('/api/matrix', methods=['POST'])
+def execute_command_matrix():
+    """
+    多设备 × 多命令执行
+    请求体: {"commands": [...], "device_ids": [1, 2] | "group": "core" (都不传为全部设备),
+            "include_raw": false, "stream": false}
+    返回: {"commands": [...], "devices": {设备ID: {"status", "elapsed",
+          "cells": {命令: {"status", "rows", "exec_ms", "parse_ms", ...}}}}, "summary": {...}}
+    stream=true 时以 NDJSON 逐台返回设备结果，最后一行为汇总
+    """
+    data = request.get_json() or {}
+    # 去掉空命令与重复命令 (结果按命令索引)
+    commands = list(dict.fromkeys(command.strip() for command in data.get('commands', []) if command.strip()))
+    if not commands:
+        return jsonify({"status": "error", "message": "Commands list is required"}), 400
+
+    targets, missing = _select_devices(data)
+    if missing:
+        return jsonify({"status": "error", "message": f"Device not found: {missing}"}), 404
+    if not targets:
+        return jsonify({"status": "error", "message": "No devices selected"}), 404
+
+    include_raw = bool(data.get('include_raw', False))
+
+    if data.get('stream'):
+        def generate():
+            for device_id, entry in _command_matrix(targets, commands, include_raw):
+                item = {"summary": entry} if device_id is None else dict(entry, device_id=device_id)
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    devices = {}
+    summary = None
+    for device_id, entry in _command_matrix(targets, commands, include_raw):
+        if device_id is None:
+            summary = entry
+        else:
+            devices[device_id] = entry
+    return jsonify({"status": "success", "data": {"commands": commands, "devices": devices, "summary": summary}})
+
+# 后台任务：长耗时的设备操作放到独立线程池执行，接口立即返回任务 ID
+JOB_WORKERS = 8
+job_runner = JobRunner(max_workers=JOB_WORKERS)
+
+def _job_device(params):
+    device = get_device_by_id(params.get('device_id'))
+    if not device:
+        raise ValueError(f"Device not found: {params.get('device_id')}")
+    return device
+
+def _job_scan(params):
+    """接口巡检任务 (同 /api/scan/device/<id>)"""
+    device = _job_device(params)
+    command = "display ip interface brief"
+
+    try:
+        with session_pool.session(device) as dev:
+            dev.enter_system_view()
+            data = dev.get_output_with_template(command, TEMPLATE_PATH)
+    except Exception as e:
+        save_log(device['host'], command, str(e), status="exception")
+        raise
+
+    if isinstance(data, dict) and "error" in data:
+        save_log(device['host'], command, data, status="error")
+        raise RuntimeError(data["error"])
+
+    save_log(device['host'], command, data, status="success")
+    return data
+
+def _job_commands(params):
+    """命令列表任务 (同 /api/batch-commands/<id>)"""
+    device = _job_device(params)
+    commands = params.get('commands') or []
+    if not commands:
+        raise ValueError("Commands list is required")
+
+    with session_pool.session(device) as dev:
+        dev.enter_system_view()
+        results = _run_command_list(dev, device, commands)
+    return {"device_id": device['id'], "results": results}
+
+def _job_ping_batch(params):
+    """批量 ping 任务 (同 /api/ping/batch)"""
+    ping_method = params.get('method', 'direct')
+    device_id = params.get('device_id')
+    if ping_method == 'ssh' and not device_id:
+        raise ValueError("Device ID is required for SSH ping method")
+    return _ping_targets(params.get('targets', []), ping_method, device_id, params.get('channels', 1))
+
+def _job_configure(params):
+    """配置下发任务：pipeline=true 时流水线发送，save=true 时下发后保存配置"""
+    device = _job_device(params)
+    commands = params.get('commands') or []
+    if not commands:
+        raise ValueError("Commands list is required")
+
+    dev = session_pool.checkout(device)
+    at_user_view = False
+    try:
+        results = dev.configure(commands, pipeline=bool(params.get('pipeline', False)))
+        failed = [r['command'] for r in results if r['status'] != 'success']
+        # 配置可能停在 interface / vlan 等子视图：先回到用户视图，再保存、归还会话
+        at_user_view = dev.return_to_user_view()
+        saved = bool(params.get('save')) and not failed and at_user_view
+        if saved:
+            dev.save_config()
+    finally:
+        # 执行出错或回不到用户视图的会话不再放回池中复用
+        session_pool.checkin(dev, discard=not at_user_view)
+
+    save_log(device['host'], 'configure', results, status="error" if failed else "success")
+    return {"device_id": device['id'], "results": results, "failed": failed, "saved": saved}
+
+job_runner.register('scan', _job_scan)
+job_runner.register('commands', _job_commands)
+job_runner.register('ping_batch', _job_ping_batch)
+job_runner.register('configure', _job_configure)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    提交后台任务，立即返回任务 ID
+    请求体: {"type": "scan" | "commands" | "ping_batch" | "configure", "device_id": 1, ...任务参数}
+    """
+    data = request.get_json() or {}
+    job_type = data.get('type')
+    params = {key: value for key, value in data.items() if key != 'type'}
+
+    if job_type not in job_runner.handlers:
+        return jsonify({"status": "error", "message": f"Unknown job type: {job_type}",
+                        "supported_types": sorted(job_runner.handlers)}), 400
+
+    device_id = params.get('device_id')
+    if device_id is not None and not get_device_by_id(device_id):
+        return jsonify({"status": "error", "message": "Device not found"}), 404
+
+    try:
+        job_id = job_runner.submit(job_type, params, device_id=device_id)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    return jsonify({
+        "status": "success",
+        "data": {"job_id": job_id, "job_status": "queued", "url": f"/api/jobs/{job_id}"}
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def get_job_status(job_id):
+    """查询任务状态与结果"""
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "data": job})
+
+def _history_response(device_ip=None):
+    """
+    历史记录查询 (keyset 分页)
+    参数: limit 单页行数，cursor 上一页返回的 next_cursor，status / since / until 过滤，
+    format=ndjson 时从游标开始流式导出全部匹配记录 (limit 可选)
+    """
+    args = request.args
+    filters = {'device_ip': device_ip or args.get('device_ip'), 'status': args.get('status'),
+               'since': args.get('since'), 'until': args.get('until')}
+    try:
+        # 只认查询参数 format=ndjson，不看 Accept：响应缓存以路径为键，同一路径不能有两种格式
+        if args.get('format', '').lower() == 'ndjson':
+            return ndjson_response(iter_logs(cursor=args.get('cursor'), limit=args.get('limit', type=int), **filters))
+        rows, next_cursor = get_logs_page(cursor=args.get('cursor'), limit=args.get('limit', default=20, type=int),
+                                          **filters)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "data": rows, "next_cursor": next_cursor})
+
 @app.route('/api/history')
+@response_cache.cached(DASHBOARD_CACHE_TTL, tags=('logs',))
 def api_history():
     """获取历史记录"""
-    logs = get_history()
-    return jsonify({"status": "success", "data": logs})
+    return _history_response()
 
 @app.route('/api/history/device/<int:device_id>')
 def api_history_by_device(device_id):
@@ -683,18 +1162,39 @@ def api_history_by_device(device_id):
     if not device:
         return jsonify({"status": "error", "message": "Device not found"}), 404
 
-    logs = get_logs_by_device(device['host'])
-    return jsonify({"status": "success", "data": logs})
+    return _history_response(device['host'])
+
+# 结构化结果查询单页最多返回的行数
+MAX_RESULT_ROWS = 1000
+
+@app.route('/api/results/<kind>')
+def api_typed_results(kind):
+    """
+    查询结构化巡检结果 (interfaces / routes / arp / mac / vlans)
+    参数: since / until 时间范围，limit 行数，其余参数按列等值过滤
+    例: /api/results/interfaces?status=down&since=2024-06-01
+    """
+    args = request.args.to_dict()
+    since = args.pop('since', None)
+    until = args.pop('until', None)
+    try:
+        limit = min(int(args.pop('limit', 100)), MAX_RESULT_ROWS)
+        rows = query_results(kind, since=since, until=until, limit=limit, **args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "data": rows})
 
 @app.route('/api/dashboard/stats')
+@response_cache.cached(DASHBOARD_CACHE_TTL, tags=('devices', 'logs'))
 def get_dashboard_stats():
     """获取仪表板统计信息"""
+    devices = device_registry.all()
     total_devices = len(devices)
     online_devices = len([d for d in devices if d.get('status') == 'online'])
     offline_devices = len([d for d in devices if d.get('status') == 'offline'])
 
-    # 获取最近的巡检记录
-    recent_logs = get_history(limit=5)
+    # 获取最近的巡检记录 (只需要最新一条的时间)
+    recent_logs = get_history(limit=1)
     last_scan = recent_logs[0]['timestamp'] if recent_logs else '-'
 
     return jsonify({
@@ -707,9 +1207,53 @@ def get_dashboard_stats():
         }
     })
 
+def _runtime_metrics():
+    """会话池、日志写入队列与响应缓存的计数器 (Prometheus 文本行)"""
+    pool = session_pool.stats()
+    lines = ["# TYPE netops_session_pool_sessions gauge"]
+    lines += [f'netops_session_pool_sessions{{state="{state}"}} {pool[state]}' for state in ('idle', 'in_use')]
+    lines.append("# TYPE netops_session_pool_events_total counter")
+    lines += [f'netops_session_pool_events_total{{event="{event}"}} {pool[event]}'
+              for event in ('created', 'reused', 'evicted', 'probe_failed')]
+    writer = log_writer.stats()
+    lines.append("# TYPE netops_log_writer_rows_total counter")
+    lines += [f'netops_log_writer_rows_total{{event="{event}"}} {writer[event]}'
+              for event in ('queued', 'flushed', 'dropped')]
+    lines.append("# TYPE netops_log_writer_pending gauge")
+    lines.append(f"netops_log_writer_pending {writer['pending']}")
+    lines.append("# TYPE netops_response_cache_events_total counter")
+    for route, counters in sorted(response_cache.stats()['routes'].items()):
+        lines += [f'netops_response_cache_events_total{{route="{route}",event="{event}"}} {counters[event]}'
+                  for event in ('hits', 'misses', 'invalidations')]
+    return lines
+
+metrics.add_collector(_runtime_metrics)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Prometheus 文本格式的指标 (阶段耗时直方图、会话池、日志写入队列、响应缓存)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """响应缓存命中统计"""
+    return jsonify({"status": "success", "data": response_cache.stats()})
+
 if __name__ == '__main__':
     # 启动应用前，先初始化数据库 (建表)
     init_db()
+    device_registry.seed(DEFAULT_DEVICES)
+    # 单进程开发服务器：上次进程退出时未完成的任务不会再执行
+    fail_interrupted_jobs()
+
+    # 定期淘汰空闲/过期的 SSH 会话，进程退出时关闭全部会话
+    session_pool.start_reaper()
+    atexit.register(session_pool.close_all)
+    atexit.register(close_connections)
+
+    # 巡检日志改为后台批量落盘；atexit 后注册先执行，退出时先落盘剩余记录再关闭连接
+    log_writer.start()
+    atexit.register(log_writer.close)
 
     # 启动Flask应用
     app.run(host='0.0.0.0', port=5002, debug=True)
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+设备吞吐基准测试：线程池 + NetworkDevice vs 单事件循环 + AsyncNetworkDevice
+
+用法 (在 src 目录下执行，需要 asyncssh):
+    python tests/bench_async_driver.py [--devices 200] [--threads 50] [--servers 4] [--latency-ms 200]
+
+在本地子进程中启动若干个 asyncssh 模拟的华为设备 (SSH 替身，每条命令模拟 latency-ms 的设备响应时间)，
+两种驱动分别对 N 台 "设备" 执行 连接 -> display ip interface brief -> 断开，统计每秒完成的设备数。
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+import asyncssh
+
+from core.async_device import AsyncNetworkDevice
+from core.ssh_client import NetworkDevice
+
+OUTPUT = (
+    'Interface                         IP Address/Mask      Physical   Protocol  \r\n'
+    'GigabitEthernet0/0/0              192.168.10.1/24      up         up        \r\n'
+    'NULL0                             unassigned           up         up(s)     \r\n'
+)
+CREDENTIALS = {'username': 'admin', 'password': 'Admin@123'}
+
+
+class _StandInServer(asyncssh.SSHServer):
+    """接受任意密码的最小 SSH 服务端"""
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+def _make_session_handler(latency):
+    async def handler(process):
+        await _handle_session(process, latency)
+    return handler
+
+
+async def _handle_session(process, latency):
+    """模拟 VRP 交互式 Shell：回显提示符，收到命令后等待 latency 秒再返回固定输出"""
+    process.stdout.write('\r\nInfo: The max number of VTY users is 5.\r\n<AR1>')
+    while True:
+        line = await process.stdin.readline()
+        if not line:
+            break
+        command = line.strip()
+        if command in ('quit', 'exit'):
+            break
+        await asyncio.sleep(latency)
+        body = OUTPUT if command.startswith('display') else ''
+        process.stdout.write('\r\n' + body + '<AR1>')
+    process.exit(0)
+
+
+def _run_server(port_queue, latency):
+    async def main():
+        key = asyncssh.generate_private_key('ssh-ed25519')
+        server = await asyncssh.create_server(
+            _StandInServer, '127.0.0.1', 0,
+            server_host_keys=[key], process_factory=_make_session_handler(latency),
+        )
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def start_servers(count, latency):
+    """在子进程中启动 count 个 SSH 替身，返回 (进程列表, 端口列表)"""
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_run_server, args=(queue, latency), daemon=True)
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    ports = [queue.get(timeout=30) for _ in processes]
+    return processes, ports
+
+
+def threaded_scan(ports, devices, threads):
+    def scan_one(index):
+        with NetworkDevice('127.0.0.1', port=ports[index % len(ports)], **CREDENTIALS) as dev:
+            return dev.execute_command('display ip interface brief')
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(scan_one, range(devices)))
+
+
+async def async_scan(ports, devices):
+    async def scan_one(index):
+        async with AsyncNetworkDevice('127.0.0.1', port=ports[index % len(ports)], **CREDENTIALS) as dev:
+            return await dev.execute_command('display ip interface brief')
+
+    return await asyncio.gather(*(scan_one(i) for i in range(devices)))
+
+
+def run_benchmark(devices, threads, servers, latency):
+    processes, ports = start_servers(servers, latency)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            threaded = threaded_scan(ports, devices, threads)
+            threaded_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async_results = asyncio.run(async_scan(ports, devices))
+            async_time = time.perf_counter() - start
+    finally:
+        for process in processes:
+            process.terminate()
+
+    ok_threaded = sum('GigabitEthernet0/0/0' in out for out in threaded)
+    ok_async = sum('GigabitEthernet0/0/0' in out for out in async_results)
+    print(f"=== {devices} 台设备 (SSH 替身进程 {servers} 个, 每条命令延迟 {latency * 1000:.0f} ms) ===")
+    print(f"threaded({threads:>3}) | {threaded_time:7.2f}s | {devices / threaded_time:8.1f} devices/s | ok {ok_threaded}")
+    print(f"asyncio       | {async_time:7.2f}s | {devices / async_time:8.1f} devices/s | ok {ok_async}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="线程驱动 vs asyncio 驱动吞吐基准测试")
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--servers', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    args = parser.parse_args()
+    run_benchmark(args.devices, args.threads, args.servers, args.latency_ms / 1000)
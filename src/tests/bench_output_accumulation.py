@@ -0,0 +1,103 @@
+"""
+大输出累加与清洗基准测试：bytes += chunk + 多轮正则 vs OutputCleaner 流式单遍清洗
+
+用法 (在 src 目录下执行):
+    python tests/bench_output_accumulation.py [--sizes-mb 1 4 8] [--chunk 4096]
+
+模拟 display current-configuration / 全量路由表这类数 MB 的输出 (带 ANSI 颜色和
+---- More ---- 分页)，按 chunk 分块喂给两种实现，对比耗时与峰值内存。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.output_buffer import OutputCleaner
+from core.ssh_client import NetworkDevice
+
+COMMAND = 'display ip routing-table'
+PAGE = (
+    ''.join(f'10.{i // 256}.{i % 256}.0/24   OSPF    10   2      D   192.168.10.{i % 250}   '
+            f'\x1b[1;32mGigabitEthernet0/0/{i % 4}\x1b[0m\r\n' for i in range(24))
+    + '  ---- More ----\x1b[42D                                          \x1b[42D'
+)
+
+
+def build_output(size_mb):
+    """构造约 size_mb MB 的原始设备输出 (含命令回显和尾部提示符)"""
+    page = PAGE.encode('utf-8')
+    pages = max(1, int(size_mb * 1024 * 1024 / len(page)))
+    return COMMAND.encode() + b'\r\n' + page * pages + b'\r\n<AR1>'
+
+
+def legacy_accumulate(chunks):
+    """旧版实现：bytes 累加 + 整串多轮正则/替换"""
+    full_output = b''
+    for chunk in chunks:
+        full_output += chunk
+    raw_data = full_output.decode('utf-8', errors='ignore')
+
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    data = ansi_escape.sub('', raw_data)
+    data = data.replace('---- More ----', '').replace('\x08', '')
+    data = re.sub(r'  \x1b\[16D\s+\x1b\[16D', '', data)
+    if COMMAND in data:
+        _, _, data = data.partition(COMMAND)
+        data = data.lstrip()
+    data = re.sub(r'\n[<\[].+?[>\]]\s*$', '', data)
+    return data.strip()
+
+
+def streaming_accumulate(chunks, device):
+    """新版实现：OutputCleaner 边收边清洗，结束时只处理首尾"""
+    cleaner = OutputCleaner()
+    for chunk in chunks:
+        cleaner.feed(chunk)
+    cleaner.finish()
+    return device._trim_output(cleaner.getvalue(), COMMAND)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_benchmark(sizes_mb, chunk_size):
+    device = NetworkDevice('127.0.0.1', 'admin', 'admin')
+    print(f"{'size':>8} | {'impl':<9} | {'time':>10} | {'peak mem':>10}")
+    print("-" * 48)
+    for size_mb in sizes_mb:
+        raw = build_output(size_mb)
+        chunks = [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)]
+
+        old_result, old_time, old_peak = measure(legacy_accumulate, chunks)
+        new_result, new_time, new_peak = measure(streaming_accumulate, chunks, device)
+
+        # 两种实现清洗后的行内容应一致 (新版额外去掉了分页擦除用的空白)
+        same = [l.strip() for l in old_result.splitlines() if l.strip()] == \
+               [l.strip() for l in new_result.splitlines() if l.strip()]
+
+        for name, elapsed, peak in (('legacy', old_time, old_peak), ('streaming', new_time, new_peak)):
+            print(f"{size_mb:>6}MB | {name:<9} | {elapsed * 1000:>8.1f}ms | {peak / 1024 / 1024:>8.1f}MB")
+        print(f"{'':>8} | 输出一致: {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="大输出累加与清洗基准测试")
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--chunk', type=int, default=4096)
+    args = parser.parse_args()
+    run_benchmark(args.sizes_mb, args.chunk)
@@ -0,0 +1,137 @@
+"""
+命令读取延迟基准测试：旧版 sleep(0.1) 轮询 vs 事件驱动 select 读取
+
+用法 (在 src 目录下执行):
+    python tests/bench_read_latency.py [--runs 200] [--delay-ms 5]
+
+在本地用 socketpair 模拟一台华为设备：收到命令后等待 delay-ms 再分块回显输出和提示符，
+分别统计两种读取方式的单条命令中位数 (p50) 与 p99 延迟。
+"""
+import argparse
+import contextlib
+import io
+import os
+import select
+import socket
+import statistics
+import sys
+import threading
+import time
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.ssh_client import NetworkDevice
+
+PROMPT = b'<AR1>'
+OUTPUT = (
+    b'Interface                         IP Address/Mask      Physical   Protocol  \r\n'
+    b'GigabitEthernet0/0/0              192.168.10.1/24      up         up        \r\n'
+    b'NULL0                             unassigned           up         up(s)     \r\n'
+)
+
+
+class SimulatedChannel:
+    """模拟 paramiko Channel 的最小接口 (recv_ready / recv / send / fileno)"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self.eof_received = False
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recv_ready(self):
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        return bool(readable)
+
+    def recv(self, nbytes):
+        return self.sock.recv(nbytes)
+
+    def send(self, data):
+        self.sock.sendall(data)
+        return len(data)
+
+    def settimeout(self, timeout):
+        pass
+
+
+def simulated_device(sock, delay):
+    """设备侧线程：每收到一行命令，延迟 delay 秒后分两块返回输出 + 提示符"""
+    buffer = b''
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        buffer += data
+        while b'\n' in buffer:
+            line, _, buffer = buffer.partition(b'\n')
+            time.sleep(delay)
+            sock.sendall(line + b'\r\n' + OUTPUT)
+            sock.sendall(b'\r\n' + PROMPT)
+
+
+def legacy_execute(chan, command, expect_prompt, timeout=10):
+    """旧版 execute_command 的读取循环 (recv_ready + sleep(0.1) 轮询)"""
+    chan.send(command.encode('utf-8') + b'\n')
+    full_output = b''
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if chan.recv_ready():
+            chunk = chan.recv(65535)
+            full_output += chunk
+            if expect_prompt in chunk:
+                break
+        else:
+            time.sleep(0.1)
+    return full_output
+
+
+def summarize(name, samples):
+    samples_ms = [s * 1000 for s in samples]
+    p50 = statistics.median(samples_ms)
+    p99 = statistics.quantiles(samples_ms, n=100)[98]
+    print(f"{name:<13} | p50 = {p50:8.2f} ms | p99 = {p99:8.2f} ms | runs = {len(samples_ms)}")
+
+
+def run_benchmark(runs, delay):
+    command = 'display ip interface brief'
+
+    # --- 旧版轮询 ---
+    host_sock, dev_sock = socket.socketpair()
+    threading.Thread(target=simulated_device, args=(dev_sock, delay), daemon=True).start()
+    chan = SimulatedChannel(host_sock)
+    before = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        legacy_execute(chan, command, PROMPT)
+        before.append(time.perf_counter() - start)
+    host_sock.close()
+
+    # --- 事件驱动 (NetworkDevice.execute_command) ---
+    host_sock, dev_sock = socket.socketpair()
+    threading.Thread(target=simulated_device, args=(dev_sock, delay), daemon=True).start()
+    device = NetworkDevice('127.0.0.1', 'admin', 'admin')
+    device.chan = SimulatedChannel(host_sock)
+    device.base_prompt = PROMPT
+    after = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            start = time.perf_counter()
+            device.execute_command(command)
+            after.append(time.perf_counter() - start)
+    host_sock.close()
+
+    print(f"=== 单条命令延迟 (模拟设备响应延迟 {delay * 1000:.1f} ms) ===")
+    summarize('before(poll)', before)
+    summarize('after(select)', after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NetworkDevice 读取延迟基准测试")
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--delay-ms', type=float, default=5.0)
+    args = parser.parse_args()
+    run_benchmark(args.runs, args.delay_ms / 1000)
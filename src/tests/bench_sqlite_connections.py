@@ -0,0 +1,125 @@
+"""
+SQLite 并发读写基准测试：每次 connect/close + 回滚日志 vs 连接池 + WAL
+
+用法 (在 src 目录下执行):
+    python tests/bench_sqlite_connections.py [--writers 8] [--readers 4] [--seconds 5] [--busy-ms 0]
+
+模拟并发巡检：writers 个线程不停写巡检日志 (save_log)，readers 个线程不停查询历史 (get_history)，
+统计两种连接方式下的读写吞吐、写延迟 p50/p99 与 database is locked 错误数。
+旧方式按改造前的 database.py 实现 (每次调用 sqlite3.connect，默认 DELETE 日志模式，默认 5 秒忙等待)；
+--busy-ms 可以缩短旧方式的忙等待，让锁冲突直接表现为错误。
+"""
+import argparse
+import contextlib
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database
+
+RESULT = [{'interface': f'GigabitEthernet0/0/{i}', 'ip': f'10.0.{i}.1/24', 'status': 'up'} for i in range(20)]
+
+
+def legacy_save_log(path, busy_timeout, device_ip, command, result_str):
+    conn = sqlite3.connect(path, timeout=busy_timeout)
+    conn.execute('INSERT INTO inspection_logs (device_ip, command, result_json, status) VALUES (?, ?, ?, ?)',
+                 (device_ip, command, result_str, 'success'))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_history(path, busy_timeout, limit=20):
+    conn = sqlite3.connect(path, timeout=busy_timeout)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute('SELECT * FROM inspection_logs ORDER BY timestamp DESC LIMIT ?', (limit,)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def run(mode, writers, readers, seconds, busy_ms):
+    workdir = tempfile.mkdtemp(prefix='netops-bench-')
+    database.DB_PATH = os.path.join(workdir, 'netops.db')
+    database.init_db()
+    database.close_connections()
+    if mode == 'legacy':
+        # 旧库使用默认的回滚日志模式
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.close()
+
+    result_str = database._serialize_result(RESULT)
+    busy_timeout = busy_ms / 1000
+    stop = threading.Event()
+    stats = {'writes': 0, 'reads': 0, 'locked': 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def writer(index):
+        device_ip = f'10.1.1.{index}'
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                if mode == 'legacy':
+                    legacy_save_log(database.DB_PATH, busy_timeout, device_ip, 'display ip interface brief', result_str)
+                else:
+                    database.save_log(device_ip, 'display ip interface brief', RESULT)
+            except sqlite3.OperationalError:
+                with lock:
+                    stats['locked'] += 1
+                continue
+            with lock:
+                stats['writes'] += 1
+                latencies.append(time.perf_counter() - started)
+
+    def reader():
+        while not stop.is_set():
+            try:
+                if mode == 'legacy':
+                    legacy_get_history(database.DB_PATH, busy_timeout)
+                else:
+                    database.get_history()
+            except sqlite3.OperationalError:
+                with lock:
+                    stats['locked'] += 1
+                continue
+            with lock:
+                stats['reads'] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    database.close_connections()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    return (f"{mode:<8} writes/s {stats['writes'] / seconds:>8.0f}   reads/s {stats['reads'] / seconds:>8.0f}   "
+            f"write p50 {p50:>7.2f} ms   p99 {p99:>8.2f} ms   locked {stats['locked']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite 并发读写基准测试")
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--busy-ms', type=int, default=5000, help="旧方式的忙等待毫秒数 (sqlite3 默认 5000)")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers / {args.readers} readers, {args.seconds}s per mode")
+    for mode in ('legacy', 'pooled'):
+        # save_log 每次写入都会打印一行，测试期间静默
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            line = run(mode, args.writers, args.readers, args.seconds, args.busy_ms)
+        print(line)
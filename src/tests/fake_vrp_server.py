@@ -0,0 +1,778 @@
+"""
+本地模拟华为 VRP 设备 (基于 paramiko 的 SSH 服务端)，用于离线基准测试与回归测试
+
+用法 (在 src 目录下执行):
+    python tests/fake_vrp_server.py [--count 1] [--port 0] [--command-latency-ms 0] [--byte-latency-us 0]
+
+在代码中使用:
+    from tests.fake_vrp_server import FakeVRPServer, start_fleet, stop_fleet
+
+    with FakeVRPServer(command_latency=0.05) as server:
+        dev = NetworkDevice('127.0.0.1', 'admin', 'Admin@123', port=server.port)
+
+    servers = start_fleet(300)      # 同一台主机上启动数百台 "设备"，各自监听一个端口
+    ...
+    stop_fleet(servers)
+
+模拟内容:
+- 提示符 <AR1> / [AR1] / [AR1-GigabitEthernet0/0/0]，system-view / interface / quit / return 视图切换
+- 默认开启分页 (---- More ----，空格翻页、q 退出)，screen-length 0 temporary 关闭
+- 命令支持 VRP 缩写 (dis ip int br)，模板解析器回退命令表中的命令与 ping 均有固定输出
+- 同一 SSH 连接上可以打开多个 shell 通道 (.sessions 统计登录次数，.channels 统计通道数)
+- 可配置的单条命令延迟与逐字节发送延迟，模拟慢链路 / 慢设备
+"""
+import argparse
+import datetime
+import socket
+import threading
+import time
+
+import paramiko
+
+PAGE_BREAK = b'  ---- More ----'
+# 按键后 VRP 用退格序列擦掉 More 提示
+PAGE_ERASE = b'\x1b[16D                \x1b[16D'
+UNRECOGNIZED = "              ^\r\nError: Unrecognized command found at '^' position."
+INCOMPLETE = "              ^\r\nError: Incomplete command found at '^' position."
+
+_host_key = None
+_host_key_lock = threading.Lock()
+
+
+def get_host_key():
+    """所有模拟设备共用一把主机密钥 (RSA 生成较慢，启动数百个实例时只生成一次)"""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+
+def _interfaces(count):
+    """生成 count 个千兆口 (+ NULL0)，用于放大输出规模"""
+    rows = []
+    for i in range(count):
+        name = f"GigabitEthernet0/0/{i}"
+        if i == count - 1 and count > 1:
+            rows.append((name, 'unassigned', 'down', 'down'))
+        else:
+            rows.append((name, f"10.{i // 250}.{i % 250}.1/24", 'up', 'up'))
+    return rows
+
+
+def _render_ip_interface_brief(device):
+    rows = _interfaces(device.interfaces)
+    up = sum(1 for r in rows if r[2] == 'up') + 1
+    lines = [
+        '*down: administratively down',
+        '^down: standby',
+        '(l): loopback',
+        '(s): spoofing',
+        f'The number of interface that is UP in Physical is {up}',
+        f'The number of interface that is DOWN in Physical is {len(rows) + 1 - up}',
+        f'The number of interface that is UP in Protocol is {up}',
+        f'The number of interface that is DOWN in Protocol is {len(rows) + 1 - up}',
+        '',
+        'Interface                         IP Address/Mask      Physical   Protocol  ',
+    ]
+    for name, ip, phy, proto in rows:
+        lines.append(f"{name:<34}{ip:<21}{phy:<11}{proto:<10}")
+    lines.append(f"{'NULL0':<34}{'unassigned':<21}{'up':<11}{'up(s)':<10}")
+    return '\r\n'.join(lines)
+
+
+def _render_interface_brief(device):
+    lines = [
+        'PHY: Physical',
+        '*down: administratively down',
+        '(l): loopback',
+        '(s): spoofing',
+        '(b): BFD down',
+        '(e): ETHOAM down',
+        '(dl): DLDP down',
+        '(d): Dampening Suppressed',
+        'InUti/OutUti: input utility/output utility',
+        'Interface                   PHY   Protocol InUti OutUti   inErrors  outErrors',
+    ]
+    for name, _, phy, proto in _interfaces(device.interfaces):
+        lines.append(f"{name:<28}{phy:<6}{proto:<9}{'0%':<6}{'0%':<9}{0:<10}{0}")
+    lines.append(f"{'NULL0':<28}{'up':<6}{'up(s)':<9}{'0%':<6}{'0%':<9}{0:<10}{0}")
+    return '\r\n'.join(lines)
+
+
+def _render_interface(device):
+    blocks = []
+    for index, (name, ip, phy, proto) in enumerate(_interfaces(device.interfaces)):
+        blocks.append('\r\n'.join([
+            f"{name} current state : {'UP' if phy == 'up' else 'DOWN'}",
+            f"Line protocol current state : {'UP' if proto == 'up' else 'DOWN'}",
+            'Last line protocol up time : 2024-05-20 09:12:31 UTC-08:00',
+            'Description:HUAWEI, AR Series, ' + name + ' Interface',
+            'Route Port,The Maximum Transmit Unit is 1500',
+            ('Internet Address is ' + ip) if ip != 'unassigned' else 'Internet protocol processing : disabled',
+            f"IP Sending Frames' Format is PKTFMT_ETHNT_2, Hardware address is 00e0-fc12-{index:04x}",
+            'Last physical up time   : 2024-05-20 09:12:29 UTC-08:00',
+            'Last physical down time : 2024-05-20 09:12:20 UTC-08:00',
+            'Current system time: 2024-05-20 11:25:43-08:00',
+            'Port Mode: COMMON COPPER',
+            'Speed : 1000,  Loopback: NONE',
+            'Duplex: FULL,  Negotiation: ENABLE',
+            'Mdi   : AUTO',
+            'Last 300 seconds input rate 1184 bits/sec, 1 packets/sec',
+            'Last 300 seconds output rate 96 bits/sec, 0 packets/sec',
+            'Input peak rate 9432 bits/sec,Record time: 2024-05-20 09:15:02',
+            'Output peak rate 1344 bits/sec,Record time: 2024-05-20 09:13:45',
+            'Input:  1523 packets, 152304 bytes',
+            '  Unicast:                  812,  Multicast:                 600',
+            '  Broadcast:                111,  Jumbo:                       0',
+            '  Discard:                    0,  Total Error:                 0',
+            'Output:  298 packets, 23840 bytes',
+            '  Unicast:                  287,  Multicast:                   0',
+            '  Broadcast:                 11,  Jumbo:                       0',
+            '  Discard:                    0,  Total Error:                 0',
+            '    Input bandwidth utilization threshold : 100.00%',
+            '    Output bandwidth utilization threshold: 100.00%',
+            '    Input bandwidth utilization  :    0%',
+            '    Output bandwidth utilization :    0%',
+        ]))
+    return '\r\n\r\n'.join(blocks)
+
+
+def _render_interface_description(device):
+    lines = [
+        'PHY: Physical',
+        '*down: administratively down',
+        '(l): loopback',
+        '(s): spoofing',
+        '(b): BFD down',
+        '(e): ETHOAM down',
+        '(d): Dampening Suppressed',
+        'Interface                     PHY     Protocol Description',
+    ]
+    for index, (name, _, phy, proto) in enumerate(_interfaces(device.interfaces)):
+        lines.append(f"{'GE0/0/' + str(index):<30}{phy:<8}{proto:<9}TO-{device.hostname}-LINK-{index}")
+    lines.append(f"{'NULL0':<30}{'up':<8}{'up(s)':<9}")
+    return '\r\n'.join(lines)
+
+
+def _render_version(device):
+    return '\r\n'.join([
+        'Huawei Versatile Routing Platform Software',
+        'VRP (R) software, Version 5.160 (AR2200 V200R003C00SPC200)',
+        'Copyright (C) 2011-2014 HUAWEI TECH CO., LTD',
+        'Huawei AR2220 Router uptime is 0 week, 0 day, 2 hours, 13 minutes',
+        'BKP 0 version information:',
+        '1. PCB      Version  : AR01BAK2A VER.NC',
+        '2. If Supporting PoE : No',
+        '3. Board    Type     : AR2220',
+        '4. MPU Slot Quantity : 1',
+        '5. LPU Slot Quantity : 6',
+        '',
+        'MPU 0(Master) : uptime is 0 week, 0 day, 2 hours, 13 minutes',
+        'MPU version information : ',
+        '1. PCB      Version  : AR01SRU2A VER.A',
+        '2. MAB      Version  : 0',
+        '3. Board    Type     : AR2220',
+        '4. BootROM  Version  : 0',
+    ])
+
+
+def _render_device(device):
+    return '\r\n'.join([
+        'AR2220\'s Device status:',
+        'Slot Sub  Type                   Online    Power    Register     Status   Role  ',
+        '-------------------------------------------------------------------------------',
+        '0    -    AR2220                 Present   PowerOn  Registered   Normal   Master',
+        '     0    4GE                    Present   PowerOn  Registered   Normal   NA    ',
+        '6    -    PWR                    Present   PowerOn  Registered   Normal   NA    ',
+        '7    -    FAN                    Present   PowerOn  Registered   Normal   NA    ',
+    ])
+
+
+def _render_vlan(device):
+    lines = [
+        'The total number of vlans is : 3',
+        '--------------------------------------------------------------------------------',
+        'U: Up;         D: Down;         TG: Tagged;         UT: Untagged;',
+        'MP: Vlan-mapping;               ST: Vlan-stacking;',
+        '#: ProtocolTransparent-vlan;    *: Management-vlan;',
+        '--------------------------------------------------------------------------------',
+        '',
+        'VID  Type    Ports                                                          ',
+        '--------------------------------------------------------------------------------',
+        '1    common  UT:GE0/0/1(U)     GE0/0/2(D)                                       ',
+        '10   common  TG:GE0/0/1(U)                                                      ',
+        '20   common  TG:GE0/0/1(U)                                                      ',
+        '',
+        'VID  Status  Property      MAC-LRN Statistics Description      ',
+        '--------------------------------------------------------------------------------',
+        '1    enable  default       enable  disable    VLAN 0001        ',
+        '10   enable  default       enable  disable    VLAN 0010        ',
+        '20   enable  default       enable  disable    VLAN 0020        ',
+    ]
+    return '\r\n'.join(lines)
+
+
+def _render_vlan_brief(device):
+    return '\r\n'.join([
+        'U: Up;         D: Down;         TG: Tagged;         UT: Untagged;',
+        'MP: Vlan-mapping;               ST: Vlan-stacking;',
+        '#: ProtocolTransparent-vlan;    *: Management-vlan;',
+        '--------------------------------------------------------------------------------',
+        'VID  Status  Property      MAC-LRN Statistics Description      ',
+        '--------------------------------------------------------------------------------',
+        '1    enable  default       enable  disable    VLAN 0001        ',
+        '10   enable  default       enable  disable    VLAN 0010        ',
+        '20   enable  default       enable  disable    VLAN 0020        ',
+    ])
+
+
+def _arp_rows(device):
+    rows = [('192.168.10.1', '00e0-fc12-0000', '', 'I -', 'GE0/0/0')]
+    for i in range(1, min(device.interfaces, 250) + 1):
+        rows.append((f"192.168.10.{i + 1}", f"5489-98aa-{i:04x}", '20', 'D-0', 'GE0/0/0'))
+    return rows
+
+
+def _render_arp(device):
+    rows = _arp_rows(device)
+    lines = [
+        'IP ADDRESS      MAC ADDRESS     EXPIRE(M) TYPE        INTERFACE   VPN-INSTANCE ',
+        '                                          VLAN ',
+        '------------------------------------------------------------------------------',
+    ]
+    for ip, mac, expire, arp_type, intf in rows:
+        lines.append(f"{ip:<16}{mac:<16}{expire:<10}{arp_type:<12}{intf}")
+    lines.append('------------------------------------------------------------------------------')
+    lines.append(f"Total:{len(rows)}         Dynamic:{len(rows) - 1}         Static:0     Interface:1")
+    return '\r\n'.join(lines)
+
+
+def _render_arp_brief(device):
+    rows = _arp_rows(device)
+    lines = ['IP ADDRESS      MAC ADDRESS     EXPIRE(M) TYPE INTERFACE      VPN-INSTANCE']
+    for ip, mac, expire, arp_type, intf in rows:
+        lines.append(f"{ip:<16}{mac:<16}{expire:<10}{arp_type[0]:<5}{intf}")
+    return '\r\n'.join(lines)
+
+
+def _render_mac_address(device):
+    lines = [
+        '-------------------------------------------------------------------------------',
+        'MAC Address    VLAN/       PEVLAN CEVLAN Port            Type      LSP/LSR-ID  ',
+        '               VSI/SI                                              MAC-Tunnel  ',
+        '-------------------------------------------------------------------------------',
+    ]
+    count = min(device.interfaces, 250)
+    for i in range(1, count + 1):
+        lines.append(f"5489-98aa-{i:04x} {10:<12}-      -      {'GE0/0/1':<16}dynamic   0/-         ")
+    lines.append('-------------------------------------------------------------------------------')
+    lines.append(f"Total matching items on slot 0 displayed = {count} ")
+    return '\r\n'.join(lines)
+
+
+def _render_lldp_neighbor(device):
+    return '\r\n'.join([
+        'GigabitEthernet0/0/1 has 1 neighbor(s):',
+        '',
+        'Neighbor index :1',
+        'Chassis type   :macAddress',
+        'Chassis ID     :4c1f-cc33-1122',
+        'Port ID type   :interfaceName',
+        'Port ID        :GigabitEthernet0/0/1',
+        'Port description    :GigabitEthernet0/0/1',
+        'System name         :AR2',
+        'System description  :Huawei Versatile Routing Platform Software',
+        'System capabilities supported   :bridge router',
+        'System capabilities enabled     :bridge router',
+        'Management address type  :ipv4',
+        'Management address value :10.0.12.2',
+        'Expired time   :108s',
+    ])
+
+
+def _render_stp_brief(device):
+    return '\r\n'.join([
+        ' MSTID  Port                        Role  STP State     Protection',
+        '   0    GigabitEthernet0/0/1        DESI  FORWARDING      NONE',
+        '   0    GigabitEthernet0/0/2        DESI  FORWARDING      NONE',
+    ])
+
+
+def _render_users(device):
+    return '\r\n'.join([
+        '  User-Intf    Delay    Type   Network Address     AuthenStatus    AuthorcmdFlag',
+        '+ 129 VTY 0   00:00:00  SSH    192.168.10.100             pass           no',
+        '  Username : admin',
+    ])
+
+
+def _render_clock(device):
+    now = datetime.datetime.now()
+    return '\r\n'.join([
+        now.strftime('%Y-%m-%d %H:%M:%S'),
+        now.strftime('%A'),
+        'Time Zone(DefaultZoneName) : UTC',
+    ])
+
+
+def _render_memory(device):
+    return '\r\n'.join([
+        'Memory utilization statistics at 2024-05-20 11:25:43-08:00',
+        'System Total Memory Is: 536870912 bytes',
+        'Total Memory Used Is: 197132288 bytes',
+        'Memory Using Percentage Is: 36%',
+    ])
+
+
+def _render_cpu_usage(device):
+    return '\r\n'.join([
+        'CPU Usage Stat. Cycle: 60 (Second)',
+        'CPU Usage            : 6% Max: 45%',
+        'CPU Usage Stat. Time : 2024-05-20  11:25:43',
+        'CPU utilization for five seconds: 6%: one minute: 6%: five minutes: 5%',
+        'Max CPU Usage Stat. Time : 2024-05-20 09:12:25.',
+        '',
+        'TaskName        CPU  Runtime(CPU Tick High/Tick Low)  Task Explanation',
+        'VIDL           94%          0/f3b7b63e       DOPRA IDLE',
+        'OS              2%          0/ 1f3c2fc       Operation System',
+        'SOCK            1%          0/  c8e62a       SOCKet',
+    ])
+
+
+def _render_routing_table(device):
+    rows = [
+        ('0.0.0.0/0', 'Static', '60', '0', 'RD', '10.0.12.2', 'GigabitEthernet0/0/1'),
+        ('10.0.12.0/30', 'Direct', '0', '0', 'D', '10.0.12.1', 'GigabitEthernet0/0/1'),
+        ('10.0.12.1/32', 'Direct', '0', '0', 'D', '127.0.0.1', 'GigabitEthernet0/0/1'),
+        ('127.0.0.0/8', 'Direct', '0', '0', 'D', '127.0.0.1', 'InLoopBack0'),
+        ('127.0.0.1/32', 'Direct', '0', '0', 'D', '127.0.0.1', 'InLoopBack0'),
+        ('192.168.10.0/24', 'Direct', '0', '0', 'D', '192.168.10.1', 'GigabitEthernet0/0/0'),
+        ('192.168.10.1/32', 'Direct', '0', '0', 'D', '127.0.0.1', 'GigabitEthernet0/0/0'),
+    ]
+    lines = [
+        'Route Flags: R - relay, D - download to fib',
+        '------------------------------------------------------------------------------',
+        'Routing Tables: Public',
+        f"         Destinations : {len(rows)}        Routes : {len(rows)}        ",
+        '',
+        'Destination/Mask    Proto   Pre  Cost      Flags NextHop         Interface',
+        '',
+    ]
+    for dest, proto, pre, cost, flags, nexthop, intf in rows:
+        lines.append(f"{dest:>19} {proto:<8}{pre:<5}{cost:<10}{flags:<6}{nexthop:<16}{intf}")
+    return '\r\n'.join(lines)
+
+
+def _render_current_configuration(device):
+    lines = ['!Software Version V200R003C00SPC200', '#', f" sysname {device.hostname}", '#']
+    for name, ip, _, _ in _interfaces(device.interfaces):
+        lines.append(f"interface {name}")
+        if ip != 'unassigned':
+            lines.append(f" ip address {ip.split('/')[0]} 255.255.255.0")
+        lines.append('#')
+    lines.append('return')
+    return '\r\n'.join(lines)
+
+
+# 命令 -> 输出生成函数 (覆盖 core/template_resolver.py 回退命令表中的全部华为命令)
+CANNED_OUTPUTS = {
+    'display ip interface brief': _render_ip_interface_brief,
+    'display version': _render_version,
+    'display device': _render_device,
+    'display interface': _render_interface,
+    'display interface brief': _render_interface_brief,
+    'display interface description': _render_interface_description,
+    'display vlan': _render_vlan,
+    'display vlan brief': _render_vlan_brief,
+    'display arp': _render_arp,
+    'display arp all': _render_arp,
+    'display arp brief': _render_arp_brief,
+    'display mac-address': _render_mac_address,
+    'display lldp neighbor': _render_lldp_neighbor,
+    'display stp brief': _render_stp_brief,
+    'display users': _render_users,
+    'display clock': _render_clock,
+    'display memory': _render_memory,
+    'display cpu-usage': _render_cpu_usage,
+    'display ip routing-table': _render_routing_table,
+    'display current-configuration': _render_current_configuration,
+}
+_CANNED_TOKENS = [(tuple(cmd.split()), cmd) for cmd in CANNED_OUTPUTS]
+
+
+def resolve_command(line):
+    """
+    按 VRP 缩写规则解析命令：每个词是完整命令对应词的前缀即可 (dis ip int br)
+    有多个候选时优先词数相同的、再优先逐词完全相等的
+    :return: CANNED_OUTPUTS 中的完整命令，未找到返回 None
+    """
+    words = line.lower().split()
+    candidates = []
+    for tokens, cmd in _CANNED_TOKENS:
+        if len(tokens) == len(words) and all(t.startswith(w) for w, t in zip(words, tokens)):
+            exact = sum(w == t for w, t in zip(words, tokens))
+            candidates.append((exact, cmd))
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+def _render_ping(target, count=5):
+    lines = [f"  PING {target}: 56  data bytes, press CTRL_C to break"]
+    for seq in range(1, count + 1):
+        lines.append(f"    Reply from {target}: bytes=56 Sequence={seq} ttl=255 time=1 ms")
+    lines += [
+        '',
+        f"  --- {target} ping statistics ---",
+        f"    {count} packet(s) transmitted",
+        f"    {count} packet(s) received",
+        '    0.00% packet loss',
+        '    round-trip min/avg/max = 1/1/1 ms',
+    ]
+    return '\r\n'.join(lines)
+
+
+class _SSHInterface(paramiko.ServerInterface):
+    """密码认证 + pty + shell 的最小服务端实现"""
+
+    def __init__(self, server):
+        self.server = server
+        self._shells = set()
+        self._shell_cond = threading.Condition()
+
+    def check_auth_password(self, username, password):
+        if username == self.server.username and password == self.server.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        with self._shell_cond:
+            self._shells.add(channel.get_id())
+            self._shell_cond.notify_all()
+        return True
+
+    def wait_shell(self, channel, timeout):
+        """等待客户端在该通道上请求 shell"""
+        with self._shell_cond:
+            return self._shell_cond.wait_for(lambda: channel.get_id() in self._shells, timeout)
+
+
+class _VRPSession:
+    """单个 SSH 会话的 CLI 状态机"""
+
+    def __init__(self, server, chan):
+        self.server = server
+        self.chan = chan
+        self.hostname = server.hostname
+        self.interfaces = server.interfaces
+        self.view = None            # None: 用户视图；'' : 系统视图；其它: 子视图名 (如 GigabitEthernet0/0/0)
+        self.paging = True
+        self._buffer = b''
+        self._skip_lf = False
+
+    @property
+    def prompt(self):
+        if self.view is None:
+            return f"<{self.hostname}>"
+        if self.view == '':
+            return f"[{self.hostname}]"
+        return f"[{self.hostname}-{self.view}]"
+
+    def _send(self, data):
+        """按配置的逐字节延迟发送 (模拟慢链路)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        latency = self.server.byte_latency
+        if latency <= 0:
+            self.chan.sendall(data)
+            return
+        step = 256
+        for i in range(0, len(data), step):
+            piece = data[i:i + step]
+            time.sleep(latency * len(piece))
+            self.chan.sendall(piece)
+
+    def _read_more(self):
+        data = self.chan.recv(4096)
+        if not data:
+            raise EOFError
+        self._buffer += data
+
+    def _read_line(self):
+        """读取一行 (兼容 \r、\n、\r\n 三种行尾)"""
+        while True:
+            if self._skip_lf and self._buffer.startswith(b'\n'):
+                self._buffer = self._buffer[1:]
+            self._skip_lf = False
+            ends = [at for at in (self._buffer.find(b'\r'), self._buffer.find(b'\n')) if at != -1]
+            if ends:
+                break
+            self._read_more()
+
+        at = min(ends)
+        line = self._buffer[:at]
+        self._skip_lf = self._buffer[at:at + 1] == b'\r'
+        self._buffer = self._buffer[at + 1:]
+        return line.decode('utf-8', errors='ignore')
+
+    def _read_key(self):
+        if not self._buffer:
+            self._read_more()
+        key = self._buffer[:1]
+        self._buffer = self._buffer[1:]
+        # 按回车翻页时吞掉配对的 \n
+        if key == b'\r' and self._buffer.startswith(b'\n'):
+            self._buffer = self._buffer[1:]
+        return key
+
+    def _send_output(self, text):
+        """发送命令输出；分页开启时每 page_lines 行插入一次 ---- More ----"""
+        if not text:
+            return
+        lines = text.split('\r\n')
+        page = self.server.page_lines
+        if not self.paging or not page or len(lines) <= page:
+            self._send(text + '\r\n')
+            return
+
+        for start in range(0, len(lines), page):
+            chunk = lines[start:start + page]
+            self._send('\r\n'.join(chunk) + '\r\n')
+            if start + page >= len(lines):
+                return
+            self._send(PAGE_BREAK)
+            key = self._read_key()
+            self._send(PAGE_ERASE)
+            if key in (b'q', b'Q', b'\x03'):
+                return
+
+    def run(self):
+        self._send(f"\r\nInfo: The max number of VTY users is 5, and the number\r\n"
+                   f"      of current VTY users on line is 1.\r\n"
+                   f"      The current login time is {datetime.datetime.now():%Y-%m-%d %H:%M:%S}.\r\n"
+                   + self.prompt)
+        try:
+            while True:
+                line = self._read_line()
+                # 模拟 VRP 在 CLI 读到命令行时回显
+                self._send(line + '\r\n')
+                if self.server.command_latency > 0:
+                    time.sleep(self.server.command_latency)
+                if not self.handle(line.strip()):
+                    break
+                self.server.commands_served += 1
+                self._send(self.prompt)
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.chan.close()
+
+    def handle(self, command):
+        """
+        执行一条命令并发送输出
+        :return: 会话应继续返回 True，退出登录返回 False
+        """
+        if not command:
+            return True
+        words = command.split()
+        head = words[0].lower()
+
+        if head in ('system-view', 'sys', 'system'):
+            if self.view is None:
+                self._send_output('Enter system view, return user view with Ctrl+Z.')
+                self.view = ''
+            return True
+        if head in ('quit', 'q'):
+            if self.view is None:
+                return False
+            self.view = '' if self.view else None
+            return True
+        if head == 'return':
+            self.view = None
+            return True
+        if head in ('screen-length', 'scr'):
+            if len(words) >= 3 and words[1] == '0' and words[2].startswith('temp'):
+                self.paging = False
+                self._send_output('Info: The configuration takes effect on the current user terminal interface only.')
+            else:
+                self._send_output(INCOMPLETE)
+            return True
+        if head == 'ping' and len(words) >= 2:
+            count = 5
+            if '-c' in words[1:-1]:
+                count = int(words[words.index('-c') + 1])
+            self._send_output(_render_ping(words[-1], count))
+            return True
+        if 'display'.startswith(head) and len(head) >= 3:
+            full = resolve_command(command)
+            self._send_output(CANNED_OUTPUTS[full](self) if full else UNRECOGNIZED)
+            return True
+        if head == 'save':
+            self._send_output('The current configuration will be written to the device.\r\n'
+                              'Are you sure to continue?[Y/N]')
+            answer = self._read_line()
+            self._send(answer + '\r\n')
+            if answer.strip().lower().startswith('y'):
+                self._send_output('Now saving the current configuration to the slot 0.\r\n'
+                                  'Save the configuration successfully.')
+            return True
+
+        if self.view is None:
+            self._send_output(UNRECOGNIZED)
+            return True
+
+        # 系统视图 / 子视图下的配置命令
+        if head in ('interface', 'int') and len(words) >= 2:
+            self.view = ''.join(words[1:])
+        elif head == 'sysname' and len(words) == 2:
+            self.hostname = words[1]
+        elif head == 'vlan' and len(words) == 2 and words[1].isdigit():
+            self.view = f"vlan{words[1]}"
+        return True
+
+
+class FakeVRPServer:
+    """
+    模拟华为 VRP 设备
+    :param port: 监听端口，0 表示由系统分配 (见 .port)
+    :param command_latency: 每条命令的处理延迟 (秒)
+    :param byte_latency: 逐字节发送延迟 (秒/字节)，模拟低带宽链路
+    :param page_lines: 每屏行数，超过时插入 ---- More ----；0 表示不分页
+    :param interfaces: 接口数量，用于放大 display 类命令的输出规模
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, hostname='AR1', username='admin', password='Admin@123',
+                 command_latency=0.0, byte_latency=0.0, page_lines=24, interfaces=3):
+        self.host = host
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.command_latency = command_latency
+        self.byte_latency = byte_latency
+        self.page_lines = page_lines
+        self.interfaces = interfaces
+
+        self.sessions = 0
+        self.channels = 0
+        self.commands_served = 0
+        self._running = False
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self.port = self._sock.getsockname()[1]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._running = True
+        self._sock.listen(128)
+        threading.Thread(target=self._accept_loop, daemon=True, name=f"fake-vrp-{self.port}").start()
+        return self
+
+    def stop(self):
+        self._running = False
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        # 关闭 Nagle，避免回环上 Nagle + 延迟 ACK 叠加出的 40ms 假延迟
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = paramiko.Transport(client)
+        transport.add_server_key(get_host_key())
+        interface = _SSHInterface(self)
+        try:
+            transport.start_server(server=interface)
+            chan = transport.accept(timeout=10)
+            if chan is None:
+                return
+            self.sessions += 1
+            # 同一连接上后续打开的 shell 通道 (每个通道相当于设备上的一个 VTY 用户)
+            threading.Thread(target=self._accept_channels, args=(transport, interface), daemon=True).start()
+            self._run_channel(chan, interface)
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
+
+    def _accept_channels(self, transport, interface):
+        while transport.is_active():
+            chan = transport.accept(timeout=1)
+            if chan is not None:
+                threading.Thread(target=self._run_channel, args=(chan, interface), daemon=True).start()
+
+    def _run_channel(self, chan, interface):
+        if not interface.wait_shell(chan, 10):
+            return
+        self.channels += 1
+        try:
+            _VRPSession(self, chan).run()
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            chan.close()
+
+
+def start_fleet(count, **kwargs):
+    """在本机启动 count 台模拟设备 (各占一个随机端口)，返回 FakeVRPServer 列表"""
+    get_host_key()
+    return [FakeVRPServer(**kwargs).start() for _ in range(count)]
+
+
+def stop_fleet(servers):
+    for server in servers:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟华为 VRP SSH 设备")
+    parser.add_argument('--count', type=int, default=1, help="启动的设备数量")
+    parser.add_argument('--port', type=int, default=0, help="起始端口 (0 表示随机端口)")
+    parser.add_argument('--hostname', default='AR1')
+    parser.add_argument('--command-latency-ms', type=float, default=0.0)
+    parser.add_argument('--byte-latency-us', type=float, default=0.0)
+    parser.add_argument('--page-lines', type=int, default=24)
+    parser.add_argument('--interfaces', type=int, default=3)
+    args = parser.parse_args()
+
+    options = dict(hostname=args.hostname, command_latency=args.command_latency_ms / 1000,
+                   byte_latency=args.byte_latency_us / 1e6, page_lines=args.page_lines,
+                   interfaces=args.interfaces)
+    if args.port:
+        fleet = [FakeVRPServer(port=args.port + i, **options).start() for i in range(args.count)]
+    else:
+        fleet = start_fleet(args.count, **options)
+
+    for server in fleet:
+        print(f"{server.host}:{server.port}  {server.username}/{server.password}")
+    print(f"--- 已启动 {len(fleet)} 台模拟设备，Ctrl+C 退出 ---")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_fleet(fleet)
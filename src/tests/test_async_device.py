@@ -0,0 +1,133 @@
+"""
+AsyncNetworkDevice 测试：连接本地 asyncssh 模拟的华为设备，覆盖命令执行、配置视图切换与超时
+
+用法 (在 src 目录下执行，需要 asyncssh):
+    python -m pytest -q tests/test_async_device.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+asyncssh = pytest.importorskip('asyncssh')
+
+from core.async_device import AsyncNetworkDevice
+
+UNRECOGNIZED = "              ^\r\nError: Unrecognized command found at '^' position."
+OUTPUT = (
+    'Interface                         IP Address/Mask      Physical   Protocol  \r\n'
+    'GigabitEthernet0/0/0              192.168.10.1/24      up         up        \r\n'
+)
+
+
+class _StandInServer(asyncssh.SSHServer):
+    """接受任意密码的最小 SSH 服务端"""
+
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+async def _handle_session(process):
+    """模拟 VRP 交互式 Shell：用户视图 / 系统视图 / 子视图切换，hang 命令永不返回提示符"""
+    hostname, view = 'AR1', None   # view: None 用户视图，'' 系统视图，其它为子视图名
+
+    def prompt():
+        if view is None:
+            return f"<{hostname}>"
+        return f"[{hostname}]" if view == '' else f"[{hostname}-{view}]"
+
+    process.stdout.write('\r\nInfo: The max number of VTY users is 5.\r\n' + prompt())
+    while True:
+        line = await process.stdin.readline()
+        if not line:
+            break
+        words = line.split()
+        head = words[0] if words else ''
+        body = ''
+        if head == 'hang':
+            continue
+        if head in ('system-view', 'sys'):
+            view = ''
+        elif head == 'return':
+            view = None
+        elif head == 'quit':
+            if view is None:
+                break
+            view = None if view == '' else ''
+        elif view is not None and head == 'sysname' and len(words) == 2:
+            hostname = words[1]
+        elif view is not None and head == 'vlan' and len(words) == 2:
+            view = f'vlan{words[1]}'
+        elif head == 'display' and words[1:3] == ['ip', 'interface']:
+            body = OUTPUT
+        elif head not in ('', 'screen-length'):
+            body = UNRECOGNIZED + '\r\n'
+        process.stdout.write(line.rstrip() + '\r\n' + body + prompt())
+    process.exit(0)
+
+
+def _run(scenario, timeout=5):
+    """启动 SSH 替身，连接后执行 scenario(dev)"""
+    async def main():
+        key = asyncssh.generate_private_key('ssh-ed25519')
+        server = await asyncssh.create_server(_StandInServer, '127.0.0.1', 0, server_host_keys=[key],
+                                              process_factory=_handle_session)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with AsyncNetworkDevice('127.0.0.1', 'admin', 'Admin@123', port=port, timeout=timeout) as dev:
+                return await scenario(dev)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(main())
+
+
+def test_execute_commands_reports_status():
+    async def scenario(dev):
+        assert dev.base_prompt == b'<AR1>' and dev.paging_disabled
+        return await dev.execute_commands(['display ip interface brief', 'dis nothing'], pipeline=True)
+
+    results = _run(scenario)
+    assert [r['status'] for r in results] == ['success', 'error']
+    assert 'GigabitEthernet0/0/0' in results[0]['output']
+
+
+def test_configure_follows_view_changes():
+    async def scenario(dev):
+        results = await dev.configure(['sysname AR2', 'return'])
+        assert dev.current_view() == 'user' and not dev.in_system_view
+        # 以 return 结束后再次配置：重新进入系统视图，按新主机名匹配提示符
+        results += await dev.configure(['vlan 30'], pipeline=True, window=4)
+        assert dev.current_prompt == b'[AR2-vlan30]'
+        assert await dev.return_to_user_view() and dev.base_prompt == b'<AR2>'
+        return results
+
+    started = time.monotonic()
+    results = _run(scenario)
+    assert [r['status'] for r in results] == ['success', 'success', 'success']
+    assert time.monotonic() - started < 4   # 每条命令都在提示符出现时返回，没有等到超时
+
+
+def test_command_timeout_leaves_view_unknown():
+    async def scenario(dev):
+        started = time.monotonic()
+        await dev.execute_command('hang')
+        elapsed = time.monotonic() - started
+        return elapsed, dev.current_view()
+
+    elapsed, view = _run(scenario, timeout=0.5)
+    assert 0.5 <= elapsed < 2
+    assert view is None
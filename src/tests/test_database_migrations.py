@@ -0,0 +1,120 @@
+"""
+数据库迁移测试：新库建表、旧库原地升级，以及巡检日志查询的执行计划都走索引
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_database_migrations.py
+"""
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database
+
+# 引入迁移之前的 inspection_logs 表 (没有任何二级索引，user_version 为 0)
+LEGACY_SCHEMA = '''
+    CREATE TABLE inspection_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device_ip TEXT NOT NULL,
+        command TEXT NOT NULL,
+        result_json TEXT,
+        status TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'netops.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    yield path
+    database.close_connections()
+
+
+def _indexes(path):
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return names
+
+
+def _user_version(path):
+    conn = sqlite3.connect(path)
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    conn.close()
+    return version
+
+
+def test_fresh_database_reaches_latest_version(db_path):
+    database.init_db()
+
+    assert _user_version(db_path) == database.MIGRATIONS[-1][0]
+    assert {'idx_logs_device_time', 'idx_logs_status_time', 'idx_logs_time'} <= _indexes(db_path)
+
+    # 重复执行不会重跑迁移
+    database.init_db()
+    assert _user_version(db_path) == database.MIGRATIONS[-1][0]
+
+
+def test_legacy_database_is_upgraded_in_place(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO inspection_logs (device_ip, command, result_json, status) "
+                 "VALUES ('10.0.0.1', 'display version', '[]', 'success')")
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+
+    assert _user_version(db_path) == database.MIGRATIONS[-1][0]
+    assert 'idx_logs_device_time' in _indexes(db_path)
+    # 旧数据保留，缺失的表补齐
+    assert [row['device_ip'] for row in database.get_history()] == ['10.0.0.1']
+    assert database.get_all_devices() == []
+
+
+def _query_plans(call, monkeypatch):
+    """执行 call()，返回其间每条 SELECT 语句 (参数已展开) 的 EXPLAIN QUERY PLAN 明细"""
+    statements = []
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.set_trace_callback(statements.append)
+
+    @contextmanager
+    def traced_connection():
+        yield conn
+
+    monkeypatch.setattr(database, '_connection', traced_connection)
+    call()
+    conn.set_trace_callback(None)
+
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+    assert selects, "没有捕获到 SELECT 语句"
+    plans = {sql: [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)] for sql in selects}
+    conn.close()
+    return plans
+
+
+@pytest.mark.parametrize('call', [
+    lambda: database.get_history(),
+    lambda: database.get_logs_by_device('10.0.0.1'),
+    lambda: database.get_logs_by_status('error'),
+    lambda: database.get_logs_by_date_range('2024-01-01 00:00:00', '2024-12-31 23:59:59'),
+], ids=['history', 'by_device', 'by_status', 'by_date_range'])
+def test_log_queries_use_indexes(db_path, call, monkeypatch):
+    database.init_db()
+    database.save_logs([(f'10.0.0.{i % 10}', 'display version', [], 'success' if i % 3 else 'error')
+                        for i in range(200)])
+
+    for sql, plan in _query_plans(call, monkeypatch).items():
+        detail = ' | '.join(plan)
+        assert 'USING INDEX' in detail or 'USING COVERING INDEX' in detail, f"{sql}\n-> {detail}"
+        assert 'SCAN inspection_logs' not in plan, f"{sql}\n-> {detail}"   # 无索引的全表扫描
+        assert 'USE TEMP B-TREE FOR ORDER BY' not in detail, f"{sql}\n-> {detail}"
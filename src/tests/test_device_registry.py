@@ -0,0 +1,90 @@
+"""
+设备注册中心测试：id / host / group 索引，以及通过 registry_meta 版本号发现其它 Worker 的写入
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_device_registry.py
+"""
+import os
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database
+from app.device_registry import DeviceRegistry
+
+DEVICES = [
+    {'name': 'core', 'host': '10.0.0.1', 'port': 22, 'username': 'admin', 'password': 'x', 'group': 'core'},
+    {'name': 'core-alt', 'host': '10.0.0.1', 'port': 2222, 'username': 'admin', 'password': 'x', 'group': 'core'},
+    {'name': 'access', 'host': '10.0.0.2', 'port': 22, 'username': 'admin', 'password': 'x', 'group': 'access'},
+]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'netops.db'))
+    database.init_db()
+    yield
+    database.close_connections()
+
+
+def test_indexes_by_id_host_and_group(db):
+    registry = DeviceRegistry()
+    added = [registry.add(device) for device in DEVICES]
+
+    assert [d['name'] for d in registry.all()] == ['core', 'core-alt', 'access']
+    assert registry.get(added[2]['id'])['host'] == '10.0.0.2'
+    assert registry.get(9999) is None
+    assert sorted(d['port'] for d in registry.find_by_host('10.0.0.1')) == [22, 2222]
+    assert [d['name'] for d in registry.by_group('access')] == ['access']
+    assert registry.by_group('missing') == [] and registry.find_by_host('10.9.9.9') == []
+
+    # 修改分组与地址后，旧索引项不再命中
+    registry.update(added[1]['id'], {'host': '10.0.0.3', 'group': 'access'})
+    assert [d['port'] for d in registry.find_by_host('10.0.0.1')] == [22]
+    assert [d['name'] for d in registry.by_group('access')] == ['core-alt', 'access']
+
+    registry.delete(added[0]['id'])
+    assert registry.get(added[0]['id']) is None and registry.find_by_host('10.0.0.1') == []
+
+
+def test_other_worker_sees_changes_through_version(db):
+    # 两个实例模拟两个 Worker 进程，共用同一个数据库
+    writer = DeviceRegistry(check_interval=0)
+    reader = DeviceRegistry(check_interval=0)
+    device = writer.add(DEVICES[0])
+    assert reader.get(device['id'])['status'] == 'unknown'
+    reloads = reader.reloads
+
+    # 版本号不变时不重新加载
+    reader.get(device['id'])
+    assert reader.reloads == reloads
+
+    version = database.get_devices_version()
+    writer.update(device['id'], {'name': 'core-renamed', 'group': 'dc'})
+    writer.set_status(device['id'], 'online')
+    assert database.get_devices_version() > version
+
+    assert reader.get(device['id'])['name'] == 'core-renamed'
+    assert reader.get(device['id'])['status'] == 'online'
+    assert [d['id'] for d in reader.by_group('dc')] == [device['id']]
+    assert reader.reloads == reloads + 1
+
+    writer.delete(device['id'])
+    assert reader.get(device['id']) is None
+
+
+def test_version_checked_at_most_every_interval(db):
+    writer = DeviceRegistry(check_interval=0)
+    reader = DeviceRegistry(check_interval=3600)
+    device = writer.add(DEVICES[0])
+    assert reader.get(device['id'])['name'] == 'core'
+
+    writer.update(device['id'], {'name': 'changed'})
+    # 检查间隔内沿用缓存，间隔过后 (这里直接把上次检查时间拨回) 发现新版本
+    assert reader.get(device['id'])['name'] == 'core'
+    reader._checked_at -= 3600
+    assert reader.get(device['id'])['name'] == 'changed'
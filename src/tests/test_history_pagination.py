@@ -0,0 +1,98 @@
+"""
+巡检历史 keyset 分页测试：翻页不重不漏、流式导出从游标继续、深页执行计划不排序不跳行
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_history_pagination.py
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database
+
+TOTAL = 230
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'netops.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.init_db()
+    # 批量写入的记录大多落在同一秒，分页必须靠 id 区分时间相同的行
+    conn = sqlite3.connect(path)
+    conn.executemany('INSERT INTO inspection_logs (device_ip, command, result_json, status, timestamp) '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     [(f'10.0.0.{i % 3}', 'display version', '[]', 'error' if i % 4 == 0 else 'success',
+                       f'2024-06-0{1 + i // 100} 12:00:00') for i in range(TOTAL)])
+    conn.commit()
+    conn.close()
+    yield path
+    database.close_connections()
+
+
+def _walk(limit, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = database.get_logs_page(cursor=cursor, limit=limit, **filters)
+        ids += [row['id'] for row in rows]
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def test_pages_cover_every_row_once_in_order(db):
+    ids, pages = _walk(limit=17)
+    assert sorted(ids, reverse=True) == ids        # 同一时间戳内按 id 倒序
+    assert len(ids) == len(set(ids)) == TOTAL
+    assert pages == -(-TOTAL // 17)
+
+    ids, _ = _walk(limit=10, device_ip='10.0.0.1', status='success')
+    expected = [i + 1 for i in range(TOTAL) if i % 3 == 1 and i % 4 != 0]
+    assert ids == sorted(expected, reverse=True)
+
+    ids, _ = _walk(limit=50, since='2024-06-02 00:00:00', until='2024-06-02 23:59:59')
+    assert len(ids) == 100
+
+
+def test_iter_logs_streams_from_cursor(db):
+    first_page, cursor = database.get_logs_page(limit=40)
+    rest = database.iter_logs(cursor=cursor)
+    assert not isinstance(rest, list)
+    ids = [row['id'] for row in first_page] + [row['id'] for row in rest]
+    assert ids == list(range(TOTAL, 0, -1))
+
+    assert len(list(database.iter_logs(status='error', limit=5))) == 5
+
+
+def test_invalid_cursor_rejected(db):
+    with pytest.raises(ValueError):
+        database.get_logs_page(cursor='not-a-cursor')
+    with pytest.raises(ValueError):
+        database.iter_logs(cursor=database.encode_cursor({'timestamp': '2024-06-01', 'id': 'x'}))
+
+
+def test_legacy_helpers_keep_their_shape(db):
+    assert len(database.get_history()) == 20
+    assert all(row['device_ip'] == '10.0.0.2' for row in database.get_logs_by_device('10.0.0.2'))
+    assert len(database.get_logs_by_date_range('2024-06-01', '2024-06-03', limit=1000)) == 200
+
+
+@pytest.mark.parametrize('filters', [{}, {'device_ip': '10.0.0.1'}, {'status': 'error'}],
+                         ids=['all', 'by_device', 'by_status'])
+def test_deep_page_seeks_through_index(db, filters):
+    _, cursor = database.get_logs_page(limit=30, **filters)
+    assert cursor
+    sql, params = database._logs_query(cursor=cursor, **filters)
+    conn = sqlite3.connect(db)
+    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql + ' LIMIT 20', params)]
+    conn.close()
+    detail = ' | '.join(plan)
+    # SEARCH (按游标定位) 而不是 SCAN；无临时排序
+    assert len(plan) == 1 and plan[0].startswith('SEARCH inspection_logs USING INDEX'), detail
+    assert 'timestamp<?' in detail and 'TEMP B-TREE' not in detail, detail
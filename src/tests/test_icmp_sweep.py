@@ -0,0 +1,81 @@
+"""
+IcmpSweeper 测试：目标展开与本机回环地址巡检
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_icmp_sweep.py
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.icmp_sweep import IcmpSweeper, expand_targets, open_icmp_socket, parse_ping_output
+
+
+def _can_ping():
+    sock, _ = open_icmp_socket()
+    if sock is not None:
+        sock.close()
+        return True
+    return shutil.which('ping') is not None
+
+
+def test_expand_targets_cidr_and_names():
+    expanded = expand_targets(['10.0.0.0/30', {'ip': '10.0.1.1', 'name': 'core'}, '', '10.0.0.0/33'])
+    assert expanded == [('10.0.0.1', '10.0.0.1'), ('10.0.0.2', '10.0.0.2'), ('core', '10.0.1.1'),
+                        ('', ''), ('10.0.0.0/33', '')]
+    with pytest.raises(ValueError):
+        expand_targets(['10.0.0.0/8'])
+
+
+def test_parse_ping_output():
+    output = ('3 packets transmitted, 2 received, 33.3333% packet loss, time 2003ms\n'
+              'rtt min/avg/max/mdev = 0.041/0.052/0.063/0.011 ms\n')
+    assert parse_ping_output(output) == {
+        'packets_transmitted': 3, 'packets_received': 2, 'packet_loss': 33.3333,
+        'rtt_min': 0.041, 'rtt_avg': 0.052, 'rtt_max': 0.063,
+    }
+
+
+@pytest.mark.skipif(not _can_ping(), reason="no ICMP socket permission and no ping binary")
+def test_sweep_loopback():
+    results = IcmpSweeper(count=2, timeout=1, interval=0.05).sweep(['127.0.0.0/29', {'ip': '', 'name': 'bad'}])
+    assert [r['target_ip'] for r in results[:6]] == [f'127.0.0.{i}' for i in range(1, 7)]
+    for result in results[:6]:
+        assert result['reachable'] and result['packets_received'] == 2 and result['packet_loss'] == 0.0
+        assert result['rtt_min'] <= result['rtt_avg'] <= result['rtt_max']
+    assert results[-1]['target'] == 'bad' and not results[-1]['reachable'] and 'error' in results[-1]
+
+
+class _FullBufferSocket:
+    """前几次 sendto 报 BlockingIOError (发送缓冲区满)，其余操作转给真实套接字"""
+
+    def __init__(self, sock, busy):
+        self._sock = sock
+        self.busy = busy
+
+    def sendto(self, data, addr):
+        if self.busy:
+            self.busy -= 1
+            raise BlockingIOError
+        return self._sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+def test_sweep_retries_when_send_buffer_full(monkeypatch):
+    sock, raw = open_icmp_socket()
+    if sock is None:
+        pytest.skip("no ICMP socket permission")
+    wrapped = _FullBufferSocket(sock, busy=3)
+    monkeypatch.setattr('core.icmp_sweep.open_icmp_socket', lambda: (wrapped, raw))
+
+    results = IcmpSweeper(count=2, timeout=1, interval=0.05).sweep(['127.0.0.1', '127.0.0.2'])
+    assert wrapped.busy == 0
+    assert all(r['reachable'] and r['packets_received'] == 2 for r in results)
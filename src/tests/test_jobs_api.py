@@ -0,0 +1,128 @@
+"""
+后台任务接口测试：提交 / 轮询状态、配置下发任务连接本地模拟 VRP 设备 (tests/fake_vrp_server.py)、
+失败任务与进程重启后被中断的任务
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_jobs_api.py
+"""
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+# 路径修正：确保能导入 app、core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+import run
+from app import database
+from app.device_registry import device_registry
+from core.session_pool import SessionPool
+from tests.fake_vrp_server import FakeVRPServer
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'netops.db'))
+    database.init_db()
+    device_registry.invalidate()
+    pool = SessionPool(max_sessions_per_device=1)
+    monkeypatch.setattr(run, 'session_pool', pool)
+    yield run.app.test_client()
+    pool.close_all()
+    device_registry.invalidate()
+    database.close_connections()
+
+
+def _add_device(port, username='admin', password='Admin@123'):
+    return device_registry.add({'name': 'AR1', 'host': '127.0.0.1', 'port': port,
+                                'username': username, 'password': password})
+
+
+def _submit(client, payload):
+    response = client.post('/api/jobs', json=payload)
+    return response.status_code, response.get_json()
+
+
+def _wait(client, job_id, timeout=20):
+    """轮询任务状态直到结束"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()['data']
+        if job['status'] in ('success', 'error'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish: {job}")
+
+
+def test_configure_job_returns_session_in_user_view(client):
+    with FakeVRPServer() as server:
+        device = _add_device(server.port, server.username, server.password)
+        commands = ['interface GigabitEthernet0/0/1', 'description uplink', 'dis nothing']
+        code, body = _submit(client, {'type': 'configure', 'device_id': device['id'], 'commands': commands[:2],
+                                      'save': True})
+        assert code == 202 and body['data']['job_status'] == 'queued'
+        assert body['data']['url'] == f"/api/jobs/{body['data']['job_id']}"
+
+        job = _wait(client, body['data']['job_id'])
+        assert job['status'] == 'success' and job['job_type'] == 'configure'
+        assert job['params']['commands'] == commands[:2]
+        assert [r['status'] for r in job['result']['results']] == ['success', 'success']
+        assert job['result']['failed'] == [] and job['result']['saved'] is True
+        assert job['started_at'] and job['finished_at']
+
+        # 配置停在接口视图，归还时已回到用户视图；下一个任务复用同一会话
+        pool = run.session_pool
+        assert pool.stats()['idle'] == 1 and pool.stats()['discarded'] == 0
+        idle = [entry.device for queue in pool._idle.values() for entry in queue]
+        assert [dev.current_view() for dev in idle] == ['user']
+
+        code, body = _submit(client, {'type': 'configure', 'device_id': device['id'], 'commands': commands,
+                                      'pipeline': True, 'save': True})
+        job = _wait(client, body['data']['job_id'])
+        assert job['status'] == 'success'
+        assert job['result']['failed'] == ['dis nothing'] and job['result']['saved'] is False
+        assert pool.stats()['created'] == 1 and pool.stats()['reused'] == 1
+        assert server.sessions == 1
+
+
+def test_submit_rejects_unknown_type_and_device(client):
+    code, body = _submit(client, {'type': 'reboot', 'device_id': 1})
+    assert code == 400 and 'configure' in body['supported_types']
+
+    code, body = _submit(client, {'type': 'configure', 'device_id': 999, 'commands': ['vlan 10']})
+    assert code == 404
+
+    response = client.get('/api/jobs/no-such-job')
+    assert response.status_code == 404
+
+
+def test_failed_jobs_report_error(client):
+    # 没有在监听的端口：连接被拒绝
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        closed_port = sock.getsockname()[1]
+    device = _add_device(closed_port)
+
+    _, body = _submit(client, {'type': 'configure', 'device_id': device['id'], 'commands': ['vlan 10']})
+    job = _wait(client, body['data']['job_id'])
+    assert job['status'] == 'error' and job['error'] and job['result'] is None
+    assert run.session_pool.stats()['in_use'] == 0
+
+    _, body = _submit(client, {'type': 'configure', 'device_id': device['id'], 'commands': []})
+    job = _wait(client, body['data']['job_id'])
+    assert job['status'] == 'error' and job['error'] == 'Commands list is required'
+
+
+def test_interrupted_jobs_marked_failed_on_restart(client):
+    assert database.create_job('queued-job', 'configure', {'commands': ['vlan 10']})
+    assert database.create_job('running-job', 'scan', {})
+    database.mark_job_running('running-job')
+
+    # 进程重启时未执行完的任务不会再执行
+    assert database.fail_interrupted_jobs() == 2
+    for job_id in ('queued-job', 'running-job'):
+        job = client.get(f'/api/jobs/{job_id}').get_json()['data']
+        assert job['status'] == 'error' and job['error'] == 'Interrupted by server restart'
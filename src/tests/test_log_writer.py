@@ -0,0 +1,138 @@
+"""
+LogWriter 测试：批量落盘、退出时排空队列、队列满时的背压与丢弃计数
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_log_writer.py
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database
+from app.database import LogWriter
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'netops.db'))
+    database.init_db()
+    yield
+    database.close_connections()
+
+
+def _count_logs():
+    with database._connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM inspection_logs').fetchone()[0]
+
+
+def test_batches_rows_into_few_transactions(db):
+    writer = LogWriter(batch_size=200, flush_interval=5)
+    writer.start()
+    for i in range(1000):
+        writer.submit(f'10.0.0.{i % 10}', 'display version', [{'i': i}])
+    assert writer.flush(timeout=10)
+
+    stats = writer.stats()
+    assert _count_logs() == 1000
+    assert stats['queued'] == stats['flushed'] == 1000 and stats['dropped'] == 0
+    # 攒满 batch_size 立即落盘，不必等 flush_interval
+    assert stats['batches'] == 5
+    writer.close()
+
+
+def test_flushes_on_interval(db):
+    writer = LogWriter(batch_size=1000, flush_interval=0.05)
+    writer.start()
+    writer.submit('10.0.0.1', 'display version', 'ok')
+
+    deadline = time.monotonic() + 5
+    while writer.stats()['flushed'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _count_logs() == 1
+    writer.close()
+
+
+def test_close_drains_queue(db):
+    writer = LogWriter(batch_size=10000, flush_interval=60)
+    writer.start()
+    for i in range(300):
+        writer.submit('10.0.0.1', 'display version', [{'i': i}], status='error' if i % 2 else 'success')
+    writer.close()
+
+    assert _count_logs() == 300
+    assert not writer.running
+
+
+def test_backpressure_then_drop_when_queue_stays_full(db, monkeypatch):
+    release = threading.Event()
+    real_save_logs = database.save_logs
+
+    def slow_save_logs(records):
+        release.wait()
+        return real_save_logs(records)
+
+    monkeypatch.setattr(database, 'save_logs', slow_save_logs)
+    writer = LogWriter(batch_size=1, flush_interval=0, max_queue=2, submit_timeout=0.05)
+    writer.start()
+
+    # 第一条被写入线程取走后卡在 save_logs，再入队两条填满队列
+    results = [writer.submit('10.0.0.1', 'cmd', 0)]
+    deadline = time.monotonic() + 5
+    while writer.stats()['pending'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    results += [writer.submit('10.0.0.1', 'cmd', i) for i in (1, 2)]
+    started = time.monotonic()
+    assert writer.submit('10.0.0.1', 'cmd', 'overflow') is False
+    assert time.monotonic() - started >= 0.05   # 先阻塞等待，超时才丢弃
+
+    release.set()
+    writer.close()
+    stats = writer.stats()
+    assert results == [True, True, True]
+    assert stats['dropped'] == 1 and stats['flushed'] == 3
+    assert _count_logs() == 3
+
+
+def test_save_log_enqueues_only_while_running(db, monkeypatch):
+    writer = LogWriter(batch_size=10000, flush_interval=60)
+    monkeypatch.setattr(database, 'log_writer', writer)
+
+    # 未启动：同步写入
+    database.save_log('10.0.0.1', 'display version', 'sync')
+    assert _count_logs() == 1
+
+    writer.start()
+    database.save_log('10.0.0.1', 'display version', [{'a': 1}])
+    assert _count_logs() == 1 and writer.stats()['queued'] == 1
+    writer.close()
+    assert _count_logs() == 2
+
+
+def test_submit_snapshots_result_before_queueing(db):
+    writer = LogWriter(batch_size=10000, flush_interval=60)
+    writer.start()
+    result = [{'interface': 'GigabitEthernet0/0/1', 'phy': 'down', 'protocol': 'down'}]
+    writer.submit('10.0.0.1', 'display interface brief', result)
+    # 入队后调用方继续修改同一个对象，落盘的仍是 submit 时的内容
+    result[0]['phy'] = 'up'
+    result.append({'interface': 'GigabitEthernet0/0/2', 'phy': 'up', 'protocol': 'up'})
+    writer.close()
+
+    row = database.get_logs_by_device('10.0.0.1')[0]
+    assert '"up"' not in row['result_json'] and 'GigabitEthernet0/0/2' not in row['result_json']
+    assert [r['interface'] for r in database.query_results('interfaces', status='down')] == ['GigabitEthernet0/0/1']
+
+    # 无法序列化的结果在 submit 时就被丢弃，不会拖累同一批次的其它记录
+    writer = LogWriter(batch_size=10000, flush_interval=60)
+    writer.start()
+    assert writer.submit('10.0.0.2', 'display version', [{'bad': object()}]) is False
+    assert writer.submit('10.0.0.2', 'display version', 'ok') is True
+    writer.close()
+    assert writer.stats()['dropped'] == 1 and len(database.get_logs_by_device('10.0.0.2')) == 1
@@ -0,0 +1,187 @@
+"""
+多设备命令矩阵与 NDJSON 输出测试 (Flask test client + 本地模拟 VRP 设备)：
+矩阵结构 (含连接失败的设备)、NDJSON 分行、fields 字段投影 (含不存在的字段)
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_matrix_ndjson.py
+"""
+import gzip
+import json
+import os
+import socket
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 app、core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+import run
+from app import database
+from app.device_registry import device_registry
+from core.session_pool import SessionPool
+from core.template_resolver import TemplateResolver
+from tests.fake_vrp_server import FakeVRPServer
+
+# 与模拟设备 display ip interface brief 输出对应的最小模板
+IP_INT_BRIEF_TEMPLATE = r"""Value INTERFACE (\S+)
+Value IP_ADDRESS (\S+)
+Value PHYSICAL (\S+)
+Value PROTOCOL (\S+)
+
+Start
+  ^Interface\s+IP\s+Address -> Table
+
+Table
+  ^${INTERFACE}\s+${IP_ADDRESS}\s+${PHYSICAL}\s+${PROTOCOL}\s*$$ -> Record
+"""
+COMMANDS = ['display ip interface brief', 'display clock']
+
+
+@pytest.fixture
+def server():
+    with FakeVRPServer(interfaces=4) as server:
+        yield server
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'netops.db'))
+    database.init_db()
+    device_registry.invalidate()
+
+    (tmp_path / 'ip_int_brief.textfsm').write_text(IP_INT_BRIEF_TEMPLATE, encoding='utf-8')
+    resolver = TemplateResolver.from_mapping({'huawei_vrp': {COMMANDS[0]: 'ip_int_brief.textfsm'}},
+                                             template_dir=str(tmp_path))
+    monkeypatch.setattr(run, 'template_resolver', resolver)
+    pool = SessionPool()
+    monkeypatch.setattr(run, 'session_pool', pool)
+
+    yield run.app.test_client()
+    pool.close_all()
+    device_registry.invalidate()
+    database.close_connections()
+
+
+def _add_device(name, port, username='admin', password='Admin@123'):
+    return device_registry.add({'name': name, 'host': '127.0.0.1', 'port': port,
+                                'username': username, 'password': password})
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _ndjson_lines(response):
+    """校验 NDJSON 分行：每行一个 JSON 对象、以换行结尾、没有空行"""
+    body = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    text = body.decode('utf-8')
+    assert text.endswith('\n')
+    lines = text[:-1].split('\n')
+    assert all(line.strip() for line in lines)
+    return [json.loads(line) for line in lines]
+
+
+# ---------- /api/matrix ----------
+
+def test_matrix_shape_with_failing_device(client, server):
+    good = _add_device('AR1', server.port, server.username, server.password)
+    bad = _add_device('AR-down', _closed_port())
+
+    response = client.post('/api/matrix', json={'commands': COMMANDS + ['display clock', ' '],
+                                                'device_ids': [good['id'], bad['id']]})
+    data = response.get_json()['data']
+    # 空命令与重复命令被去掉
+    assert data['commands'] == COMMANDS
+    assert set(data['devices']) == {str(good['id']), str(bad['id'])}
+
+    ok = data['devices'][str(good['id'])]
+    assert ok['status'] == 'success' and ok['name'] == 'AR1' and ok['elapsed'] >= 0
+    assert set(ok['cells']) == set(COMMANDS)
+    table = ok['cells'][COMMANDS[0]]
+    assert table['status'] == 'success' and table['template'] == 'ip_int_brief.textfsm'
+    assert [row['interface'] for row in table['rows']][-1] == 'NULL0' and len(table['rows']) == 5
+    assert 'output' not in table   # include_raw=false 且已解析
+    clock = ok['cells']['display clock']
+    assert clock['rows'] is None and clock['output']   # 没有模板的命令返回原始输出
+    assert all(cell['exec_ms'] >= 0 and 'parse_ms' in cell for cell in ok['cells'].values())
+
+    down = data['devices'][str(bad['id'])]
+    assert down['status'] == 'error' and down['message'] and down['cells'] == {}
+
+    assert {key: data['summary'][key] for key in ('success', 'error', 'devices', 'commands')} == \
+        {'success': 1, 'error': 1, 'devices': 2, 'commands': 2}
+    # 在线状态与巡检日志在矩阵结束时批量写入
+    assert device_registry.get(good['id'])['status'] == 'online'
+    assert device_registry.get(bad['id'])['status'] == 'offline'
+    assert {row['command'] for row in database.get_history(limit=10)} == set(COMMANDS) | {'matrix'}
+
+
+def test_matrix_stream_is_ndjson(client, server):
+    good = _add_device('AR1', server.port, server.username, server.password)
+    bad = _add_device('AR-down', _closed_port())
+
+    response = client.post('/api/matrix', json={'commands': COMMANDS, 'stream': True, 'include_raw': True})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = _ndjson_lines(response)
+    assert sorted(line['device_id'] for line in lines[:-1]) == [good['id'], bad['id']]
+    assert lines[-1]['summary']['devices'] == 2 and lines[-1]['summary']['error'] == 1
+    ok = next(line for line in lines if line.get('device_id') == good['id'])
+    assert ok['cells'][COMMANDS[0]]['output']   # include_raw 保留原始输出
+
+
+def test_matrix_validation(client):
+    assert client.post('/api/matrix', json={'commands': [' ']}).status_code == 400
+    assert client.post('/api/matrix', json={'commands': COMMANDS, 'device_ids': [999]}).status_code == 404
+    assert client.post('/api/matrix', json={'commands': COMMANDS, 'group': 'none'}).status_code == 404
+
+
+# ---------- NDJSON 与字段投影 ----------
+
+def test_execute_command_ndjson_with_projection(client, server):
+    device = _add_device('AR1', server.port, server.username, server.password)
+    response = client.post(f"/api/execute-command/{device['id']}", json={
+        'command': 'dis ip int br', 'format': 'ndjson', 'fields': ['Interface', ' ip_address ', 'no_such_field']})
+    assert response.mimetype == 'application/x-ndjson'
+
+    meta, *rows = _ndjson_lines(response)
+    assert meta['meta']['rows'] == len(rows) == 5 and meta['meta']['template_used'] == 'ip_int_brief.textfsm'
+    # 字段名不区分大小写；不存在的字段直接忽略，不会产生 null 列
+    assert all(set(row) == {'interface', 'ip_address'} for row in rows)
+    assert rows[-1] == {'interface': 'NULL0', 'ip_address': 'unassigned'}
+
+
+def test_execute_command_json_projection(client, server):
+    device = _add_device('AR1', server.port, server.username, server.password)
+    data = client.post(f"/api/execute-command/{device['id']}", json={
+        'command': 'display ip interface brief', 'fields': 'no_such_field', 'include_raw': False}).get_json()['data']
+    assert data['parsed_result'] == [{}] * 5 and 'raw_output' not in data
+
+    data = client.post(f"/api/execute-command/{device['id']}", json={
+        'command': 'display ip interface brief'}).get_json()['data']
+    assert set(data['parsed_result'][0]) == {'interface', 'ip_address', 'physical', 'protocol'}
+
+
+def test_batch_commands_ndjson_via_accept_and_gzip(client, server):
+    device = _add_device('AR1', server.port, server.username, server.password)
+    response = client.post(f"/api/batch-commands/{device['id']}",
+                           json={'commands': COMMANDS + ['dis nothing'], 'fields': 'interface,protocol',
+                                 'include_raw': False},
+                           headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = _ndjson_lines(response)
+
+    metas = [index for index, line in enumerate(lines) if 'meta' in line]
+    assert [lines[i]['meta']['command'] for i in metas] == COMMANDS + ['dis nothing']
+    table = lines[metas[0] + 1:metas[1]]
+    assert len(table) == lines[metas[0]]['meta']['rows'] == 5
+    assert all(set(row) == {'interface', 'protocol'} for row in table)
+    # 没有模板的命令保留原始输出；执行失败的命令在 meta 中带状态
+    assert lines[metas[1]]['meta']['raw_output'] and lines[metas[1]]['meta']['rows'] is None
+    assert lines[metas[2]]['meta']['status'] == 'error'
+    assert metas[2] == len(lines) - 1
@@ -0,0 +1,70 @@
+"""
+阶段耗时直方图测试：Prometheus 文本格式、标签规范化与基数上限、关闭时的空计时器
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_metrics.py
+"""
+import os
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from utils.metrics import Histogram, Metrics, command_label
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('t_seconds', 'test', ('phase', 'command'), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, ('parse', 'display  "x"'))
+    lines = histogram.render()
+    assert 't_seconds_bucket{phase="parse",command="display \\"x\\"",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{phase="parse",command="display \\"x\\"",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{phase="parse",command="display \\"x\\"",le="+Inf"} 4' in lines
+    assert 't_seconds_sum{phase="parse",command="display \\"x\\""} 4.250000' in lines
+    assert 't_seconds_count{phase="parse",command="display \\"x\\""} 4' in lines
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.timer('command', 'h', 'c'):
+        pass
+    metrics.observe('paging', 1.0)
+    assert metrics.render().count('\n') == 2   # 只有 HELP / TYPE 两行
+
+
+def test_labels_normalized_before_keying():
+    histogram = Histogram('t_seconds', 'test', ('phase', 'command'), buckets=(1.0,))
+    histogram.observe(0.5, ('parse', 'display  version'))
+    histogram.observe(0.5, ('parse', ' display version\n'))
+    count_lines = [line for line in histogram.render() if line.startswith('t_seconds_count')]
+    assert count_lines == ['t_seconds_count{phase="parse",command="display version"} 2']
+
+
+@pytest.mark.parametrize('command, label', [
+    ('display ip interface brief', 'display ip interface brief'),
+    ('dis int br', 'dis int br'),
+    ('ping -c 3 10.0.0.1', 'ping'),
+    ('ping 10.0.0.1', 'ping'),
+    ('display interface GigabitEthernet0/0/1', 'display interface'),
+    ('vlan 30', 'vlan'),
+    ('Display Current-Configuration', 'display current-configuration'),
+    ('', ''),
+])
+def test_command_label_drops_arguments(command, label):
+    assert command_label(command) == label
+
+
+def test_command_label_cardinality_is_bounded():
+    metrics = Metrics(enabled=True)
+    for i in range(300):
+        metrics.observe('command', 0.1, '10.0.0.1', f'ping 10.0.{i // 256}.{i % 256}')
+    assert len(metrics.phase_seconds._series) == 1
+
+    histogram = Histogram('t_seconds', 'test', ('phase',), max_series=3)
+    for i in range(10):
+        histogram.observe(0.1, (f'phase{i}',))
+    assert sorted(histogram._series) == [('other',), ('phase0',), ('phase1',), ('phase2',)]
@@ -0,0 +1,149 @@
+"""
+提示符匹配器测试：故意把提示符拆散到多个 chunk 中
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_prompt_matcher.py
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.prompt_matcher import PromptMatcher, extract_hostname, prompt_view
+from core.ssh_client import NetworkDevice
+
+OUTPUT = (
+    b'display ip interface brief\r\n'
+    b'Interface                         IP Address/Mask      Physical   Protocol  \r\n'
+    b'GigabitEthernet0/0/0              192.168.10.1/24      up         up        \r\n'
+)
+
+
+def feed_all(matcher, chunks):
+    """依次喂入 chunk，返回首次匹配成功的 chunk 下标 (未匹配返回 None)"""
+    for index, chunk in enumerate(chunks):
+        if matcher.feed(chunk):
+            return index
+    return None
+
+
+def test_prompt_fed_byte_by_byte():
+    data = OUTPUT + b'<AR1>'
+    matcher = PromptMatcher.for_device('huawei_vrp', base_prompt=b'<AR1>')
+    chunks = [data[i:i + 1] for i in range(len(data))]
+    assert feed_all(matcher, chunks) == len(chunks) - 1
+
+
+def test_prompt_split_at_every_position():
+    prompt = b'[AR1-GigabitEthernet0/0/0]'
+    data = OUTPUT + prompt
+    for cut in range(len(OUTPUT) + 1, len(data)):
+        matcher = PromptMatcher.for_device('huawei_vrp', base_prompt=b'<AR1>')
+        assert feed_all(matcher, [data[:cut], data[cut:]]) == 1, cut
+
+
+def test_literal_prompt_split_across_chunks():
+    data = OUTPUT + b'<AR1>'
+    for cut in range(len(OUTPUT) + 1, len(data)):
+        matcher = PromptMatcher.for_device('huawei_vrp', expect_prompt=b'<AR1>')
+        assert feed_all(matcher, [data[:cut], data[cut:]]) == 1, cut
+
+
+def test_no_false_positive_inside_output():
+    matcher = PromptMatcher.for_device('huawei_vrp', base_prompt=b'<AR1>')
+    # 输出中间出现类似提示符的行、且 chunk 恰好在这里结束，都不应被当作提示符
+    assert not matcher.feed(b'[V200R003C00SPC200]\r\n')
+    assert not matcher.feed(b'<AR2>')
+    assert not matcher.feed(b'  ---- More ----')
+    assert matcher.feed(b'\r\n[AR1]')
+
+
+def test_bytes_examined_bounded_by_window():
+    window = 256
+    chunk = b'x' * 4095 + b'\n'
+    matcher = PromptMatcher.for_device('huawei_vrp', base_prompt=b'<AR1>', window=window)
+    for _ in range(256):  # 1 MB 没有提示符的输出
+        assert not matcher.feed(chunk)
+    assert matcher.feed(b'<AR1>')
+    assert matcher.bytes_examined <= 257 * window
+
+
+def test_extract_hostname():
+    assert extract_hostname(b'<AR1>') == b'AR1'
+    assert extract_hostname(b'[~CE-1] ') == b'CE-1'
+    assert extract_hostname(b'R1(config-if)#') == b'R1'
+    assert extract_hostname(b'') is None
+
+
+class _FragmentingChannel:
+    """把设备回显按固定大小切片发送，提示符必然跨多个 recv"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.closed = False
+        self.eof_received = False
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def recv_ready(self):
+        return False
+
+    def recv(self, nbytes):
+        return self.sock.recv(nbytes)
+
+    def send(self, data):
+        self.sock.sendall(data)
+        return len(data)
+
+
+def _device(sock, piece):
+    line = b''
+    while not line.endswith(b'\n'):
+        line += sock.recv(1024)
+    reply = OUTPUT + b'<AR1>'
+    for i in range(0, len(reply), piece):
+        sock.sendall(reply[i:i + piece])
+        time.sleep(0.005)
+
+
+def test_execute_command_returns_without_waiting_for_timeout():
+    host_sock, dev_sock = socket.socketpair()
+    threading.Thread(target=_device, args=(dev_sock, 3), daemon=True).start()
+
+    device = NetworkDevice('127.0.0.1', 'admin', 'admin', timeout=5)
+    device.chan = _FragmentingChannel(host_sock)
+    device.base_prompt = b'<AR1>'
+
+    start = time.monotonic()
+    output = device.execute_command('display ip interface brief')
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 2, elapsed
+    assert 'GigabitEthernet0/0/0' in output
+    assert '<AR1>' not in output
+    assert 0 < device.last_prompt_scan_bytes
+
+
+@pytest.mark.parametrize('prompt, device_type, hostname, view', [
+    (b'<AR1>', 'huawei_vrp', None, 'user'),
+    (b'[AR1]', 'huawei_vrp', None, 'system'),
+    (b'[~AR1]', 'huawei_vrp', b'AR1', 'system'),
+    (b'[AR1-GigabitEthernet0/0/1]', 'huawei_vrp', b'AR1', 'sub'),
+    (b'[AR1-vlan30]', 'huawei_vrp', None, 'sub'),
+    (b'[Core-SW1]', 'huawei_vrp', b'Core-SW1', 'system'),   # 主机名本身带 -
+    (b'R1#', 'cisco_ios', None, 'user'),
+    (b'R1(config)#', 'cisco_ios', None, 'system'),
+    (b'R1(config-if)#', 'cisco_ios', None, 'sub'),
+    (b'Error: Unrecognized command', 'huawei_vrp', None, None),
+    (None, 'huawei_vrp', None, None),
+])
+def test_prompt_view(prompt, device_type, hostname, view):
+    assert prompt_view(prompt, device_type, hostname) == view
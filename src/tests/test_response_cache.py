@@ -0,0 +1,57 @@
+"""
+ResponseCache 测试：TTL 命中、按 tag 失效与命中统计
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_response_cache.py
+"""
+import os
+import sys
+
+# 路径修正：确保能导入 app 和 core (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from flask import Flask, jsonify
+
+from app.response_cache import ResponseCache
+
+
+def _make_app(cache, ttl=60):
+    app = Flask(__name__)
+    calls = {'n': 0}
+
+    @app.route('/stats')
+    @cache.cached(ttl, tags=('devices',))
+    def stats():
+        calls['n'] += 1
+        return jsonify({"status": "success", "data": calls['n']})
+
+    return app.test_client(), calls
+
+
+def test_hits_until_invalidated():
+    cache = ResponseCache()
+    client, calls = _make_app(cache)
+
+    assert client.get('/stats').headers['X-Cache'] == 'MISS'
+    response = client.get('/stats')
+    assert response.headers['X-Cache'] == 'HIT' and response.json['data'] == 1
+
+    # 查询串不同视为不同条目
+    assert client.get('/stats?x=1').headers['X-Cache'] == 'MISS'
+
+    cache.invalidate('logs')
+    assert client.get('/stats').headers['X-Cache'] == 'HIT'
+    cache.invalidate('devices')
+    response = client.get('/stats')
+    assert response.headers['X-Cache'] == 'MISS' and response.json['data'] == 3
+
+    assert cache.stats()['routes']['stats'] == {'hits': 2, 'misses': 3, 'invalidations': 2, 'hit_rate': 0.4}
+
+
+def test_expired_entries_are_recomputed():
+    cache = ResponseCache()
+    client, calls = _make_app(cache, ttl=0)
+    client.get('/stats')
+    client.get('/stats')
+    assert calls['n'] == 2
@@ -0,0 +1,155 @@
+"""
+NetworkDevice 离线回归测试：连接本地模拟 VRP 设备 (tests/fake_vrp_server.py)，无需 EVE-NG
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_ssh_client_offline.py
+"""
+import os
+import sys
+import time
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.ssh_client import NetworkDevice
+from tests.fake_vrp_server import FakeVRPServer
+
+
+def _connect(server, **kwargs):
+    dev = NetworkDevice('127.0.0.1', server.username, server.password, port=server.port, timeout=5, **kwargs)
+    dev.connect()
+    return dev
+
+
+def test_paging_disabled_and_views():
+    with FakeVRPServer(interfaces=40) as server:
+        dev = _connect(server)
+        try:
+            assert dev.base_prompt == b'<AR1>'
+            assert dev.paging_disabled
+            output = dev.execute_command('dis ip int br')
+            assert 'GigabitEthernet0/0/38' in output and 'NULL0' in output
+            dev.enter_system_view()
+            assert 'Error' in dev.execute_command('display no-such-thing')
+            dev.exit_system_view()
+        finally:
+            dev.close()
+
+
+def test_more_paging_matches_unpaged_output():
+    with FakeVRPServer(interfaces=40, page_lines=10) as server:
+        dev = _connect(server, disable_paging=False)
+        try:
+            paged = dev.execute_command('display ip interface brief')
+        finally:
+            dev.close()
+    assert 'More' not in paged
+    assert [line.strip() for line in paged.splitlines()][-1].startswith('NULL0')
+    assert sum('GigabitEthernet' in line for line in paged.splitlines()) == 40
+
+
+def test_pipelined_configure_matches_sequential():
+    commands = ['interface GigabitEthernet0/0/1', 'description uplink', 'quit', 'dis nothing', 'vlan 10', 'quit']
+    with FakeVRPServer(command_latency=0.01) as server:
+        results = []
+        for pipeline in (False, True):
+            dev = _connect(server)
+            try:
+                results.append(dev.configure(commands, pipeline=pipeline))
+            finally:
+                dev.close()
+    sequential, pipelined = results
+    assert [r['status'] for r in pipelined] == ['success', 'success', 'success', 'error', 'success', 'success']
+    assert pipelined == sequential
+
+    # 配置中改主机名：之后的提示符带新主机名，流水线切分不能依赖登录时的提示符
+    commands = ['sysname AR9', 'vlan 10', 'quit', 'sysname AR1']
+    with FakeVRPServer(command_latency=0.01) as server:
+        results = []
+        for pipeline in (False, True):
+            dev = _connect(server)
+            try:
+                started = time.monotonic()
+                results.append(dev.configure(commands, pipeline=pipeline))
+                assert time.monotonic() - started < 2
+                assert dev.current_prompt == b'[AR1]'
+            finally:
+                dev.close()
+    sequential, pipelined = results
+    assert [r['status'] for r in pipelined] == ['success'] * 4
+    assert pipelined == sequential
+
+
+def test_stream_command_matches_execute_command():
+    with FakeVRPServer(interfaces=40, page_lines=10) as server:
+        dev = _connect(server, disable_paging=False)
+        try:
+            full = dev.execute_command('display ip interface brief')
+            streamed = [line for lines in dev.stream_command('display ip interface brief') for line in lines]
+        finally:
+            dev.close()
+    # execute_command 对整段输出 strip()，最后一行的行尾空格会被去掉
+    assert [line.rstrip() for line in streamed] == [line.rstrip() for line in full.splitlines()]
+
+
+def test_ping_many_shares_one_login():
+    targets = [f'10.0.0.{i}' for i in range(1, 10)]
+    with FakeVRPServer(command_latency=0.01) as server:
+        dev = _connect(server)
+        try:
+            indexes = [index for index, _ in dev.ping_many(targets, channels=3)]
+            assert dev.execute_command('display clock')
+        finally:
+            dev.close()
+        assert sorted(indexes) == list(range(len(targets)))
+        assert server.sessions == 1 and server.channels == 3
+
+
+def test_pooled_session_view_follows_prompt():
+    from core.session_pool import SessionPool
+
+    pool = SessionPool(max_sessions_per_device=1)
+    with FakeVRPServer() as server:
+        device = {'id': 1, 'host': '127.0.0.1', 'port': server.port,
+                  'username': server.username, 'password': server.password}
+        try:
+            # 配置以 return 结束：会话回到 <AR2>，下次借出时要重新进入系统视图 (主机名已改)
+            with pool.session(device) as dev:
+                results = dev.configure(['sysname AR2', 'return'])
+                assert [r['status'] for r in results] == ['success', 'success']
+                assert dev.current_view() == 'user' and not dev.in_system_view
+            started = time.monotonic()
+            with pool.session(device) as dev:
+                assert dev.configure(['vlan 30'])[0]['status'] == 'success'
+                assert dev.current_prompt == b'[AR2-vlan30]'
+            assert time.monotonic() - started < 5   # 按新主机名识别提示符，不等到 10 秒超时
+            # 停在子视图的会话归还时先 return 回用户视图再复用
+            with pool.session(device) as dev:
+                assert dev.current_prompt == b'<AR2>'
+                assert dev.base_prompt == b'<AR2>'
+                assert 'Error' not in dev.execute_command('display clock')
+            assert pool.stats()['created'] == 1 and pool.stats()['discarded'] == 0
+        finally:
+            pool.close_all()
+
+
+def test_probe_matches_full_prompt_and_drains():
+    with FakeVRPServer() as server:
+        dev = _connect(server)
+        try:
+            # 未读取的残留输出被探测读空，不影响下一条命令
+            dev.chan.send(b'display clock\n')
+            time.sleep(0.2)
+            assert dev.probe()
+            assert dev.current_view() == 'user'
+            assert dev.execute_command('display version').startswith('Huawei Versatile Routing Platform')
+
+            dev.enter_system_view()
+            assert dev.probe() and dev.in_system_view
+
+            # 回显的不是本设备的提示符时探测失败
+            dev.base_prompt = b'<OTHER>'
+            assert not dev.probe(timeout=0.5)
+        finally:
+            dev.close()
@@ -0,0 +1,104 @@
+"""
+TextFSM 模板注册表测试：克隆互不干扰、模板修改后重新编译、增量解析与一次性解析结果一致
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_template_cache.py
+"""
+import os
+import sys
+
+import pytest
+import textfsm
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.template_cache import TemplateRegistry
+
+# Filldown / List 字段在解析过程中保存状态，克隆共享了状态就会串到下一次解析
+TEMPLATE = r"""Value Filldown VLAN (\d+)
+Value Required INTERFACE (\S+)
+Value STATUS (up|down)
+Value List ADDRESSES (\d+\.\d+\.\d+\.\d+)
+
+Start
+  ^VLAN ${VLAN}
+  ^Interface ${INTERFACE} is ${STATUS} -> Continue
+  ^\s+address ${ADDRESSES}
+  ^end -> Record
+"""
+
+OUTPUT = """VLAN 10
+Interface GE0/0/1 is up
+  address 10.0.0.1
+  address 10.0.0.2
+end
+Interface GE0/0/2 is down
+  address 10.0.1.1
+end
+VLAN 20
+Interface GE0/0/3 is up
+end
+"""
+
+EXPECTED = [
+    {'vlan': '10', 'interface': 'GE0/0/1', 'status': 'up', 'addresses': ['10.0.0.1', '10.0.0.2']},
+    {'vlan': '10', 'interface': 'GE0/0/2', 'status': 'down', 'addresses': ['10.0.1.1']},
+    {'vlan': '20', 'interface': 'GE0/0/3', 'status': 'up', 'addresses': []},
+]
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / 'test_template.textfsm'
+    path.write_text(TEMPLATE, encoding='utf-8')
+    return str(path)
+
+
+def test_each_parse_gets_independent_state(template):
+    registry = TemplateRegistry()
+    assert registry.parse(template, OUTPUT) == EXPECTED
+
+    # 第二次命中缓存，不带入上一次的 Filldown / List 值
+    assert registry.parse(template, 'Interface GE0/0/9 is up\nend\n') == [
+        {'vlan': '', 'interface': 'GE0/0/9', 'status': 'up', 'addresses': []}]
+
+    # 同时取出的两个克隆交替解析也互不影响
+    first, second = registry.get(template), registry.get(template)
+    assert first is not second and first.values[0] is not second.values[0]
+    first.ParseText('VLAN 30\n', eof=False)
+    assert second.ParseText('Interface GE0/0/5 is down\nend\n') == [['', 'GE0/0/5', 'down', []]]
+    assert first.ParseText('Interface GE0/0/6 is up\nend\n') == [['30', 'GE0/0/6', 'up', []]]
+
+    stats = registry.stats()
+    assert stats['misses'] == 1 and stats['hits'] == 3 and stats['templates'] == 1
+
+
+def test_modified_template_is_recompiled(template):
+    registry = TemplateRegistry()
+    assert registry.parse(template, OUTPUT)[0]['status'] == 'up'
+
+    with open(template, 'w', encoding='utf-8') as f:
+        f.write(TEMPLATE.replace('STATUS', 'STATE'))
+    stat = os.stat(template)
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert 'state' in registry.parse(template, OUTPUT)[0]
+    assert registry.stats()['reloads'] == 1
+
+
+def test_stream_parser_matches_one_shot_parse(template):
+    registry = TemplateRegistry()
+    parser = registry.stream_parser(template)
+    lines = OUTPUT.splitlines()
+    for start in range(0, len(lines), 3):   # 分批到达，批次边界落在记录中间
+        parser.feed(lines[start:start + 3])
+    streamed = parser.finish()
+
+    with open(template, encoding='utf-8') as f:
+        fsm = textfsm.TextFSM(f)
+    headers = [h.lower() for h in fsm.header]
+    one_shot = [dict(zip(headers, row)) for row in fsm.ParseText(OUTPUT)]
+
+    assert streamed == one_shot == EXPECTED
@@ -0,0 +1,117 @@
+"""
+命令 -> 模板解析测试：VRP 缩写、最长匹配、index 短命令不能前缀匹配长命令、与仓库命令表合并
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_template_resolver.py
+"""
+import os
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 core 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from core.template_resolver import FALLBACK_COMMANDS, TemplateResolver
+
+# 摘自 ntc-templates 的 index (格式与顺序保持原样：d[[ir]] 排在 display 系列之前)
+INDEX = """
+# First line is the header fields for columns and is mandatory.
+Template, Hostname, Platform, Command
+
+huawei_vrp_dir.textfsm, .*, huawei_vrp, d[[ir]]
+huawei_vrp_display_version.textfsm, .*, huawei_vrp, dis[[play]] v[[ersion]]
+huawei_vrp_display_vlan_brief.textfsm, .*, huawei_vrp, di[[splay]] v[[lan]] b[[rief]]
+huawei_vrp_display_interface.textfsm, .*, huawei_vrp, dis[[play]] int[[erface]]
+huawei_vrp_display_interface_brief.textfsm, .*, huawei_vrp, dis[[play]] int[[erface]] b[[rief]]
+huawei_vrp_display_ip_interface_brief.textfsm, .*, huawei_vrp, dis[[play]] ip in[[terface]] b[[rief]]
+huawei_vrp_display_arp_all.textfsm, .*, huawei_vrp, dis[[play]] arp( all)?
+huawei_vrp_display_ip_routing-table_verbose.textfsm, .*, huawei_vrp, dis[[play]] ip(v6)? ro[[uting-table]] verb[[ose]]
+huawei_vrp_display_snmp-agent_community.textfsm, .*, huawei_vrp, dis[[play]] snmp-agent community (read|write)
+huawei_vrp_display_lldp_neighbor_brief.textfsm, .*, huawei_vrp, dis[[play]] lldp n[[eighbor]] b[[rief]]
+cisco_ios_show_version.textfsm, .*, cisco_ios, sh[[ow]] ver[[sion]]
+"""
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = tmp_path / 'index'
+    path.write_text(INDEX, encoding='utf-8')
+    return str(path)
+
+
+def _template(resolver, command, platform='huawei_vrp'):
+    path = resolver.resolve(command, platform)
+    return os.path.basename(path) if path else None
+
+
+@pytest.mark.parametrize('command, template', [
+    ('display ip interface brief', 'huawei_vrp_display_ip_interface_brief.textfsm'),
+    ('dis ip int br', 'huawei_vrp_display_ip_interface_brief.textfsm'),
+    ('di v b', 'huawei_vrp_display_vlan_brief.textfsm'),   # di 也是 d[[ir]] 的合法缩写，按最长匹配
+    ('dis v', 'huawei_vrp_display_version.textfsm'),
+    ('di v', 'huawei_vrp_dir.textfsm'),                    # 不是 display vlan brief (少了 brief)
+    ('dis int br', 'huawei_vrp_display_interface_brief.textfsm'),
+    ('dis int', 'huawei_vrp_display_interface.textfsm'),
+    ('display interface GigabitEthernet0/0/1', 'huawei_vrp_display_interface.textfsm'),
+    ('display arp', 'huawei_vrp_display_arp_all.textfsm'),
+    ('dis ipv6 rou verb', 'huawei_vrp_display_ip_routing-table_verbose.textfsm'),
+    ('dir', 'huawei_vrp_dir.textfsm'),
+    ('d', 'huawei_vrp_dir.textfsm'),
+    ('dir flash:', 'huawei_vrp_dir.textfsm'),
+])
+def test_index_abbreviations_and_word_boundary(index_path, command, template):
+    resolver = TemplateResolver.from_index(index_path)
+    assert _template(resolver, command) == template
+
+
+@pytest.mark.parametrize('command', [
+    'display ip interface brief', 'dis ip int br', 'dis int br', 'display arp',
+    'display current-configuration', 'dis mac-address',
+])
+def test_short_index_entry_does_not_prefix_match(index_path, command):
+    # d[[ir]] 只锚定开头时会吃掉所有 d 开头的命令
+    resolver = TemplateResolver.from_index(index_path)
+    assert _template(resolver, command) != 'huawei_vrp_dir.textfsm'
+
+
+def test_longest_match_wins_regardless_of_order():
+    # 短命令写在前面，仍按词数多的优先
+    mapping = {'huawei_vrp': {'display interface': 'short.textfsm', 'display interface brief': 'long.textfsm'}}
+    resolver = TemplateResolver.from_mapping(mapping, template_dir='/t')
+    assert _template(resolver, 'di int br') == 'long.textfsm'
+    assert _template(resolver, 'di int') == 'short.textfsm'
+    assert _template(resolver, 'di interfaces') is None
+    assert resolver.commands() == ['display interface brief', 'display interface']
+
+
+def test_fallback_abbreviations():
+    resolver = TemplateResolver.from_mapping(template_dir='/t')
+    assert _template(resolver, 'di ver') == 'huawei_vrp_display_version.textfsm'
+    assert _template(resolver, 'di vl br') == 'huawei_vrp_display_vlan_brief.textfsm'
+    assert _template(resolver, 'di vl b') == 'huawei_vrp_display_vlan.textfsm'   # 每个词至少保留两个字符
+    assert _template(resolver, 'dis ip int br') == 'huawei_vrp_display_ip_interface_brief.textfsm'
+    assert _template(resolver, 'sh ver', 'cisco_ios') == 'cisco_ios_show_version.textfsm'
+
+
+def test_index_merged_with_repo_mapping(index_path):
+    mapping = {'huawei_vrp': {'display clock': 'huawei_vrp_display_clock.textfsm',
+                              'display version': 'repo_display_version.textfsm'}}
+    resolver = TemplateResolver.from_index(index_path, mapping)
+    # index 没有的命令仍由仓库命令表解析，同一命令仓库命令表优先
+    assert _template(resolver, 'dis clock') == 'huawei_vrp_display_clock.textfsm'
+    assert _template(resolver, 'display version') == 'repo_display_version.textfsm'
+    assert _template(resolver, 'dis ip int br') == 'huawei_vrp_display_ip_interface_brief.textfsm'
+    assert os.path.dirname(resolver.resolve('dis clock')) == os.path.dirname(index_path)
+
+    full = TemplateResolver.from_index(index_path, FALLBACK_COMMANDS)
+    assert set(FALLBACK_COMMANDS['huawei_vrp']) <= set(full.commands())
+
+
+def test_commands_are_plain_command_strings(index_path):
+    commands = TemplateResolver.from_index(index_path).commands()
+    assert 'display ip interface brief' in commands and 'dir' in commands
+    assert not any(set(command) & set('()|?*+[]{}^$\\') for command in commands), commands
+    assert len(commands) == len(set(commands))
+    assert TemplateResolver.from_index(index_path).commands('cisco_ios') == ['show version']
@@ -0,0 +1,162 @@
+"""
+结构化结果表测试：按命令与表头归类、写入时同步拆行、迁移回填与按索引查询
+
+用法 (在 src 目录下执行):
+    python -m pytest -q tests/test_typed_results.py
+"""
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 路径修正：确保能导入 app 和 utils (src 目录)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+
+from app import database, typed_results
+
+# huawei_vrp_display_interface_brief.textfsm 的解析结果
+INTERFACES = [
+    {'interface': 'GigabitEthernet0/0/1', 'phy': 'up', 'protocol': 'up', 'inuti': '0.01%', 'oututi': '0.01%',
+     'inerrors': '0', 'outerrors': '0'},
+    {'interface': 'GigabitEthernet0/0/2', 'phy': 'down', 'protocol': 'down', 'inuti': '0%', 'oututi': '0%',
+     'inerrors': '12', 'outerrors': '0'},
+]
+# huawei_vrp_display_arp_all.textfsm
+ARP = [{'ip_address': '10.0.0.2', 'mac_address': '00e0-fc12-3456', 'expire': '20', 'type': 'D-0',
+        'interface': 'GE0/0/1', 'vpn_instance': ''}]
+# cisco_ios_show_ip_route.textfsm
+ROUTES = [{'vrf': '', 'protocol': 'O', 'type': '', 'network': '10.1.0.0', 'prefix_length': '16', 'distance': '110',
+           'metric': '2', 'nexthop_ip': '10.0.0.1', 'nexthop_vrf': '', 'nexthop_if': 'Gi0/1', 'uptime': '1d',
+           'flag': ''}]
+# cisco_ios_show_mac-address-table.textfsm (DESTINATION_PORT 为 List)
+MAC = [{'destination_address': '0050.56aa.0001', 'type': 'DYNAMIC', 'vlan_id': '10', 'destination_port': ['Gi0/2']}]
+# cisco_ios_show_vlan.textfsm
+VLANS = [{'vlan_id': '10', 'vlan_name': 'users', 'status': 'active', 'interfaces': ['Gi0/2', 'Gi0/3']}]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'netops.db'))
+    database.init_db()
+    yield str(tmp_path / 'netops.db')
+    database.close_connections()
+
+
+@pytest.mark.parametrize('command, result, kind', [
+    ('display interface brief', INTERFACES, 'interfaces'),
+    ('dis int br', INTERFACES, 'interfaces'),
+    ('display arp all', ARP, 'arp'),
+    ('show ip route', ROUTES, 'routes'),
+    ('show mac address-table', MAC, 'mac'),
+    ('show vlan', VLANS, 'vlans'),
+    ('display lldp neighbor', [{'vlan_id': '1', 'vlan_name': 'x'}], None),   # 表头像 VLAN，命令不是
+    ('display interface brief', [{'interface': 'GE0/0/1', 'inuti': '1%'}], None),  # 命令像接口，没有状态列
+    ('display version', 'raw text', None),
+])
+def test_extract_classifies_by_command_and_headers(command, result, kind):
+    typed = typed_results.extract(command, result)
+    assert (typed[0] if typed else None) == kind
+
+
+def test_extract_maps_columns_and_types():
+    kind, columns, rows = typed_results.extract('show mac address-table', MAC)
+    assert dict(zip(columns, rows[0])) == {'mac_address': '0050.56aa.0001', 'vlan_id': 10,
+                                           'interface': 'Gi0/2', 'type': 'DYNAMIC'}
+    kind, columns, rows = typed_results.extract('show ip route', ROUTES)
+    route = dict(zip(columns, rows[0]))
+    assert route['prefix_length'] == 16 and route['next_hop'] == '10.0.0.1' and route['vrf'] is None
+
+
+def test_mapped_columns_exist_in_tables(db):
+    conn = sqlite3.connect(db)
+    for spec in typed_results.TYPED_TABLES.values():
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({spec['table']})")}
+        assert set(spec['columns']) <= columns, spec['table']
+    conn.close()
+
+
+def test_save_log_populates_typed_rows_linked_to_log(db):
+    database.save_log('10.0.0.1', 'display interface brief', INTERFACES)
+    database.save_logs([('10.0.0.2', 'display arp all', ARP, 'success'),
+                        ('10.0.0.3', 'display interface brief', INTERFACES, 'error')])   # 失败记录不拆行
+
+    down = database.query_results('interfaces', status='down')
+    assert [(row['device_ip'], row['interface'], row['in_errors']) for row in down] == \
+        [('10.0.0.1', 'GigabitEthernet0/0/2', 12)]
+    parent = database.get_logs_by_device('10.0.0.1')[0]
+    assert down[0]['log_id'] == parent['id'] and down[0]['timestamp'] == parent['timestamp']
+
+    assert database.query_results('arp', mac_address='00e0-fc12-3456')[0]['ip_address'] == '10.0.0.2'
+    assert database.query_results('interfaces', device_ip='10.0.0.3') == []
+    assert database.query_results('interfaces', since='2999-01-01') == []
+
+    with pytest.raises(ValueError):
+        database.query_results('interfaces', colour='red')
+    with pytest.raises(ValueError):
+        database.query_results('bogus')
+
+
+def test_deleting_log_cascades_to_typed_rows(db):
+    database.save_logs([('10.0.0.1', 'display interface brief', INTERFACES, 'success'),
+                        ('10.0.0.2', 'display interface brief', INTERFACES, 'success')])
+    log_id = database.get_logs_by_device('10.0.0.1')[0]['id']
+    with database._connection() as conn:
+        conn.execute('DELETE FROM inspection_logs WHERE id = ?', (log_id,))
+        conn.commit()
+
+    assert database.query_results('interfaces', device_ip='10.0.0.1') == []
+    assert len(database.query_results('interfaces', device_ip='10.0.0.2')) == 2
+
+
+def test_migration_backfills_existing_logs(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    # 停在 v2 的旧库，已有巡检记录
+    monkeypatch.setattr(database, 'MIGRATIONS', database.MIGRATIONS[:2])
+    database.init_db()
+    conn = sqlite3.connect(path)
+    conn.executemany('INSERT INTO inspection_logs (device_ip, command, result_json, status) VALUES (?, ?, ?, ?)', [
+        ('10.0.0.1', 'display interface brief', json.dumps(INTERFACES), 'success'),
+        ('10.0.0.1', 'show vlan', json.dumps(VLANS), 'success'),
+        ('10.0.0.1', 'display version', 'not json', 'success'),
+    ])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.init_db()
+
+    assert len(database.query_results('interfaces', device_ip='10.0.0.1')) == 2
+    assert database.query_results('vlans', vlan_id=10)[0]['interfaces'] == 'Gi0/2,Gi0/3'
+
+    # 回填可重复执行：已有结果行的记录不会重复写入
+    assert database.backfill_typed_results() == 0
+    assert len(database.query_results('interfaces', device_ip='10.0.0.1')) == 2
+    database.close_connections()
+
+
+def test_backfill_picks_up_logs_without_typed_rows(db):
+    database.save_logs([('10.0.0.1', 'display interface brief', INTERFACES, 'success')])
+    conn = sqlite3.connect(db)
+    # 例如映射更新之前写入、当时没能归类的记录
+    conn.execute('DELETE FROM result_interfaces')
+    conn.commit()
+    conn.close()
+
+    assert database.backfill_typed_results() == 2
+    assert database.backfill_typed_results() == 0
+    assert len(database.query_results('interfaces', device_ip='10.0.0.1')) == 2
+
+
+def test_down_interfaces_query_uses_index(db):
+    database.save_logs([('10.0.0.1', 'display interface brief', INTERFACES, 'success')] * 50)
+    conn = sqlite3.connect(db)
+    plan = ' | '.join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM result_interfaces WHERE status = 'down' AND timestamp >= '2024-01-01' "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100"))
+    conn.close()
+    assert 'USING INDEX idx_result_interfaces_status_timestamp' in plan, plan
@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+import time
+
+# 环境变量 NETOPS_METRICS=0 关闭计时 (关闭后 timer() 返回共享的空计时器，几乎没有开销)
+METRICS_ENABLED = os.environ.get('NETOPS_METRICS', '1') != '0'
+
+# 阶段耗时直方图的桶上限 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 标签最长保留的字符数 (防止超长命令撑大标签)
+MAX_LABEL_LENGTH = 64
+# 每个直方图最多保留的标签组合数，超出后新组合计入 OVERFLOW_LABEL
+MAX_SERIES = 2000
+OVERFLOW_LABEL = 'other'
+# 命令标签只保留开头的关键字 (display ip interface brief)，遇到参数 (地址、编号、接口名、选项) 截断
+COMMAND_KEYWORD = re.compile(r'^[a-z][a-z-]*$')
+MAX_COMMAND_KEYWORDS = 4
+
+
+def _normalize(value):
+    """标签值规范化：合并空白并截断 (写入时执行，同一标签不会因空白不同拆成多条序列)"""
+    return ' '.join(str(value).split())[:MAX_LABEL_LENGTH]
+
+
+def _label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def command_label(command):
+    """
+    命令 -> 有界的标签值：去掉参数只保留命令关键字
+    ping 10.0.0.1 -> ping；interface GigabitEthernet0/0/1 -> interface；dis int br 保持不变
+    """
+    keywords = []
+    for word in str(command).lower().split()[:MAX_COMMAND_KEYWORDS]:
+        if not COMMAND_KEYWORD.match(word):
+            break
+        keywords.append(word)
+    return ' '.join(keywords)
+
+
+class Histogram:
+    """Prometheus 风格的累积直方图，按标签组合分别统计"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS, max_series=MAX_SERIES):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._series = {}   # 标签值元组 -> [各桶计数..., +Inf 计数, 总和]
+
+    def observe(self, value, labels):
+        """
+        :param labels: 与 label_names 顺序一致的标签值元组
+        """
+        labels = tuple(_normalize(value) for value in labels)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    labels = (OVERFLOW_LABEL,) * len(self.label_names)
+                    series = self._series.get(labels)
+                if series is None:
+                    series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        """Prometheus 文本格式 (桶计数为累积值)"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            label_text = ','.join(f'{key}="{_label_value(value)}"' for key, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    进程内指标注册表
+    - phase_seconds: 各阶段耗时直方图，标签为 phase / device / command (命令只取关键字，见 command_label)
+      (tcp_connect、ssh_auth、prompt_detect、disable_paging、command、paging、parse、db_write)
+    - add_collector(fn) 注册额外的指标来源 (会话池、响应缓存等)，fn 返回 Prometheus 文本行列表
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.phase_seconds = Histogram('netops_phase_seconds', 'Latency of each device / API phase in seconds',
+                                       ('phase', 'device', 'command'))
+        self._collectors = []
+
+    def timer(self, phase, device='', command=''):
+        """
+        阶段计时上下文管理器
+        with metrics.timer('parse', host, command): ...
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.phase_seconds, (phase, device, command_label(command)))
+
+    def observe(self, phase, seconds, device='', command=''):
+        """直接记录一次已知耗时 (计时区间不是一个代码块时使用)"""
+        if self.enabled:
+            self.phase_seconds.observe(seconds, (phase, device, command_label(command)))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """全部指标的 Prometheus 文本格式"""
+        lines = self.phase_seconds.render()
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+# 进程级单例
+metrics = Metrics()